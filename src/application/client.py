@@ -1,10 +1,13 @@
 #!/usr/bin/env python
 
 import asyncio
+import dataclasses
+import logging
 import pprint
 import socket
 import sys
 from uuid import uuid4
+from application import event_loop
 from application.messaging import (
     ClientInfo,
     GameInfo,
@@ -13,6 +16,7 @@ from application.messaging import (
     decode_json_message,
     parse_game_info,
     GameMessage,
+    Rematch,
     parse_game_message_or_info,
 )
 from config import CLIENT_CONFIG, get_logger, CONFIG
@@ -22,8 +26,14 @@ from websockets import ConnectionClosedError, ConnectionClosedOK
 from websockets.asyncio.client import connect
 from domain.client.game import Game
 from application.io.io import IO
-from typing import Optional
+from application.matchmaking import match_request_path
+from application.local_connection import LocalConnection
+from application import tracing
+from application.tracing import TraceContext
+from typing import TYPE_CHECKING, Optional
 
+if TYPE_CHECKING:
+    from websockets.asyncio.server import Server
 
 logger = get_logger(__name__)
 
@@ -38,21 +48,38 @@ next_attack_or_possible_attack_task: Optional[asyncio.Task] = None
 
 show_possible_attacks = False
 
+# the server recognizes a player reattaching to a restored room by it
+uniqid = uuid4()
+# kept while a started game is played, resumed if the server restarts meanwhile
+interrupted_game: Optional[Game] = None
+# room the server has matched the player into, see matchmaking.py
+matched_room: Optional[str] = None
+# serving the opponent when the server is embedded, see ClientConfig
+embedded_server: Optional["Server"] = None
+
 
 async def receive(websocket) -> dict:
-    data = await websocket.recv()
-    decoded = decode_json_message(data)
-    formatted = pprint.pformat(decoded, indent=2)
-    if "PossibleAttack" not in formatted or show_possible_attacks:
-        logger.debug(f"Received: {formatted}")
+    if isinstance(websocket, LocalConnection):
+        decoded = await websocket.recv()
+    else:
+        decoded = decode_json_message(await websocket.recv())
+    tracing.stamp_serialized(decoded, "client_received")
+    if logger.isEnabledFor(logging.DEBUG):
+        formatted = pprint.pformat(decoded, indent=2)
+        if "PossibleAttack" not in formatted or show_possible_attacks:
+            logger.debug(f"Received: {formatted}")
     return decoded
 
 
 async def send(websocket, data: Serializable) -> None:
-    await websocket.send(data.stringify())
-    formatted = pprint.pformat(data.serialize(), indent=2)
-    if "PossibleAttack" not in formatted or show_possible_attacks:
-        logger.debug(f"Sent: {formatted}")
+    if isinstance(websocket, LocalConnection):
+        await websocket.send(data.serialize())
+    else:
+        await websocket.send(data.stringify())
+    if logger.isEnabledFor(logging.DEBUG):
+        formatted = pprint.pformat(data.serialize(), indent=2)
+        if "PossibleAttack" not in formatted or show_possible_attacks:
+            logger.debug(f"Sent: {formatted}")
 
 
 async def place_ships(game: Game) -> None:
@@ -67,6 +94,7 @@ async def place_ships(game: Game) -> None:
             four=set(list(all_ships.four)[: counts.four]),
         )
         game.place_ships(masted_ships)
+        await game_io.show_placed_ships(masted_ships)
     else:
         masted_ships = await game_io.get_masted_ships()
         if masted_ships is not None:
@@ -76,11 +104,11 @@ async def place_ships(game: Game) -> None:
 
 
 def show_state(game: Game) -> None:
-    if CONFIG.mode == "terminal":
+    if CONFIG.mode == "terminal" and CLIENT_CONFIG.terminal_renderer == "text":
         print(game.show_state())
 
 
-async def read_input() -> tuple[Field, bool]:
+async def read_input() -> tuple[Field, bool, Optional[TraceContext]]:
     print("Enter next field to attack:")
     loop = asyncio.get_event_loop()
     fut = loop.create_future()
@@ -98,6 +126,7 @@ async def read_input() -> tuple[Field, bool]:
         raise RuntimeError("Cancelled, no field returned")
 
     loop.remove_reader(sys.stdin)
+    trace = tracing.start("input")
     if not isinstance(result, str):
         raise RuntimeError(
             f"Reading field from stdin failed weirdly; type: {type(result)}"
@@ -106,12 +135,18 @@ async def read_input() -> tuple[Field, bool]:
     if result.startswith(">"):
         is_real = False
 
-    return (Field(result.lstrip(">")), is_real)
+    return (Field(result.lstrip(">")), is_real, trace if is_real else None)
 
 
-async def get_possible_or_real_attack() -> Optional[tuple[Field, bool]]:
+async def get_possible_or_real_attack() -> (
+    Optional[tuple[Field, bool, Optional[TraceContext]]]
+):
     if CONFIG.mode == "terminal":
-        return await read_input()
+        await game_io.player_turn()
+        attack = await read_input()
+        if attack[1]:
+            await game_io.opponent_turn()
+        return attack
     else:
         return await game_io.get_possible_or_real_attack()
 
@@ -132,6 +167,28 @@ def cancel_running_user_tasks() -> None:
         next_attack_or_possible_attack_task.cancel()
 
 
+async def ask_for_rematch(ws) -> Optional[GameInfo]:
+    """Returns GameInfo of the next game in the same room, None if there is
+    none, e.g. the opponent has not asked for it in time"""
+    if CLIENT_CONFIG.rematch:
+        await send(ws, Rematch(uniqid=uuid4()))
+    # the ended game is shown meanwhile
+    await asyncio.sleep(CLIENT_CONFIG.game_ended_state_show_seconds)
+    if not CLIENT_CONFIG.rematch:
+        return None
+    try:
+        async with asyncio.timeout(CLIENT_CONFIG.rematch_wait_seconds):
+            while True:
+                message = parse_game_message_or_info(await receive(ws))
+                if not isinstance(message, GameInfo):
+                    continue
+                await game_io.react_to(message)
+                if message.status == GameStatus.WaitingToStart:
+                    return message
+    except TimeoutError:
+        return None
+
+
 def stop_all():
     game_io.stop()
 
@@ -140,9 +197,14 @@ async def play():
     global placing_ships_task
     global next_attack_or_possible_attack_task
     global connect_attempt_count
+    global interrupted_game
+    global matched_room
 
+    resumable = interrupted_game
+    # the kept game's flags are sent once its room turns out to be resumed,
+    # a fresh room would start the game with no ships placed
     starting_client_info = ClientInfo(
-        uniqid=uuid4(),
+        uniqid=uniqid,
         connected=True,
         ships_placed=False,
         ready=False,
@@ -150,170 +212,251 @@ async def play():
     )
     current_game_info: Optional[GameInfo] = None
 
-    placed_ships_info_sent: bool = False
+    if resumable is not None and matched_room is not None:
+        path = f"/{matched_room}"
+    elif CLIENT_CONFIG.matchmaking:
+        path = match_request_path(
+            CONFIG.board_size, CONFIG.masted_ships_counts, CLIENT_CONFIG.rating
+        )
+    else:
+        path = ""
+    if embedded_server is not None:
+        from application import server
 
-    server_address = f"ws://{CONFIG.server_host}:{CONFIG.server_port}"
-    logger.info(f"Will try to connect to {server_address}")
+        logger.info(f"Will connect to the embedded server at {path or '/'}")
+        connecting = server.connect_local(path)
+    else:
+        server_address = f"ws://{CONFIG.server_host}:{CONFIG.server_port}{path}"
+        logger.info(f"Will try to connect to {server_address}")
+        connecting = connect(
+            server_address,
+            open_timeout=5,
+            ping_interval=CONFIG.conn_ping_interval,
+            ping_timeout=CONFIG.conn_ping_timeout,
+            close_timeout=5,
+            family=socket.AF_INET,
+        )
 
-    async with connect(
-        server_address,
-        open_timeout=5,
-        ping_interval=CONFIG.conn_ping_interval,
-        ping_timeout=CONFIG.conn_ping_timeout,
-        close_timeout=5,
-        family=socket.AF_INET,
-    ) as ws:
+    async with connecting as ws:
         await send(ws, starting_client_info)
         connect_attempt_count = 0
 
         data = await receive(ws)
         current_game_info = parse_game_info(data)
+        if current_game_info.extra is not None:
+            matched_room = current_game_info.extra.room
 
-        game = Game(
-            masted_ships=current_game_info.masted_ships,
-            board_size=current_game_info.board_size,
+        resumed = (
+            resumable is not None
+            and current_game_info.extra is not None
+            and current_game_info.extra.resumed is True
         )
+        if resumable is not None and resumed:
+            game = resumable
+            await send(
+                ws,
+                dataclasses.replace(
+                    starting_client_info,
+                    ships_placed=game.ships_placed,
+                    ready=game.ready,
+                ),
+            )
+        else:
+            game = Game(
+                masted_ships=current_game_info.masted_ships,
+                board_size=current_game_info.board_size,
+            )
+        interrupted_game = None
 
-        await game_io.player_connected(
-            masted_ships=current_game_info.masted_ships,
-            board_size=current_game_info.board_size,
-        )
-        await game_io.react_to(current_game_info)
-
-        placing_ships_task = asyncio.create_task(place_ships(game))
-
+        # games follow each other in the room while both players ask for it
         while True:
-            try:
-                async with asyncio.timeout(0.1):
-                    data = await receive(ws)
-            except TimeoutError:
-                pass
+            await game_io.player_connected(
+                masted_ships=current_game_info.masted_ships,
+                board_size=current_game_info.board_size,
+            )
+            await game_io.react_to(current_game_info)
+
+            placed_ships_info_sent = resumed
+            if resumed:
+                await game_io.show_resumed_game(game)
+                placing_ships_task = None
             else:
-                current_game_info = parse_game_info(data)
-                await game_io.react_to(current_game_info)
+                placing_ships_task = asyncio.create_task(place_ships(game))
+
+            while True:
+                try:
+                    async with asyncio.timeout(0.1):
+                        data = await receive(ws)
+                except TimeoutError:
+                    pass
+                else:
+                    current_game_info = parse_game_info(data)
+                    await game_io.react_to(current_game_info)
+
+                if (
+                    placing_ships_task is not None
+                    and placing_ships_task.done()
+                    and not placed_ships_info_sent
+                ):
+                    client_info = ClientInfo(
+                        uniqid=uniqid,
+                        connected=True,
+                        ships_placed=game.ships_placed,
+                        ready=game.ready,
+                        all_ships_wrecked=game.all_ships_wrecked,
+                    )
+                    await send(ws, client_info)
+                    placed_ships_info_sent = True
+
+                if (
+                    current_game_info is not None
+                    and current_game_info.status == GameStatus.Started
+                ):
+                    break
+
+            show_state(game)
+            interrupted_game = game
 
-            if placing_ships_task.done() and not placed_ships_info_sent:
+            extra = current_game_info.extra
+            if resumed and extra is not None and extra.your_turn is not None:
+                my_turn_to_attack = extra.your_turn
+            else:
+                my_turn_to_attack = extra is not None and extra.you_start_first is True
+            while True:
+                receive_timeout = 0.1
+                if my_turn_to_attack:
+                    if next_attack_or_possible_attack_task is None:
+                        next_attack_or_possible_attack_task = asyncio.create_task(
+                            get_possible_or_real_attack()
+                        )
+                        continue
+                    if not next_attack_or_possible_attack_task.done():
+                        try:
+                            await asyncio.wait_for(
+                                asyncio.shield(next_attack_or_possible_attack_task),
+                                timeout=0.1,
+                            )
+                        except TimeoutError:
+                            # listening shortly meanwhile, the clock may end the game
+                            receive_timeout = 0.01
+                    if next_attack_or_possible_attack_task.done():
+                        res = next_attack_or_possible_attack_task.result()
+                        if res is None:
+                            continue
+                        field_to_attack, attack_is_real, trace = res
+                        next_attack_or_possible_attack_task = None
+                        if not attack_is_real:
+                            message = Game.possible_attack_of(field_to_attack)
+                            await send(ws, message)
+                            continue
+
+                        tracing.stamp(trace, "play_noticed")
+                        message = game.attack(field_to_attack, trace)
+                        tracing.stamp(trace, "client_sending")
+                        await send(ws, message)
+                        show_state(game)
+                        my_turn_to_attack = False
+
+                try:
+                    async with asyncio.timeout(receive_timeout):
+                        data = await receive(ws)
+                except TimeoutError:
+                    pass
+                else:
+                    message = parse_game_message_or_info(data)
+                    if not isinstance(message, GameMessage):
+                        current_game_info = message
+                    else:
+                        try:
+                            result = game.handle_message(message)
+                        except Exception as ex:
+                            logger.exception(ex)
+                            raise ex
+                        tracing.stamp(message.trace, "client_handled")
+                        show_state(game)
+
+                        if isinstance(result, GameMessage):
+                            tracing.stamp(result.trace, "client_result_sending")
+                            await send(ws, result)
+                            my_turn_to_attack = True
+
+                        await game_io.handle_messages(message, game, result)
+                        if (
+                            CONFIG.mode == "terminal"
+                            and CLIENT_CONFIG.terminal_renderer == "text"
+                        ):
+                            tracing.record(message.trace, "shown")
+
+                if (
+                    current_game_info.status == GameStatus.Ended
+                    or game.all_ships_wrecked
+                ):
+                    break
+
+            interrupted_game = None
+            if game.all_ships_wrecked:
                 client_info = ClientInfo(
-                    uniqid=uuid4(),
+                    uniqid=uniqid,
                     connected=True,
                     ships_placed=game.ships_placed,
                     ready=game.ready,
                     all_ships_wrecked=game.all_ships_wrecked,
                 )
                 await send(ws, client_info)
-                placed_ships_info_sent = True
-
-            if (
-                current_game_info is not None
-                and current_game_info.status == GameStatus.Started
-            ):
-                break
-
-        show_state(game)
-
-        my_turn_to_attack = (
-            current_game_info.extra is not None
-            and current_game_info.extra.you_start_first is True
-        )
-        while True:
-            if my_turn_to_attack:
-                if next_attack_or_possible_attack_task is None:
-                    next_attack_or_possible_attack_task = asyncio.create_task(
-                        get_possible_or_real_attack()
-                    )
-                    continue
-                elif not next_attack_or_possible_attack_task.done():
-                    try:
-                        await asyncio.wait_for(
-                            asyncio.shield(next_attack_or_possible_attack_task),
-                            timeout=0.1,
-                        )
-                    except TimeoutError:
-                        continue
-
-                res = next_attack_or_possible_attack_task.result()
-                if res is None:
-                    continue
-                field_to_attack, attack_is_real = res
-                next_attack_or_possible_attack_task = None
-                if not attack_is_real:
-                    message = Game.possible_attack_of(field_to_attack)
-                    await send(ws, message)
-                    continue
-
-                message = game.attack(field_to_attack)
-                await send(ws, message)
-                show_state(game)
-                my_turn_to_attack = False
 
-            try:
-                async with asyncio.timeout(0.1):
-                    data = await receive(ws)
-            except TimeoutError:
-                pass
-            else:
-                message = parse_game_message_or_info(data)
-                if not isinstance(message, GameMessage):
-                    current_game_info = message
+            while True:
+                try:
+                    async with asyncio.timeout(0.1):
+                        data = await receive(ws)
+                except TimeoutError:
+                    pass
                 else:
-                    try:
-                        result = game.handle_message(message)
-                    except Exception as ex:
-                        logger.exception(ex)
-                        raise ex
-                    show_state(game)
-
-                    if isinstance(result, GameMessage):
-                        await send(ws, result)
-                        my_turn_to_attack = True
-
-                    await game_io.handle_messages(message, game, result)
-
-            if current_game_info.status == GameStatus.Ended or game.all_ships_wrecked:
-                break
-
-        if game.all_ships_wrecked:
-            client_info = ClientInfo(
-                uniqid=uuid4(),
-                connected=True,
-                ships_placed=game.ships_placed,
-                ready=game.ready,
-                all_ships_wrecked=game.all_ships_wrecked,
-            )
-            await send(ws, client_info)
+                    current_game_info = parse_game_info(data)
+                    await game_io.react_to(current_game_info)
+
+                if current_game_info.status == GameStatus.Ended:
+                    logger.info("Game was ended")
+                    if current_game_info.extra is not None:
+                        if current_game_info.extra.you_won:
+                            logger.info("You've won! Congratulations!")
+                        if current_game_info.extra.error is not None:
+                            logger.info(f"You've lost: {current_game_info.extra.error}")
+                        who_won = (
+                            "Player" if current_game_info.extra.you_won else "Opponent"
+                        )
+                        await game_io.won(who_won)
+                    rematch_info = await ask_for_rematch(ws)
+                    break
 
-        while True:
-            try:
-                async with asyncio.timeout(0.1):
-                    data = await receive(ws)
-            except TimeoutError:
-                pass
-            else:
-                current_game_info = parse_game_info(data)
-                await game_io.react_to(current_game_info)
-
-            if current_game_info.status == GameStatus.Ended:
-                logger.info("Game was ended")
-                if current_game_info.extra is not None:
-                    if current_game_info.extra.you_won:
-                        logger.info("You've won! Congratulations!")
-                    who_won = (
-                        "Player" if current_game_info.extra.you_won else "Opponent"
-                    )
-                    await game_io.won(who_won)
-                await asyncio.sleep(CLIENT_CONFIG.game_ended_state_show_seconds)
+            if rematch_info is None:
                 await ws.close()
                 break
+            logger.info("Rematch in the same room")
+            cancel_running_user_tasks()
+            placing_ships_task = None
+            next_attack_or_possible_attack_task = None
+            game.reset()
+            current_game_info = rematch_info
+            resumed = False
 
     await game_io.player_disconnected()
 
 
-async def main():
+async def main(started_io: Optional[IO] = None):
     global connect_attempt_count
+    global game_io
+    global embedded_server
 
-    if CONFIG.mode != "terminal":
+    if started_io is not None:
+        game_io = started_io
+    else:
         game_io.begin()
 
+    if CLIENT_CONFIG.embedded_server and embedded_server is None:
+        from application import server
+
+        embedded_server = await server.serve_embedded()
+
     while True:
         play_task = asyncio.create_task(play())
         try:
@@ -361,4 +504,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    event_loop.run(main())
@@ -0,0 +1,23 @@
+#!/usr/bin/env python
+
+"""Client entry point bringing the display up before the game modules load.
+
+Importing websockets, the messages' schemas and the game takes seconds on
+a Pi Zero, which would otherwise be spent with dark matrices.
+"""
+
+from application import event_loop
+from application.io.io import IO
+
+
+async def main() -> None:
+    game_io = IO()
+    game_io.begin()
+
+    from application import client
+
+    await client.main(game_io)
+
+
+if __name__ == "__main__":
+    event_loop.run(main())
@@ -0,0 +1,40 @@
+import asyncio
+import importlib.util
+from typing import Any, Callable, Coroutine, Final, Literal, Optional, TypeVar
+
+from config import CONFIG, get_logger
+
+logger: Final = get_logger(__name__)
+
+T = TypeVar("T")
+
+EventLoopName = Literal["asyncio", "uvloop"]
+
+
+def is_available(name: EventLoopName) -> bool:
+    return name != "uvloop" or importlib.util.find_spec("uvloop") is not None
+
+
+def running_loop_name() -> str:
+    """Package of the running loop's class, e.g. "uvloop" after a fallback too"""
+    return type(asyncio.get_running_loop()).__module__.split(".")[0]
+
+
+def loop_factory_of(name: EventLoopName) -> Optional[Callable[[], Any]]:
+    """Returns None for the default asyncio loop, also if uvloop is missing"""
+    if name != "uvloop":
+        return None
+    try:
+        import uvloop
+    except ImportError:
+        logger.warning("uvloop is not installed, running on the asyncio loop")
+        return None
+    return uvloop.new_event_loop
+
+
+def run(
+    main: Coroutine[Any, Any, T], loop_name: EventLoopName = CONFIG.event_loop
+) -> T:
+    """`asyncio.run` on the configured event loop"""
+    with asyncio.Runner(loop_factory=loop_factory_of(loop_name)) as runner:
+        return runner.run(main)
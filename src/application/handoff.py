@@ -0,0 +1,209 @@
+"""Hands the listening sockets and rooms of the server over to a new process.
+
+A server started with --takeover connects to the handoff socket of the
+running one and requests the handoff. The running server leaves the socket's
+path to the new one, stops accepting, sends out what is queued to
+its clients and closes their connections with 1012 (service restart). Then
+it passes its listening sockets over SCM_RIGHTS together with its rooms in the
+snapshot format and exits once the new server acknowledges serving them.
+Connections made meanwhile wait in the backlog of the listening socket, so
+clients reconnect once and find their rooms waiting for them.
+
+Under systemd the new server is started by ExecReload of server.service and
+becomes the main process of the service before the running one exits.
+"""
+
+import asyncio
+import contextlib
+import os
+import socket
+import struct
+from typing import Awaitable, Callable, Final, Optional
+
+from config import get_logger
+
+logger: Final = get_logger(__name__)
+
+# magic, protocol version, passed sockets count, rooms state length
+HANDOFF_HEADER: Final = struct.Struct("<4sHBQ")
+HANDOFF_MAGIC: Final = b"BSHO"
+HANDOFF_VERSION: Final = 2
+MAX_SOCKETS: Final = 4
+ACK: Final = b"\x01"
+TAKEOVER: Final = b"\x02"
+
+
+class HandoffError(Exception):
+    pass
+
+
+def notify_service_manager(state: str) -> bool:
+    """Sends the state to systemd, returns False if not run by it"""
+    address = os.environ.get("NOTIFY_SOCKET")
+    if not address:
+        return False
+    if address.startswith("@"):
+        # abstract namespace
+        address = "\0" + address[1:]
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as notifying:
+        notifying.connect(address)
+        notifying.sendall(state.encode())
+    return True
+
+
+def send_handoff(
+    connection: socket.socket, sockets: list[socket.socket], state: bytes
+) -> None:
+    header = HANDOFF_HEADER.pack(
+        HANDOFF_MAGIC, HANDOFF_VERSION, len(sockets), len(state)
+    )
+    socket.send_fds(connection, [header], [sock.fileno() for sock in sockets])
+    connection.sendall(state)
+    if connection.recv(len(ACK)) != ACK:
+        raise HandoffError("New server has not acknowledged the handoff")
+
+
+def _receive_exactly(connection: socket.socket, length: int) -> bytes:
+    chunks = bytearray()
+    while len(chunks) < length:
+        chunk = connection.recv(min(length - len(chunks), 1 << 20))
+        if not chunk:
+            raise HandoffError("Running server closed the handoff connection")
+        chunks += chunk
+    return bytes(chunks)
+
+
+def receive_handoff(
+    connection: socket.socket,
+) -> tuple[list[socket.socket], bytes]:
+    header, fds, _, _ = socket.recv_fds(connection, HANDOFF_HEADER.size, MAX_SOCKETS)
+    sockets = [socket.socket(fileno=fd) for fd in fds]
+    if len(header) != HANDOFF_HEADER.size:
+        raise HandoffError("Handoff header is truncated")
+    magic, version, sockets_count, state_length = HANDOFF_HEADER.unpack(header)
+    if (magic, version, sockets_count) != (
+        HANDOFF_MAGIC,
+        HANDOFF_VERSION,
+        len(sockets),
+    ):
+        raise HandoffError("Handoff header is unexpected")
+    return sockets, _receive_exactly(connection, state_length)
+
+
+class Handoff:
+    """Sockets and rooms taken over from the running server"""
+
+    def __init__(
+        self,
+        connection: socket.socket,
+        sockets: list[socket.socket],
+        state: bytes,
+    ) -> None:
+        self._connection = connection
+        self.sockets = sockets
+        self.state = state
+
+    def acknowledge(self) -> None:
+        """Lets the previous server exit, call once serving the sockets"""
+        try:
+            # systemd keeps managing the service after the previous one exits
+            if notify_service_manager(f"MAINPID={os.getpid()}"):
+                logger.info("Became the main process of the service")
+            self._connection.sendall(ACK)
+        finally:
+            self._connection.close()
+
+
+async def take_over(path: str) -> Handoff:
+    def request() -> Handoff:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(path)
+            connection.sendall(TAKEOVER)
+            sockets, state = receive_handoff(connection)
+        except BaseException:
+            connection.close()
+            raise
+        return Handoff(connection, sockets, state)
+
+    handoff = await asyncio.to_thread(request)
+    logger.info(f"Took over {len(handoff.sockets)} sockets at {path}")
+    return handoff
+
+
+def is_served(path: str) -> bool:
+    """Whether a running server listens at the handoff socket"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probing:
+        try:
+            probing.connect(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            return False
+    return True
+
+
+def listen_for_handoff(path: str) -> Optional[socket.socket]:
+    """Returns the handoff socket, None if another server serves it or it
+    cannot be bound"""
+    try:
+        if is_served(path):
+            logger.warning(f"Another server serves handoffs at {path}")
+            return None
+        if os.path.exists(path):
+            # left by a server which has exited
+            os.unlink(path)
+        listening = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            listening.bind(path)
+            listening.listen()
+        except OSError:
+            listening.close()
+            raise
+    except OSError as ex:
+        logger.warning(f"Cannot serve handoffs at {path}: {ex!r}")
+        return None
+    return listening
+
+
+async def serve_handoff(
+    path: str,
+    sockets: Callable[[], list[socket.socket]],
+    hand_off: Callable[[], Awaitable[bytes]],
+) -> bool:
+    """Waits for a new server and hands over to it, returns once it is done.
+
+    `sockets` are the listening sockets passed over, `hand_off` stops serving
+    and returns the rooms state. Returns False at once if handoffs cannot be
+    served at the path.
+    """
+    listening = listen_for_handoff(path)
+    if listening is None:
+        return False
+    listening.setblocking(False)
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            connection, _ = await loop.sock_accept(listening)
+            try:
+                request = await loop.sock_recv(connection, len(TAKEOVER))
+            except OSError:
+                request = b""
+            if request == TAKEOVER:
+                break
+            # probed by a server checking whether this one is running
+            connection.close()
+        # the new server serves handoffs at the path once it has taken over
+        listening.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)
+        # the listening sockets have to be passed before they are closed
+        passed = [sock.dup() for sock in sockets()]
+        state = await hand_off()
+        connection.setblocking(True)
+        with connection:
+            await asyncio.to_thread(send_handoff, connection, passed, state)
+        for sock in passed:
+            sock.close()
+        logger.info(f"Handed {len(passed)} sockets over at {path}")
+    finally:
+        listening.close()
+    return True
@@ -1,8 +1,11 @@
+import dataclasses
 import enum
+import time
 from config import get_logger
 from pydantic.dataclasses import dataclass
-from typing import Final, Optional
+from typing import Final, Optional, TypeAlias
 from domain.field import Field
+from application.tracing import TraceContext
 
 logger: Final = get_logger(__name__)
 
@@ -71,9 +74,27 @@ class ActionEvent:
     action: InActions | OutActions | InfoActions
     tile: Optional[tuple[int, int]] = None
     board: Optional[DisplayBoard] = None
+    trace: Optional[TraceContext] = None
+    created_ns: int = dataclasses.field(
+        default_factory=time.monotonic_ns, compare=False, repr=False
+    )
 
     @property
     def field(self) -> Optional[Field]:
         if self.tile is None:
             return None
         return Field.fromTuple(self.tile)
+
+
+@dataclass(frozen=True)
+class ActionEventBatch:
+    """Events applied by renderers at once, before the next frame is drawn"""
+
+    events: tuple[ActionEvent, ...]
+    trace: Optional[TraceContext] = None
+    created_ns: int = dataclasses.field(
+        default_factory=time.monotonic_ns, compare=False, repr=False
+    )
+
+
+OutEvent: TypeAlias = ActionEvent | ActionEventBatch
@@ -0,0 +1,250 @@
+import shutil
+import sys
+import time
+from threading import Event
+from typing import Final, Optional, TextIO
+
+import janus
+from application import tracing
+from application.io.actions import (
+    ActionEventBatch,
+    DisplayBoard,
+    InfoActions,
+    OutActions,
+    OutEvent,
+)
+from application.io.instrumentation import FrameStats
+
+ESC: Final = "\x1b"
+RESET: Final = f"{ESC}[0m"
+REVERSE: Final = f"{ESC}[7m"
+BLINK_STYLE: Final = f"{ESC}[41m"
+BLINK_DURATION_MS: Final = 500
+STATUS_WIDTH: Final = 40
+
+WATER: Final = "·"
+GLYPHS: Final[dict[OutActions, str]] = {
+    OutActions.Ship: "\N{BALLOT BOX}",
+    OutActions.NoShip: WATER,
+    OutActions.UnknownShots: "?",
+    OutActions.MissShips: "\N{MULTIPLICATION SIGN}",
+    OutActions.MissShots: "\N{MULTIPLICATION SIGN}",
+    OutActions.HitShips: "\N{BALLOT BOX WITH X}",
+    OutActions.HitShots: "\N{BALLOT BOX WITH X}",
+    OutActions.DestroyedShips: "\N{BLACK SQUARE}",
+    OutActions.DestroyedShots: "\N{BLACK SQUARE}",
+    OutActions.AroundDestroyedShips: "\N{MIDDLE DOT}",
+    OutActions.AroundDestroyedShots: "\N{MIDDLE DOT}",
+}
+STATUSES: Final[dict[InfoActions | OutActions, str]] = {
+    InfoActions.PlayerConnected: "Connected, waiting for the opponent",
+    InfoActions.PlayerDisconnected: "Disconnected, reconnecting...",
+    InfoActions.OpponentConnected: "Opponent connected",
+    InfoActions.OpponentDisconnected: "Opponent disconnected",
+    InfoActions.OpponentReady: "Opponent is ready",
+    InfoActions.PlayerWon: "You won!",
+    InfoActions.OpponentWon: "Opponent won",
+    OutActions.PlaceShips: "Place your ships",
+    OutActions.FinishedPlacing: "Ships placed",
+    OutActions.PlayerTurn: "Your turn",
+    OutActions.OpponentTurn: "Opponent's turn",
+}
+
+# screen rows and columns are 1-based
+Cell = tuple[int, int]
+
+
+class AnsiDisplay:
+    """Draws both boards at the top of a terminal, rewriting changed cells only.
+
+    The rest of the terminal is a scroll region, so prompts and logs scroll
+    below the boards instead of moving them.
+    """
+
+    def __init__(
+        self,
+        output_queue: janus.SyncQueue[OutEvent],
+        stop_running: Event,
+        frame_stats: Optional[FrameStats] = None,
+        stream: TextIO = sys.stdout,
+    ):
+        self._board_size = -1
+        self._out_queue = output_queue
+        self._stop_running = stop_running
+        self._frame_stats = frame_stats or FrameStats(
+            "AnsiDisplay", out_queue=output_queue
+        )
+        self._stream = stream
+
+        self._shooting = False
+        self._status = "Waiting for connection"
+        self._ships_marker_pos = (-1, -1)
+        self._shots_marker_pos = (-1, -1)
+        self._tiles: dict[DisplayBoard, list[list[str]]] = {}
+        self._blinking: dict[tuple[DisplayBoard, int, int], int] = {}
+        # what is currently on the screen, to only send the differences
+        self._shown: dict[Cell, str] = {}
+        self._screen_prepared = False
+
+    def set_board_size(self, size: int):
+        self._board_size = size
+
+    def _init_boards(self) -> None:
+        self._ships_marker_pos = (-1, -1)
+        self._shots_marker_pos = (-1, -1)
+        self._tiles = {
+            board: [[WATER] * self._board_size for _ in range(self._board_size)]
+            for board in (DisplayBoard.Ships, DisplayBoard.Shots)
+        }
+        self._blinking = {}
+        self._shown = {}
+        self._screen_prepared = False
+
+    @property
+    def _height(self) -> int:
+        # status, column numbers, board rows and a bottom border
+        return self._board_size + 4
+
+    def _board_column(self, board: DisplayBoard) -> int:
+        if board == DisplayBoard.Ships:
+            return 1
+        return 1 + 2 * self._board_size + 8
+
+    def _handle_output_event(self, event: OutEvent) -> None:
+        if isinstance(event, ActionEventBatch):
+            for batched_event in event.events:
+                self._handle_output_event(batched_event)
+            return
+
+        if event.action in STATUSES:
+            self._status = STATUSES[event.action]
+
+        match event.action:
+            case InfoActions.PlayerConnected:
+                self._init_boards()
+
+            case OutActions.PlayerTurn:
+                self._shooting = True
+
+            case OutActions.OpponentTurn:
+                self._shooting = False
+
+            case OutActions.FinishedPlacing:
+                self._ships_marker_pos = (-1, -1)
+
+            case OutActions.HoverShots:
+                self._shots_marker_pos = event.tile
+
+            case OutActions.HoverShips:
+                self._ships_marker_pos = event.tile
+
+            case OutActions.BlinkShips | OutActions.BlinkShots:
+                if event.tile is not None and event.board in self._tiles:
+                    x, y = event.tile
+                    self._blinking[(event.board, x, y)] = (
+                        int(time.time() * 1000) + BLINK_DURATION_MS
+                    )
+
+            case _:
+                if (
+                    event.action in GLYPHS
+                    and event.tile is not None
+                    and event.board in self._tiles
+                ):
+                    x, y = event.tile
+                    self._tiles[event.board][y][x] = GLYPHS[event.action]
+
+    def _frame(self) -> dict[Cell, str]:
+        frame: dict[Cell, str] = {(1, 1): f"{self._status:<{STATUS_WIDTH}}"}
+        if len(self._tiles) == 0:
+            return frame
+
+        current_time = int(time.time() * 1000)
+        self._blinking = {
+            key: until for key, until in self._blinking.items() if until > current_time
+        }
+        size = self._board_size
+        markers = {
+            DisplayBoard.Ships: self._ships_marker_pos,
+            DisplayBoard.Shots: (
+                self._shots_marker_pos if self._shooting else (-1, -1)
+            ),
+        }
+        for board, title in (
+            (DisplayBoard.Ships, "SHIPS"),
+            (DisplayBoard.Shots, "ATTACKS"),
+        ):
+            left = self._board_column(board)
+            frame[(2, left)] = f"   {title:<{2 * size}}"
+            frame[(3, left)] = "   " + " ".join(str(n)[-1] for n in range(1, size + 1))
+            frame[(size + 4, left)] = "  " + "—" * (2 * size + 1)
+            marker = markers[board]
+            for y, row in enumerate(self._tiles[board]):
+                frame[(y + 4, left)] = chr(ord("A") + y) + "|"
+                frame[(y + 4, left + 2 * size + 2)] = "|"
+                for x, glyph in enumerate(row):
+                    if (board, x, y) in self._blinking:
+                        text = f"{BLINK_STYLE}{glyph}{RESET}"
+                    elif marker != (-1, -1) and (x == marker[0] or y == marker[1]):
+                        text = f"{REVERSE}{glyph}{RESET}"
+                    else:
+                        text = glyph
+                    frame[(y + 4, left + 2 + 2 * x + 1)] = text
+        return frame
+
+    def _prepare_screen(self) -> str:
+        rows = shutil.get_terminal_size().lines
+        self._screen_prepared = True
+        # clear, keep the boards out of the scroll region, park the cursor below
+        return (
+            f"{ESC}[2J{ESC}[{self._height + 1};{max(rows, self._height + 2)}r"
+            + f"{ESC}[{self._height + 1};1H"
+        )
+
+    def render(self) -> str:
+        """Returns escape sequences updating the screen to the current state"""
+        output = [] if self._screen_prepared else [self._prepare_screen()]
+        frame = self._frame()
+        updates = [
+            f"{ESC}[{row};{column}H{text}"
+            for (row, column), text in frame.items()
+            if self._shown.get((row, column)) != text
+        ]
+        self._shown = frame
+        if len(updates) > 0:
+            # the cursor goes back where the prompt or the logs are
+            output.append(f"{ESC}7" + "".join(updates) + f"{ESC}8")
+        return "".join(output)
+
+    def run(self) -> None:
+        while not self._stop_running.is_set():
+            self.step()
+        self.clear()
+
+    def step(self, timeout: float = 0.1) -> Optional[OutEvent]:
+        """Handles at most one event and draws the changes"""
+        frame_stats = self._frame_stats
+        event: Optional[OutEvent] = None
+        try:
+            event = self._out_queue.get(timeout=timeout)
+            frame_stats.begin_frame()
+            self._handle_output_event(event)
+            frame_stats.event_handled(event)
+        except janus.SyncQueueEmpty:
+            frame_stats.begin_frame()
+        finally:
+            frame_stats.drawing()
+            output = self.render()
+            frame_stats.showing()
+            if len(output) > 0:
+                self._stream.write(output)
+                self._stream.flush()
+            frame_stats.end_frame()
+        if event is not None:
+            tracing.record(event.trace, "rendered")
+        return event
+
+    def clear(self) -> None:
+        # restores the whole screen as the scroll region
+        self._stream.write(f"{ESC}[r")
+        self._stream.flush()
@@ -0,0 +1,124 @@
+import collections
+from typing import Final, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+
+class RGBW(int):
+    """Same as `rpi_ws281x.RGBW`, packed as white, red, green, blue bytes"""
+
+    def __new__(
+        cls,
+        r: int,
+        g: Optional[int] = None,
+        b: Optional[int] = None,
+        w: Optional[int] = None,
+    ):
+        if g is None and b is None and w is None:
+            return int.__new__(cls, r)
+        return int.__new__(
+            cls, ((w or 0) << 24) | (r << 16) | ((g or 0) << 8) | (b or 0)
+        )
+
+    @property
+    def r(self) -> int:
+        return (self >> 16) & 0xFF
+
+    @property
+    def g(self) -> int:
+        return (self >> 8) & 0xFF
+
+    @property
+    def b(self) -> int:
+        return self & 0xFF
+
+    @property
+    def w(self) -> int:
+        return (self >> 24) & 0xFF
+
+
+def Color(red: int, green: int, blue: int, white: int = 0) -> RGBW:
+    return RGBW(red, green, blue, white)
+
+
+class FakePixelStrip:
+    """Drop-in `rpi_ws281x.PixelStrip` keeping the LEDs in memory.
+
+    Every `show()` records a copy of the buffer, so rendering can be tested
+    and benchmarked without a Raspberry Pi.
+    """
+
+    max_recorded_frames: Final = 1000
+
+    def __init__(
+        self,
+        num,
+        pin,
+        freq_hz=800000,
+        dma=10,
+        invert=False,
+        brightness=255,
+        channel=0,
+        strip_type=None,
+        gamma=None,
+    ):
+        self.size = num
+        self.pin = pin
+        self.began = False
+        self.show_count = 0
+        self.frames: collections.deque[npt.NDArray[np.uint32]] = collections.deque(
+            maxlen=self.max_recorded_frames
+        )
+        self._leds = np.zeros(num, dtype=np.uint32)
+        self._brightness = brightness
+        self._gamma = list(range(256)) if gamma is None else gamma
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return self._leds[pos].tolist()
+        return int(self._leds[pos])
+
+    def __setitem__(self, pos, value):
+        self._leds[pos] = value
+
+    def __len__(self):
+        return self.size
+
+    def begin(self):
+        self.began = True
+
+    def show(self):
+        self.show_count += 1
+        self.frames.append(self._leds.copy())
+
+    def setPixelColor(self, n, color):
+        self[n] = color
+
+    def setPixelColorRGB(self, n, red, green, blue, white=0):
+        self.setPixelColor(n, Color(red, green, blue, white))
+
+    def getBrightness(self):
+        return self._brightness
+
+    def setBrightness(self, brightness):
+        self._brightness = brightness
+
+    def setGamma(self, gamma):
+        if type(gamma) is list and len(gamma) == 256:
+            self._gamma = gamma
+
+    def getPixels(self):
+        return self[:]
+
+    def numPixels(self):
+        return self.size
+
+    def getPixelColor(self, n):
+        return self[n]
+
+    def getPixelColorRGB(self, n):
+        return RGBW(self[n])
+
+    def getPixelColorRGBW(self, n):
+        return RGBW(self[n])
@@ -0,0 +1,144 @@
+import collections
+import signal
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Final, Optional
+
+import janus
+from application.io.actions import ActionEvent, OutEvent
+from config import CLIENT_CONFIG, get_logger
+
+logger: Final = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class FrameSample:
+    started_at: float
+    handle_ms: float
+    draw_ms: float
+    show_ms: float
+    events_count: int
+    max_event_lag_ms: float
+    in_queue_depth: int
+    out_queue_depth: int
+
+
+class FrameStats:
+    def __init__(
+        self,
+        name: str,
+        in_queue: Optional[janus.SyncQueue[ActionEvent]] = None,
+        out_queue: Optional[janus.SyncQueue[OutEvent]] = None,
+        size: int = CLIENT_CONFIG.frame_stats_size,
+        print_interval_seconds: Optional[
+            float
+        ] = CLIENT_CONFIG.frame_stats_print_interval_seconds,
+    ) -> None:
+        self.name = name
+        self._in_queue = in_queue
+        self._out_queue = out_queue
+        self._samples: collections.deque[FrameSample] = collections.deque(maxlen=size)
+        self._print_interval = print_interval_seconds
+        self._last_printed_at = time.monotonic()
+
+        self._frame_started_at = 0.0
+        self._handled_at = 0.0
+        self._drawn_at = 0.0
+        self._events_count = 0
+        self._max_event_lag_ms = 0.0
+
+    def begin_frame(self) -> None:
+        self._frame_started_at = time.perf_counter()
+        self._events_count = 0
+        self._max_event_lag_ms = 0.0
+
+    def event_handled(self, event: OutEvent) -> None:
+        self._events_count += 1
+        lag_ms = (time.monotonic_ns() - event.created_ns) / 1e6
+        if lag_ms > self._max_event_lag_ms:
+            self._max_event_lag_ms = lag_ms
+
+    def drawing(self) -> None:
+        self._handled_at = time.perf_counter()
+
+    def showing(self) -> None:
+        self._drawn_at = time.perf_counter()
+
+    def end_frame(self) -> None:
+        shown_at = time.perf_counter()
+        self._samples.append(
+            FrameSample(
+                started_at=self._frame_started_at,
+                handle_ms=(self._handled_at - self._frame_started_at) * 1000,
+                draw_ms=(self._drawn_at - self._handled_at) * 1000,
+                show_ms=(shown_at - self._drawn_at) * 1000,
+                events_count=self._events_count,
+                max_event_lag_ms=self._max_event_lag_ms,
+                in_queue_depth=0 if self._in_queue is None else self._in_queue.qsize(),
+                out_queue_depth=(
+                    0 if self._out_queue is None else self._out_queue.qsize()
+                ),
+            )
+        )
+        if (
+            self._print_interval is not None
+            and time.monotonic() - self._last_printed_at >= self._print_interval
+        ):
+            self._last_printed_at = time.monotonic()
+            logger.info(self.summary())
+
+    @property
+    def samples(self) -> list[FrameSample]:
+        return list(self._samples)
+
+    def summary(self) -> str:
+        samples = self.samples
+        if len(samples) == 0:
+            return f"{self.name}: no frames recorded"
+
+        def describe(values: list[float]) -> str:
+            p95 = values[0]
+            if len(values) > 1:
+                p95 = statistics.quantiles(values, n=20, method="inclusive")[-1]
+            return (
+                f"p50 {statistics.median(values):.2f}"
+                + f" p95 {p95:.2f} max {max(values):.2f}"
+            )
+
+        lines = [
+            f"{self.name}: {len(samples)} frames",
+            f"  handle ms: {describe([s.handle_ms for s in samples])}",
+            f"  draw ms:   {describe([s.draw_ms for s in samples])}",
+            f"  show ms:   {describe([s.show_ms for s in samples])}",
+            f"  event lag ms: {describe([s.max_event_lag_ms for s in samples])}",
+            f"  in queue max depth: {max(s.in_queue_depth for s in samples)}",
+            f"  out queue max depth: {max(s.out_queue_depth for s in samples)}",
+        ]
+        return "\n".join(lines)
+
+    def dump(self) -> str:
+        header = (
+            "started_at,handle_ms,draw_ms,show_ms,events_count,max_event_lag_ms,"
+            + "in_queue_depth,out_queue_depth"
+        )
+        rows = [
+            f"{s.started_at:.6f},{s.handle_ms:.3f},{s.draw_ms:.3f},{s.show_ms:.3f},"
+            + f"{s.events_count},{s.max_event_lag_ms:.3f},"
+            + f"{s.in_queue_depth},{s.out_queue_depth}"
+            for s in self.samples
+        ]
+        return "\n".join([f"# {self.name}", header, *rows])
+
+
+def dump_on_signal(frame_stats: FrameStats, signum: int = signal.SIGUSR1) -> None:
+    """Prints summary and all samples on e.g. `kill -USR1 <client pid>`.
+
+    Must be called from the main thread.
+    """
+
+    def handler(_signum, _frame) -> None:
+        print(frame_stats.summary())
+        print(frame_stats.dump(), flush=True)
+
+    signal.signal(signum, handler)
@@ -1,20 +1,27 @@
 import asyncio
 from threading import Event
-from application.messaging import GameMessage, GameInfo
 import janus
-from typing import Literal, Optional
+from typing import TYPE_CHECKING, Iterable, Literal, Optional
 from threading import Thread
+from application import tracing
+from application.tracing import TraceContext
+from application.io.queues import HoverCoalescingQueue
+from application.io.instrumentation import FrameStats, dump_on_signal
 from application.io.actions import (
     InActions,
     OutActions,
     ActionEvent,
+    ActionEventBatch,
     DisplayBoard,
+    OutEvent,
     InfoActions,
 )
 from domain.field import Field
+from domain.field_masks import FieldMask, board_mask, coastal_zone_mask_of, fields_of
 from domain.boards import ShipsBoard, LaunchedShipCollidesError, get_all_ship_fields
 from domain.ships import (
     MastedShips,
+    ShipStatus,
     ShipBiggerThanAllowedError,
     ShipCountNotConformingError,
 )
@@ -24,27 +31,30 @@ from domain.attacks import (
     AttackResult,
     AttackResultStatus,
     PossibleAttack,
+    UnknownStatus,
 )
-from domain.client.game import Game
 
-from config import CONFIG, get_logger
+from config import CLIENT_CONFIG, CONFIG, get_logger
 
 from domain.ships import Ship
 
-logger = get_logger(__name__)
-
-if CONFIG.mode == "pygame":
+if TYPE_CHECKING:
+    # loaded by the client only after the display has come up, see client_boot.py
+    from application.messaging import GameMessage, GameInfo
+    from domain.client.game import Game
     from application.io.pg_io import IO as pg_IO
-
-elif CONFIG.mode == "rgbled":
     from application.io.led_display import Display
     from application.io.rpi_input import Rpi_Input
+    from application.io.scripted_input import ScriptedInput
+    from application.io.ansi_display import AnsiDisplay
+
+logger = get_logger(__name__)
 
 
 class IO:
     def __init__(self):
         self._in_queue: janus.Queue[ActionEvent] = None
-        self._out_queue: janus.Queue[ActionEvent] = None
+        self._out_queue: janus.Queue[OutEvent] = None
         self._stop = Event()
 
         self._board_size: int = 0
@@ -53,13 +63,16 @@ class IO:
         self._opponent_ready = False
 
         if CONFIG.mode == "pygame":
-            self._io: pg_IO = None
+            self._io: "pg_IO" = None
             self._io_t: Thread = None
         elif CONFIG.mode == "rgbled":
-            self._display: Display = None
+            self._display: "Display" = None
             self._out_t: Thread = None
-            self._input: Rpi_Input = None
+            self._input: "Rpi_Input | ScriptedInput" = None
             self._in_t: Thread = None
+        elif CONFIG.mode == "terminal":
+            self._ansi_display: Optional["AnsiDisplay"] = None
+            self._out_t: Optional[Thread] = None
 
     def get_valid_tile(self, field: Field) -> Optional[tuple[int, int]]:
         y, x = field.vector_from_zeros
@@ -70,13 +83,35 @@ class IO:
         return x, y
 
     async def get_in_action(self) -> ActionEvent:
-        return await self._in_queue.async_q.get()
+        event = await self._in_queue.async_q.get()
+        tracing.stamp(event.trace, "io_dequeued")
+        return event
 
     async def put_out_action(self, event: ActionEvent) -> None:
-        if CONFIG.mode == "terminal":
+        if self._out_queue is None:
+            # terminal mode printing whole boards as text
             return
         await self._out_queue.async_q.put(event)
 
+    async def put_out_actions(
+        self, events: list[ActionEvent], trace: Optional[TraceContext] = None
+    ) -> None:
+        if self._out_queue is None or len(events) == 0:
+            return
+        await self._out_queue.async_q.put(ActionEventBatch(tuple(events), trace))
+
+    def _fields_on_board(self, mask: FieldMask) -> set[Field]:
+        return fields_of(mask & board_mask(self._board_size))
+
+    def _events_of_fields(
+        self, action: OutActions, fields: Iterable[Field], board: DisplayBoard
+    ) -> list[ActionEvent]:
+        events: list[ActionEvent] = []
+        for field in sorted(fields):
+            if tile := self.get_valid_tile(field):
+                events.append(ActionEvent(action, tile, board))
+        return events
+
     async def get_masted_ships(self) -> Optional[MastedShips]:
 
         await self.put_out_action(ActionEvent(OutActions.PlaceShips))
@@ -120,13 +155,13 @@ class IO:
                         masted_ships = MastedShips.from_set(ships, self._masted_counts)
                     except ShipBiggerThanAllowedError as ex:
                         logger.debug(f"Ship bigger than allowed: {ex.ship}")
-                        for field in ex.ship.fields:
-                            if tile := self.get_valid_tile(field):
-                                await self.put_out_action(
-                                    ActionEvent(
-                                        OutActions.BlinkShips, tile, DisplayBoard.Ships
-                                    )
-                                )
+                        await self.put_out_actions(
+                            self._events_of_fields(
+                                OutActions.BlinkShips,
+                                ex.ship.fields,
+                                DisplayBoard.Ships,
+                            )
+                        )
                         continue
                     except ShipCountNotConformingError as ex:
                         logger.debug(f"Wrong ship count: {ex.ships}")
@@ -140,29 +175,26 @@ class IO:
                                 )
                             )
                             continue
-                        for ship in ex.ships:
-                            for field in ship.fields:
-                                if tile := self.get_valid_tile(field):
-                                    await self.put_out_action(
-                                        ActionEvent(
-                                            OutActions.BlinkShips,
-                                            tile,
-                                            DisplayBoard.Ships,
-                                        )
-                                    )
+                        await self.put_out_actions(
+                            self._events_of_fields(
+                                OutActions.BlinkShips,
+                                [field for ship in ex.ships for field in ship.fields],
+                                DisplayBoard.Ships,
+                            )
+                        )
                         continue
 
                     try:
                         test_board.add_ships(masted_ships)
                     except LaunchedShipCollidesError as ex:
                         logger.debug(f"Colliding fields: {ex.colliding_fields}")
-                        for field in ex.colliding_fields:
-                            if tile := self.get_valid_tile(field):
-                                await self.put_out_action(
-                                    ActionEvent(
-                                        OutActions.BlinkShips, tile, DisplayBoard.Ships
-                                    )
-                                )
+                        await self.put_out_actions(
+                            self._events_of_fields(
+                                OutActions.BlinkShips,
+                                ex.colliding_fields,
+                                DisplayBoard.Ships,
+                            )
+                        )
                         masted_ships = None
                         continue
 
@@ -175,10 +207,80 @@ class IO:
         await self.put_out_action(ActionEvent(OutActions.FinishedPlacing))
         return masted_ships
 
-    async def get_possible_or_real_attack(self) -> Optional[tuple[Field, bool]]:
+    async def show_placed_ships(self, masted_ships: MastedShips) -> None:
+        """For ships not placed by get_masted_ships, i.e. in terminal mode"""
+        ships = [
+            *masted_ships.single,
+            *masted_ships.two,
+            *masted_ships.three,
+            *masted_ships.four,
+        ]
+        await self.put_out_actions(
+            self._events_of_fields(
+                OutActions.Ship,
+                [field for ship in ships for field in ship.fields],
+                DisplayBoard.Ships,
+            )
+        )
+        await self.put_out_action(ActionEvent(OutActions.FinishedPlacing))
+
+    async def show_resumed_game(self, game: "Game") -> None:
+        """Redraws both boards of a game resumed after reconnecting"""
+        events: list[ActionEvent] = []
+        for ship in game.ships:
+            if ship.status == ShipStatus.Wrecked:
+                events += self._events_of_fields(
+                    OutActions.DestroyedShips, ship.fields, DisplayBoard.Ships
+                ) + self._events_of_fields(
+                    OutActions.AroundDestroyedShips,
+                    self._fields_on_board(ship.coastal_zone_mask),
+                    DisplayBoard.Ships,
+                )
+                continue
+            events += self._events_of_fields(
+                OutActions.Ship, ship.waving_masts, DisplayBoard.Ships
+            ) + self._events_of_fields(
+                OutActions.HitShips, ship.wrecked_masts, DisplayBoard.Ships
+            )
+        events += self._events_of_fields(
+            OutActions.MissShips, game.opponent_missed_fields, DisplayBoard.Ships
+        )
+
+        shots_actions: dict[AttackResultStatus | UnknownStatus, OutActions] = {
+            "Unknown": OutActions.UnknownShots,
+            AttackResultStatus.Missed: OutActions.MissShots,
+            AttackResultStatus.Shot: OutActions.HitShots,
+            AttackResultStatus.AlreadyShot: OutActions.HitShots,
+            AttackResultStatus.ShotDown: OutActions.HitShots,
+        }
+        for field, status in game.attacks.items():
+            events += self._events_of_fields(
+                shots_actions[status], [field], DisplayBoard.Shots
+            )
+        for ship in game.ships_shot_down:
+            events += self._events_of_fields(
+                OutActions.DestroyedShots, ship.fields, DisplayBoard.Shots
+            ) + self._events_of_fields(
+                OutActions.AroundDestroyedShots,
+                self._fields_on_board(ship.coastal_zone_mask),
+                DisplayBoard.Shots,
+            )
+
+        await self.put_out_actions(events)
+        await self.put_out_action(ActionEvent(OutActions.FinishedPlacing))
+
+    async def player_turn(self) -> None:
         await self.put_out_action(ActionEvent(OutActions.PlayerTurn))
 
-        ret: Optional[tuple[Field, bool]] = None
+    async def opponent_turn(self) -> None:
+        await self.put_out_action(ActionEvent(OutActions.OpponentTurn))
+
+    async def get_possible_or_real_attack(
+        self,
+    ) -> Optional[tuple[Field, bool, Optional[TraceContext]]]:
+        await self.player_turn()
+
+        ret: Optional[tuple[Field, bool, Optional[TraceContext]]] = None
         event: Optional[ActionEvent] = None
 
         while not self._stop.is_set():
@@ -192,20 +294,23 @@ class IO:
                 await self.put_out_action(
                     ActionEvent(OutActions.HoverShots, event.tile, DisplayBoard.Shots)
                 )
-                ret = event.field, False
+                ret = event.field, False, None
                 break
 
             if event.action == InActions.Select:
                 await self.put_out_action(
                     ActionEvent(OutActions.UnknownShots, event.tile, DisplayBoard.Shots)
                 )
-                await self.put_out_action(ActionEvent(OutActions.OpponentTurn))
-                ret = event.field, True
+                await self.opponent_turn()
+                tracing.stamp(event.trace, "io_returned")
+                ret = event.field, True, event.trace
                 break
 
         return ret
 
-    async def player_attack_result(self, result: AttackResult, game: Game) -> None:
+    async def player_attack_result(
+        self, result: AttackResult, game: "Game", trace: Optional[TraceContext] = None
+    ) -> None:
         action: OutActions = {
             AttackResultStatus.Missed: OutActions.MissShots,
             AttackResultStatus.Shot: OutActions.HitShots,
@@ -217,23 +322,25 @@ class IO:
             destroyed_fields = get_all_ship_fields(
                 game.attacked_fields, result.field, game.shot_fields
             )
-            destroyed_ship = Ship(destroyed_fields)
-            for field in destroyed_ship.fields:
-                if tile := self.get_valid_tile(field):
-                    await self.put_out_action(
-                        ActionEvent(OutActions.DestroyedShots, tile, DisplayBoard.Shots)
-                    )
-            for field in destroyed_ship.coastal_zone:
-                if tile := self.get_valid_tile(field):
-                    await self.put_out_action(
-                        ActionEvent(
-                            OutActions.AroundDestroyedShots, tile, DisplayBoard.Shots
-                        )
-                    )
+            await self.put_out_actions(
+                self._events_of_fields(
+                    OutActions.DestroyedShots, destroyed_fields, DisplayBoard.Shots
+                )
+                + self._events_of_fields(
+                    OutActions.AroundDestroyedShots,
+                    self._fields_on_board(coastal_zone_mask_of(destroyed_fields)),
+                    DisplayBoard.Shots,
+                ),
+                trace,
+            )
         elif tile := self.get_valid_tile(result.field):
-            await self.put_out_action(ActionEvent(action, tile, DisplayBoard.Shots))
+            await self.put_out_action(
+                ActionEvent(action, tile, DisplayBoard.Shots, trace)
+            )
 
-    async def opponent_attack_result(self, result: AttackResult, game: Game) -> None:
+    async def opponent_attack_result(
+        self, result: AttackResult, game: "Game", trace: Optional[TraceContext] = None
+    ) -> None:
         action: OutActions = {
             AttackResultStatus.Missed: OutActions.MissShips,
             AttackResultStatus.Shot: OutActions.HitShips,
@@ -248,20 +355,21 @@ class IO:
                     continue
                 destroyed_ship = ship
                 break
-            for field in destroyed_ship.fields:
-                if tile := self.get_valid_tile(field):
-                    await self.put_out_action(
-                        ActionEvent(OutActions.DestroyedShips, tile, DisplayBoard.Ships)
-                    )
-            for field in destroyed_ship.coastal_zone:
-                if tile := self.get_valid_tile(field):
-                    await self.put_out_action(
-                        ActionEvent(
-                            OutActions.AroundDestroyedShips, tile, DisplayBoard.Ships
-                        )
-                    )
+            await self.put_out_actions(
+                self._events_of_fields(
+                    OutActions.DestroyedShips, destroyed_ship.fields, DisplayBoard.Ships
+                )
+                + self._events_of_fields(
+                    OutActions.AroundDestroyedShips,
+                    self._fields_on_board(destroyed_ship.coastal_zone_mask),
+                    DisplayBoard.Ships,
+                ),
+                trace,
+            )
         elif tile := self.get_valid_tile(result.field):
-            await self.put_out_action(ActionEvent(action, tile, DisplayBoard.Ships))
+            await self.put_out_action(
+                ActionEvent(action, tile, DisplayBoard.Ships, trace)
+            )
 
     async def opponent_possible_attack(self, possible_atack: PossibleAttack) -> None:
         if tile := self.get_valid_tile(possible_atack.field):
@@ -270,32 +378,70 @@ class IO:
             )
 
     async def handle_messages(
-        self, message: GameMessage, game: Game, result: Optional[GameMessage]
+        self, message: "GameMessage", game: "Game", result: Optional["GameMessage"]
     ) -> None:
         match message.data.type_:
             case AttackResult.type_:
-                await self.player_attack_result(message.data, game)
+                await self.player_attack_result(message.data, game, message.trace)
             case AttackRequest.type_:
-                await self.opponent_attack_result(result.data, game)
+                await self.opponent_attack_result(result.data, game, result.trace)
             case PossibleAttack.type_:
                 await self.opponent_possible_attack(message.data)
             case _:
                 raise ValueError()
 
     def begin(self) -> None:
-        self._in_queue = janus.Queue()
+        if CONFIG.mode == "terminal" and CLIENT_CONFIG.terminal_renderer == "text":
+            return
+
+        self._in_queue = HoverCoalescingQueue()
         self._out_queue = janus.Queue()
+        frame_stats = FrameStats(
+            f"{CONFIG.mode} IO",
+            in_queue=self._in_queue.sync_q,
+            out_queue=self._out_queue.sync_q,
+        )
+        dump_on_signal(frame_stats)
 
         if CONFIG.mode == "pygame":
-            self._io = pg_IO(self._in_queue.sync_q, self._out_queue.sync_q, self._stop)
+            from application.io.pg_io import IO as pg_IO
+
+            self._io = pg_IO(
+                self._in_queue.sync_q, self._out_queue.sync_q, self._stop, frame_stats
+            )
             self._io_t = Thread(target=self._io.run)
             self._io_t.start()
         elif CONFIG.mode == "rgbled":
-            self._display = Display(self._out_queue.sync_q, self._stop)
-            self._input = Rpi_Input(self._in_queue.sync_q, self._stop)
-            self._in_t = Thread(target=self._input.run)
+            from application.io.led_display import Display, cycle_brightness_on_signal
+
+            self._display = Display(self._out_queue.sync_q, self._stop, frame_stats)
+            cycle_brightness_on_signal(self._display)
             self._out_t = Thread(target=self._display.run)
+            self._out_t.start()
+
+            if CLIENT_CONFIG.led_backend == "fake":
+                from application.io.scripted_input import ScriptedInput, read_script
+
+                script_path = CLIENT_CONFIG.input_script_path
+                self._input = ScriptedInput(
+                    self._in_queue.sync_q,
+                    self._stop,
+                    read_script(script_path) if script_path is not None else (),
+                )
+            else:
+                # gpiozero is imported only once the matrices are already animating
+                from application.io.rpi_input import Rpi_Input
+
+                self._input = Rpi_Input(self._in_queue.sync_q, self._stop)
+            self._in_t = Thread(target=self._input.run)
             self._in_t.start()
+        elif CONFIG.mode == "terminal":
+            from application.io.ansi_display import AnsiDisplay
+
+            self._ansi_display = AnsiDisplay(
+                self._out_queue.sync_q, self._stop, frame_stats
+            )
+            self._out_t = Thread(target=self._ansi_display.run)
             self._out_t.start()
         else:
             raise NotImplementedError(
@@ -315,6 +461,8 @@ class IO:
         elif CONFIG.mode == "rgbled":
             self._display.set_board_size(board_size)
             self._input.set_board_size(board_size)
+        elif CONFIG.mode == "terminal" and self._ansi_display is not None:
+            self._ansi_display.set_board_size(board_size)
 
         logger.debug(InfoActions.PlayerConnected)
         await self.put_out_action(ActionEvent(InfoActions.PlayerConnected))
@@ -323,7 +471,7 @@ class IO:
         logger.debug(InfoActions.PlayerDisconnected)
         await self.put_out_action(ActionEvent(InfoActions.PlayerDisconnected))
 
-    async def react_to(self, game_info: GameInfo) -> None:
+    async def react_to(self, game_info: "GameInfo") -> None:
         if game_info.opponent is None:
             return
         if game_info.opponent.connected and not self._opponent_connected:
@@ -354,6 +502,8 @@ class IO:
         elif CONFIG.mode == "rgbled":
             self._in_t.join()
             self._out_t.join()
+        elif CONFIG.mode == "terminal" and self._out_t is not None:
+            self._out_t.join()
 
         self.clear()
 
@@ -0,0 +1,24 @@
+"""LED strip implementation driven by the rgbled mode.
+
+Without rpi_ws281x, e.g. off a Raspberry Pi, the LEDs are simulated.
+"""
+
+from typing import Final
+
+from application.io.fake_led import FakePixelStrip
+from config import CLIENT_CONFIG, get_logger
+
+logger: Final = get_logger(__name__)
+
+try:
+    from rpi_ws281x import Color, PixelStrip, RGBW
+except ImportError:
+    from application.io.fake_led import Color, RGBW  # noqa: F401
+
+    PixelStrip = FakePixelStrip
+    if CLIENT_CONFIG.led_backend == "rpi_ws281x":
+        logger.warning("rpi_ws281x is not installed, LEDs are simulated")
+
+DEFAULT_BACKEND: Final[type[PixelStrip]] = (
+    FakePixelStrip if CLIENT_CONFIG.led_backend == "fake" else PixelStrip
+)
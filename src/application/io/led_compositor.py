@@ -0,0 +1,139 @@
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+# (rows, columns, channels) with r, g, b, w channels
+Layer = npt.NDArray[np.uint8]
+StripColors = npt.NDArray[np.uint32]
+
+
+def channels_of(color: int) -> npt.NDArray[np.uint8]:
+    return np.array(
+        [(color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF, (color >> 24) & 0xFF],
+        dtype=np.uint8,
+    )
+
+
+def pack(layer: Layer) -> npt.NDArray[np.uint32]:
+    """Packs channels the same way as `rpi_ws281x.Color`"""
+    channels = layer.astype(np.uint32)
+    return (
+        (channels[..., 3] << 24)
+        | (channels[..., 0] << 16)
+        | (channels[..., 1] << 8)
+        | channels[..., 2]
+    )
+
+
+def lerp(layer: Layer, color: npt.NDArray[np.uint8], p: float) -> Layer:
+    base = layer.astype(np.int16)
+    # truncated towards zero as int() does
+    step = ((color.astype(np.int16) - base) * p).astype(np.int16)
+    return (base + step).astype(np.uint8)
+
+
+def gamma_table(gamma: float) -> npt.NDArray[np.float64]:
+    return 255 * (np.arange(256) / 255) ** gamma
+
+
+class ColorCorrection:
+    """Gamma and brightness lookup table applied to packed colors.
+
+    Applied to bytes of the packed colors, so it corrects all channels at
+    once. Changing brightness only recomputes the table of 256 values.
+    """
+
+    def __init__(self, gamma: float, brightness: int) -> None:
+        self._gamma = gamma_table(gamma)
+        self.set_brightness(brightness)
+
+    def set_brightness(self, brightness: int) -> None:
+        if not 0 <= brightness <= 255:
+            raise ValueError(f"Brightness must be in 0..255, provided: {brightness}")
+        lut = np.rint(self._gamma * brightness / 255).astype(np.uint8)
+        if brightness > 0:
+            # dim colors would turn off entirely, keep them barely lit instead
+            lut[1:] = np.maximum(lut[1:], 1)
+        # swapped as a whole, so render threads never see a half-built table
+        self._lut = lut
+        self.brightness = brightness
+
+    def correct(self, colors: StripColors) -> StripColors:
+        return self._lut[colors.view(np.uint8)].view(np.uint32)
+
+
+class Compositor:
+    """Composes the board of a LED matrix from its layers.
+
+    Tiles, blinks, marker highlight and border are kept as arrays, so
+    composing a frame costs the same however many of them are lit.
+    """
+
+    def __init__(
+        self,
+        matrix_size: tuple[int, int],
+        strip_order: npt.NDArray[np.intp],
+        marker_center: int,
+        marker_axis: int,
+        marker_lerp: float = 0.1,
+    ) -> None:
+        self._cols, self._rows = matrix_size
+        # frame pixels taken in order of the LEDs on the strip
+        self._strip_order = strip_order
+        self._marker_center = channels_of(marker_center)
+        self._marker_axis = channels_of(marker_axis)
+        self._marker_lerp = marker_lerp
+        self._frame: Layer = np.zeros((self._rows, self._cols, 4), dtype=np.uint8)
+        self.set_board(0, 0)
+
+    def set_board(self, size: int, water: int) -> None:
+        self._size = size
+        self._off = ((self._cols - size) // 2, (self._rows - size) // 2)
+        self._tiles: Layer = np.empty((size, size, 4), dtype=np.uint8)
+        self._tiles[:] = channels_of(water)
+        self._blink_colors: Layer = np.zeros((size, size, 4), dtype=np.uint8)
+        self._blink_until_ms = np.zeros((size, size), dtype=np.int64)
+        self._border_blink: Optional[tuple[npt.NDArray[np.uint8], int]] = None
+
+    def change_tile(self, pos: tuple[int, int], color: int) -> None:
+        self._tiles[pos[1], pos[0]] = channels_of(color)
+
+    def blink_tile(self, pos: tuple[int, int], color: int, until_ms: int) -> None:
+        self._blink_colors[pos[1], pos[0]] = channels_of(color)
+        self._blink_until_ms[pos[1], pos[0]] = until_ms
+
+    def blink_border(self, color: int, until_ms: int) -> None:
+        self._border_blink = (channels_of(color), until_ms)
+
+    def compose(self, marker: tuple[int, int], border: int, now_ms: int) -> StripColors:
+        frame = self._frame
+        frame[:] = 0
+        size = self._size
+        x0, y0 = self._off
+
+        border_color = channels_of(border)
+        if self._border_blink is not None:
+            if now_ms < self._border_blink[1]:
+                border_color = self._border_blink[0]
+            else:
+                self._border_blink = None
+        frame[max(y0 - 1, 0) : y0 + size + 1, max(x0 - 1, 0) : x0 + size + 1] = (
+            border_color
+        )
+
+        board = self._tiles
+        if marker != (-1, -1):
+            x, y = marker
+            board = board.copy()
+            board[:, x] = lerp(self._tiles[:, x], self._marker_axis, self._marker_lerp)
+            board[y, :] = lerp(self._tiles[y, :], self._marker_axis, self._marker_lerp)
+            board[y, x] = lerp(
+                self._tiles[y, x], self._marker_center, self._marker_lerp
+            )
+
+        blinking = self._blink_until_ms > now_ms
+        frame[y0 : y0 + size, x0 : x0 + size] = np.where(
+            blinking[..., np.newaxis], self._blink_colors, board
+        )
+        return pack(frame).reshape(-1)[self._strip_order]
@@ -1,13 +1,26 @@
+from application.io.fake_led import FakePixelStrip
+from application.io.led_compositor import ColorCorrection, Compositor
 from application.io.led_matrix import LED_Matrix
-from rpi_ws281x import Color, RGBW
+from application.io.led_backend import DEFAULT_BACKEND, Color, PixelStrip, RGBW
 import janus
 import enum
-from typing import Final, Optional
-from application.io.actions import OutActions, InfoActions, ActionEvent, DisplayBoard
+import signal
+import numpy as np
+from typing import Final, Optional, Sequence
+from application.io.actions import (
+    OutActions,
+    InfoActions,
+    ActionEvent,
+    ActionEventBatch,
+    DisplayBoard,
+    OutEvent,
+)
 from threading import Event
 import time
 from dataclasses import dataclass
 from application.io.led_img import Animation
+from application import tracing
+from application.io.instrumentation import FrameStats
 
 
 class ExtraColors(enum.StrEnum):
@@ -26,6 +39,9 @@ class LEDConfig:
     shots_matrix_pin: int
     ships_matrix_pin: int
     matrix_brightness: int
+    # cycled through on SIGUSR2, e.g. to dim the matrices at night
+    matrix_brightness_levels: tuple[int, ...]
+    matrix_gamma: float
     blink_duration_ms: int
     color_map: dict[OutActions | ExtraColors, RGBW]
     wait_for_connect_anim: Animation
@@ -39,6 +55,8 @@ LED_CONFIG: Final = LEDConfig(
     shots_matrix_pin=13,
     ships_matrix_pin=18,
     matrix_brightness=20,
+    matrix_brightness_levels=(20, 6, 60),
+    matrix_gamma=2.8,
     blink_duration_ms=500,
     color_map={
         OutActions.UnknownShots: Color(127, 0, 127),
@@ -68,10 +86,17 @@ LED_CONFIG: Final = LEDConfig(
 
 class Display:
 
-    def __init__(self, output_queue: janus.SyncQueue[ActionEvent], stop_running: Event):
+    def __init__(
+        self,
+        output_queue: janus.SyncQueue[OutEvent],
+        stop_running: Event,
+        frame_stats: Optional[FrameStats] = None,
+        backend: type[PixelStrip] = DEFAULT_BACKEND,
+    ):
         self._board_size = -1
         self._out_queue = output_queue
         self._stop_running = stop_running
+        self._frame_stats = frame_stats or FrameStats("Display", out_queue=output_queue)
 
         self._shooting = False
         self._place_ships = False
@@ -79,13 +104,32 @@ class Display:
         self._ships_marker_pos = (0, 0)
         self._shots_marker_pos = (-1, -1)
 
-        self._shots_led_board: LED_Board = LED_Board(LED_CONFIG.shots_matrix_pin)
-        time.sleep(0.5)
-        self._ships_led_board: LED_Board = LED_Board(LED_CONFIG.ships_matrix_pin)
+        self._color_correction = ColorCorrection(
+            LED_CONFIG.matrix_gamma, LED_CONFIG.matrix_brightness
+        )
+        self._shots_led_board: LED_Board = LED_Board(
+            LED_CONFIG.shots_matrix_pin, self._color_correction, backend
+        )
+        if backend is not FakePixelStrip:
+            time.sleep(0.5)
+        self._ships_led_board: LED_Board = LED_Board(
+            LED_CONFIG.ships_matrix_pin, self._color_correction, backend
+        )
 
     def set_board_size(self, size: int):
         self._board_size = size
 
+    def set_brightness(self, brightness: int) -> None:
+        """Takes effect at the next frame, may be called from any thread"""
+        self._color_correction.set_brightness(brightness)
+
+    def cycle_brightness(self) -> int:
+        levels = LED_CONFIG.matrix_brightness_levels
+        current = self._color_correction.brightness
+        next_i = (levels.index(current) + 1) % len(levels) if current in levels else 0
+        self.set_brightness(levels[next_i])
+        return levels[next_i]
+
     def _init_boards(self) -> None:
         self._ships_marker_pos = (0, 0)
         self._ships_led_board.set_size(self._board_size)
@@ -120,7 +164,11 @@ class Display:
         elif event.board == DisplayBoard.Ships:
             self._ships_led_board.change_cell(event.tile, color)
 
-    def _handle_output_event(self, event: ActionEvent) -> None:
+    def _handle_output_event(self, event: OutEvent) -> None:
+        if isinstance(event, ActionEventBatch):
+            for batched_event in event.events:
+                self._handle_output_event(batched_event)
+            return
 
         match event.action:
             case InfoActions.PlayerConnected:
@@ -171,30 +219,60 @@ class Display:
             case _:
                 self._color_event(event)
 
-    def run(self) -> None:
+    def load_animations(self) -> None:
         LED_CONFIG.wait_for_connect_anim.load(*LED_CONFIG.matrix_size)
         LED_CONFIG.disconnected_anim.load(*LED_CONFIG.matrix_size)
         LED_CONFIG.won_anim.load(*LED_CONFIG.matrix_size)
         LED_CONFIG.lost_anim.load(*LED_CONFIG.matrix_size)
 
+    def run(self) -> None:
+        self.load_animations()
         while not self._stop_running.is_set():
-            try:
-                event = self._out_queue.get(timeout=0.1)
-                self._handle_output_event(event)
-            except janus.SyncQueueEmpty:
-                pass
-            finally:
-                self._ships_led_board.draw(self._ships_marker_pos)
-                self._shots_led_board.draw(
-                    self._shots_marker_pos if self._shooting else (-1, -1)
-                )
+            self.step()
         self.clear()
 
+    def step(self, timeout: float = 0.1) -> Optional[OutEvent]:
+        """Handles at most one event and renders a frame"""
+        frame_stats = self._frame_stats
+        event: Optional[OutEvent] = None
+        try:
+            event = self._out_queue.get(timeout=timeout)
+            frame_stats.begin_frame()
+            self._handle_output_event(event)
+            frame_stats.event_handled(event)
+        except janus.SyncQueueEmpty:
+            frame_stats.begin_frame()
+        finally:
+            frame_stats.drawing()
+            self._ships_led_board.render(self._ships_marker_pos)
+            self._shots_led_board.render(
+                self._shots_marker_pos if self._shooting else (-1, -1)
+            )
+            frame_stats.showing()
+            self._ships_led_board.show()
+            self._shots_led_board.show()
+            frame_stats.end_frame()
+        if event is not None:
+            tracing.record(event.trace, "rendered")
+        return event
+
     def clear(self) -> None:
         self._ships_led_board.clear()
         self._shots_led_board.clear()
 
 
+def cycle_brightness_on_signal(display: Display, signum: int = signal.SIGUSR2) -> None:
+    """Switches to the next of brightness levels on e.g. `kill -USR2 <client pid>`.
+
+    Must be called from the main thread.
+    """
+
+    def handler(_signum, _frame) -> None:
+        display.cycle_brightness()
+
+    signal.signal(signum, handler)
+
+
 class LED_Board:
     class Mode(enum.Enum):
         WAIT_FOR_CONNECT = 0
@@ -203,13 +281,12 @@ class LED_Board:
         WON = 3
         LOST = 4
 
-    class BlinkingTile:
-        def __init__(self, x, y, color):
-            self.x: int = x
-            self.y: int = y
-            self.color: RGBW = color
-
-    def __init__(self, pin: int):
+    def __init__(
+        self,
+        pin: int,
+        color_correction: ColorCorrection,
+        backend: type[PixelStrip] = DEFAULT_BACKEND,
+    ):
         self._size = -1
         self._mode: LED_Board.Mode = LED_Board.Mode.WAIT_FOR_CONNECT
         self._player_ready = False
@@ -222,13 +299,23 @@ class LED_Board:
             num_cols=LED_CONFIG.matrix_size[0],
             num_rows=LED_CONFIG.matrix_size[1],
             pin=pin,
-            brightness=LED_CONFIG.matrix_brightness,
+            # brightness and gamma are applied by color_correction
+            brightness=255,
             channel=channel,
+            backend=backend,
         )
+        self._color_correction = color_correction
         self._led_matrix.begin()
         self._led_matrix.clear()
         self._led_matrix.show()
 
+        self._compositor = Compositor(
+            LED_CONFIG.matrix_size,
+            self._led_matrix.stripOrder(),
+            marker_center=LED_CONFIG.color_map[ExtraColors.MarkerCenter],
+            marker_axis=LED_CONFIG.color_map[ExtraColors.MarkerAxis],
+        )
+
     def clear(self) -> None:
         self._led_matrix.clear()
         self._led_matrix.show()
@@ -239,13 +326,7 @@ class LED_Board:
     def set_size(self, board_size: int) -> None:
         self._player_ready = False
         self._size = board_size
-        self._tiles: list[list[RGBW]] = [
-            [LED_CONFIG.color_map[ExtraColors.Water] for x in range(self._size)]
-            for y in range(self._size)
-        ]
-        self._blinking_tiles: dict[LED_Board.BlinkingTile, int] = dict()
-        self._blinking_border: Optional[tuple[RGBW, int]] = None
-        self._off = (int((16 - self._size) // 2), int((16 - self._size) // 2))
+        self._compositor.set_board(board_size, LED_CONFIG.color_map[ExtraColors.Water])
         self.draw((-1, -1))
 
     def set_mode(self, mode: Mode) -> None:
@@ -254,54 +335,30 @@ class LED_Board:
     def set_ready(self, ready: bool) -> None:
         self._player_ready = ready
 
-    def _draw_border(self) -> None:
-        if self._blinking_border:
-            color = self._blinking_border[0]
-        elif self._player_ready:
-            color = LED_CONFIG.color_map[ExtraColors.BoardBorderReady]
-        else:
-            color = LED_CONFIG.color_map[ExtraColors.BoardBorderNotReady]
-
-        for x in range(self._size + 2):
-            self._led_matrix.setMatrixPixelColor(
-                (x + self._off[0] - 1, self._off[1] - 1), color
-            )
-            self._led_matrix.setMatrixPixelColor(
-                (x + self._off[0] - 1, self._off[1] + self._size), color
-            )
-
-        for y in range(self._size + 2):
-            self._led_matrix.setMatrixPixelColor(
-                (self._off[0] - 1, y + self._off[1] - 1), color
-            )
-            self._led_matrix.setMatrixPixelColor(
-                (self._off[0] + self._size, y + self._off[1] - 1), color
-            )
-
-    def _lerp(c1: RGBW, c2: RGBW, p: float) -> RGBW:
-        return Color(
-            c1.r + int((c2.r - c1.r) * p),
-            c1.g + int((c2.g - c1.g) * p),
-            c1.b + int((c2.b - c1.b) * p),
-            c1.w + int((c2.w - c1.w) * p),
-        )
+    def _border_color(self) -> RGBW:
+        if self._player_ready:
+            return LED_CONFIG.color_map[ExtraColors.BoardBorderReady]
+        return LED_CONFIG.color_map[ExtraColors.BoardBorderNotReady]
 
     def change_cell(self, pos: tuple[int, int], color: RGBW) -> None:
-        self._tiles[pos[1]][pos[0]] = color
+        self._compositor.change_tile(pos, color)
 
     def blink_cell(self, pos: tuple[int, int], color: RGBW) -> None:
         current_time = int(time.time() * 1000)
-        self._blinking_tiles[LED_Board.BlinkingTile(pos[0], pos[1], color)] = (
-            current_time
+        self._compositor.blink_tile(
+            pos, color, current_time + LED_CONFIG.blink_duration_ms
         )
 
     def blink_border(self, color: RGBW) -> None:
         current_time = int(time.time() * 1000)
-        self._blinking_border = (color, current_time)
+        self._compositor.blink_border(
+            color, current_time + LED_CONFIG.blink_duration_ms
+        )
 
-    def draw_img(self, img: list[RGBW]) -> None:
-        for n, c in enumerate(img):
-            self._led_matrix[n] = c
+    def draw_img(self, img: Sequence[int]) -> None:
+        self._led_matrix.setPixels(
+            self._color_correction.correct(np.asarray(img, dtype=np.uint32))
+        )
 
     def _draw_wait_for_connect(self) -> None:
         # self._led_matrix.clear(Color(0, 0, 127))
@@ -320,49 +377,21 @@ class LED_Board:
         self.draw_img(LED_CONFIG.lost_anim.get_current_frame())
 
     def _draw_normal(self, marker: tuple[int, int]) -> None:
-        self._draw_border()
-        for y in range(self._size):
-            for x in range(self._size):
-                draw_color: RGBW = self._tiles[y][x]
-                if marker != (-1, -1):
-                    row_match = x == marker[0]
-                    col_match = y == marker[1]
-                    if row_match and col_match:
-                        draw_color = LED_Board._lerp(
-                            draw_color,
-                            LED_CONFIG.color_map[ExtraColors.MarkerCenter],
-                            0.1,
-                        )
-                    elif row_match or col_match:
-                        draw_color = LED_Board._lerp(
-                            draw_color,
-                            LED_CONFIG.color_map[ExtraColors.MarkerAxis],
-                            0.1,
-                        )
-                self._led_matrix.setMatrixPixelColor(
-                    (x + self._off[0], y + self._off[1]), draw_color
-                )
-
         current_time = int(time.time() * 1000)
-        self._blinking_tiles = {
-            tile: start_time
-            for tile, start_time in self._blinking_tiles.items()
-            if current_time - start_time < LED_CONFIG.blink_duration_ms
-        }
-
-        for tile in self._blinking_tiles:
-            self._led_matrix.setMatrixPixelColor(
-                (tile.x + self._off[0], tile.y + self._off[1]), tile.color
+        self._led_matrix.setPixels(
+            self._color_correction.correct(
+                self._compositor.compose(marker, self._border_color(), current_time)
             )
+        )
 
-        if (
-            self._blinking_border
-            and current_time - self._blinking_border[1] >= LED_CONFIG.blink_duration_ms
-        ):
-            self._blinking_border = None
+    def show(self) -> None:
+        self._led_matrix.show()
 
     def draw(self, marker: tuple[int, int]) -> None:
-        self._led_matrix.clear()
+        self.render(marker)
+        self.show()
+
+    def render(self, marker: tuple[int, int]) -> None:
         match self._mode:
             case LED_Board.Mode.WAIT_FOR_CONNECT:
                 self._draw_wait_for_connect()
@@ -374,5 +403,3 @@ class LED_Board:
                 self._draw_won()
             case LED_Board.Mode.LOST:
                 self._draw_lost()
-
-        self._led_matrix.show()
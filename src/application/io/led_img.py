@@ -1,32 +1,126 @@
+#!/usr/bin/env python
+
 import importlib.resources as pkg_res
-from application.io import resources
-from PIL import Image
-import rpi_ws281x as ws
+import mmap
+import os
+import struct
+import sys
+import tempfile
 import time
+from array import array
+from pathlib import Path
+from typing import Final, Sequence
+
+from application.io import resources
+from application.io.led_backend import Color
+from config import get_logger
+
+logger: Final = get_logger(__name__)
+
+# magic, format version, width, height, frames count
+FRAMES_HEADER: Final = struct.Struct("<4sHHHH")
+FRAMES_MAGIC: Final = b"BSLF"
+FRAMES_VERSION: Final = 1
+
+ANIMATIONS_IMAGES: Final = ("ship.png", "gnome.png", "trophy.png", "ship_sink.png")
+
+
+def frames_path_of(img_path: Path, w: int, h: int) -> Path:
+    return img_path.with_name(f"{img_path.stem}.{w}x{h}.u32")
+
+
+def decode_sprite_sheet(img_path: Path, w: int, h: int) -> array:
+    """Returns colors of all frames, each frame in the LED strip order"""
+    # imported here so that starting from the cache does not pay for PIL
+    from PIL import Image
+
+    img = Image.open(img_path)
+    pixels = img.load()
+    colors = array("I")
+    for frame_n in range(img.size[1] // h):
+        for y in range(h):
+            ran = range(0, w, 1) if y % 2 else range(w - 1, -1, -1)
+            for x in ran:
+                y_coord = y + frame_n * h
+                colors.append(Color(*pixels[x, y_coord]))
+    return colors
+
+
+def build_frames_file(img_path: Path, w: int, h: int) -> Path:
+    colors = decode_sprite_sheet(img_path, w, h)
+    frames_path = frames_path_of(img_path, w, h)
+    header = FRAMES_HEADER.pack(
+        FRAMES_MAGIC, FRAMES_VERSION, w, h, len(colors) // (w * h)
+    )
+    # written aside and renamed, so a half-written file is never loaded
+    fd, tmp_path = tempfile.mkstemp(dir=frames_path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as frames_file:
+            frames_file.write(header)
+            colors.tofile(frames_file)
+        os.replace(tmp_path, frames_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return frames_path
+
+
+def is_frames_file_fresh(img_path: Path, frames_path: Path) -> bool:
+    return (
+        frames_path.exists() and frames_path.stat().st_mtime >= img_path.stat().st_mtime
+    )
 
 
 class Animation:
     def __init__(self, img_path: str, frame_time_ms: int):
         self._img_path = img_path
         self._frame_time = frame_time_ms
-        self._frames: list[list[ws.RGBW]] = []
+        self._frames: list[Sequence[int]] = []
         self._start_time = 0
+        self._mmap: mmap.mmap | None = None
+
+    def _map_frames_file(self, frames_path: Path, w: int, h: int) -> None:
+        with open(frames_path, "rb") as frames_file:
+            self._mmap = mmap.mmap(frames_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, file_w, file_h, frames_count = FRAMES_HEADER.unpack_from(
+            self._mmap
+        )
+        if (magic, version, file_w, file_h) != (FRAMES_MAGIC, FRAMES_VERSION, w, h):
+            raise ValueError(f"Frames file {frames_path} has unexpected header")
+        colors = memoryview(self._mmap)[FRAMES_HEADER.size :].cast("I")
+        frame_len = w * h
+        self._frames = [
+            colors[frame_n * frame_len : (frame_n + 1) * frame_len]
+            for frame_n in range(frames_count)
+        ]
 
     def load(self, w: int, h: int) -> None:
         with pkg_res.path(resources, self._img_path) as img_path:
-            img = Image.open(img_path)
-        pixels = img.load()
-        for frame_n in range(img.size[1] // h):
-            frame: list[ws.RGBW] = []
-            for y in range(h):
-                ran = range(0, w, 1) if y % 2 else range(w - 1, -1, -1)
-                for x in ran:
-                    y_coord = y + frame_n * h
-                    frame.append(ws.Color(*pixels[x, y_coord]))
-            self._frames.append(frame)
+            frames_path = frames_path_of(img_path, w, h)
+            try:
+                if not is_frames_file_fresh(img_path, frames_path):
+                    logger.info(f"Building frames file {frames_path}")
+                    build_frames_file(img_path, w, h)
+                self._map_frames_file(frames_path, w, h)
+            except (OSError, ValueError) as ex:
+                logger.warning(f"Frames file not usable, decoding {img_path}: {ex}")
+                colors = decode_sprite_sheet(img_path, w, h)
+                frame_len = w * h
+                self._frames = [
+                    colors[idx : idx + frame_len]
+                    for idx in range(0, len(colors), frame_len)
+                ]
         self._start_time = int(time.time() * 1000)
 
-    def get_current_frame(self) -> list[ws.RGBW]:
+    def get_current_frame(self) -> Sequence[int]:
         time_diff = int(time.time() * 1000) - self._start_time
         frame_i = (time_diff // self._frame_time) % len(self._frames)
         return self._frames[frame_i]
+
+
+if __name__ == "__main__":
+    # build step, e.g. `python -m application.io.led_img 16x16` before deploying
+    w, h = map(int, (sys.argv[1] if len(sys.argv) > 1 else "16x16").split("x"))
+    for img_name in ANIMATIONS_IMAGES:
+        with pkg_res.path(resources, img_name) as img_path:
+            print(build_frames_file(img_path, w, h))
@@ -1,8 +1,10 @@
-import rpi_ws281x as ws
+import numpy as np
+import numpy.typing as npt
+from application.io.led_backend import DEFAULT_BACKEND, Color, PixelStrip, RGBW
 from typing import Tuple
 
 
-class LED_Matrix(ws.PixelStrip):
+class LED_Matrix:
     def __init__(
         self,
         num_cols: int,  # Number of matrix collumns
@@ -16,8 +18,11 @@ class LED_Matrix(ws.PixelStrip):
         channel: int = 0,  # set to '1' for GPIOs 13, 19, 41, 45 or 53
         strip_type=None,  # set unusal LED strip type
         gamma=None,  # gamma correction
+        backend: type[PixelStrip] = DEFAULT_BACKEND,
     ):
-        super().__init__(
+        # colors last set, to write only the changed ones to the strip buffer
+        self._pixels = np.zeros(num_cols * num_rows, dtype=np.uint32)
+        self.strip = backend(
             num_cols * num_rows,
             pin,
             freq_hz,
@@ -46,19 +51,54 @@ class LED_Matrix(ws.PixelStrip):
         pos = (off * (1 - (row % 2)) + (self._num_cols - off - 1) * (row % 2), row)
         return (self._num_cols - pos[0] - 1, pos[1])  # mirror X axis
 
-    def setMatrixPixelColor(self, pos: Tuple[int, int], color: ws.Color):
+    def stripOrder(self) -> npt.NDArray[np.intp]:
+        """Indices of the row-major matrix pixels in the order of LEDs"""
+        return np.array(
+            [
+                y * self._num_cols + x
+                for x, y in map(
+                    self.LEDToMatixPos, range(self._num_cols * self._num_rows)
+                )
+            ],
+            dtype=np.intp,
+        )
+
+    def __getitem__(self, pos):
+        return self.strip[pos]
+
+    def __setitem__(self, pos, value):
+        self.strip[pos] = value
+        self._pixels[pos] = value
+
+    def __len__(self):
+        return len(self.strip)
+
+    def begin(self):
+        self.strip.begin()
+
+    def show(self):
+        self.strip.show()
+
+    def setPixels(self, colors: npt.NDArray[np.uint32]) -> None:
+        """Sets colors of all LEDs given in the strip order"""
+        changed = np.flatnonzero(colors != self._pixels)
+        for n, color in zip(changed.tolist(), colors[changed].tolist()):
+            self.strip[n] = color
+        self._pixels[changed] = colors[changed]
+
+    def setMatrixPixelColor(self, pos: Tuple[int, int], color: Color):
         self[self.matrixToLEDPos(pos)] = color
 
     def setMatrixPixelColorRGB(
         self, pos: Tuple[int, int], red: int, green: int, blue: int, white=0
     ):
-        self.setMatrixPixelColor(pos, ws.Color(red, green, blue, white))
+        self.setMatrixPixelColor(pos, Color(red, green, blue, white))
 
-    def getMatrixPixelColor(self, pos: Tuple[int, int]) -> ws.Color:
+    def getMatrixPixelColor(self, pos: Tuple[int, int]) -> Color:
         return self[self.matrixToLEDPos(pos)]
 
-    def getMatrixPixelColorRGB(self, pos: Tuple[int, int]) -> ws.RGBW:
-        return ws.RGBW(self[self.matrixToLEDPos(pos)])
+    def getMatrixPixelColorRGB(self, pos: Tuple[int, int]) -> RGBW:
+        return RGBW(self[self.matrixToLEDPos(pos)])
 
-    def clear(self, color: ws.Color = ws.Color(0, 0, 0)):
+    def clear(self, color: Color = Color(0, 0, 0)):
         self[:] = color
@@ -7,9 +7,13 @@ from application.io.actions import (
     OutActions,
     InfoActions,
     ActionEvent,
+    ActionEventBatch,
     DisplayBoard,
+    OutEvent,
 )
 from application.io.pg_img import Animation
+from application import tracing
+from application.io.instrumentation import FrameStats
 from threading import Event as th_Event
 from pydantic.dataclasses import dataclass
 from pydantic import ConfigDict
@@ -92,13 +96,17 @@ class IO:
     def __init__(
         self,
         input_queue: janus.SyncQueue[ActionEvent],
-        output_queue: janus.SyncQueue[ActionEvent],
+        output_queue: janus.SyncQueue[OutEvent],
         stop_running: th_Event,
+        frame_stats: Optional[FrameStats] = None,
     ):
         self._board_size = -1
         self._in_queue = input_queue
         self._out_queue = output_queue
         self._stop_running = stop_running
+        self._frame_stats = frame_stats or FrameStats(
+            "pygame IO", in_queue=input_queue, out_queue=output_queue
+        )
 
         self._shots_pg_board: PgBoard = None
         self._ships_pg_board: PgBoard = None
@@ -161,7 +169,10 @@ class IO:
             if self._shooting:
                 self._try_put_in_queue(
                     ActionEvent(
-                        InActions.Select, self._shots_marker_pos, DisplayBoard.Shots
+                        InActions.Select,
+                        self._shots_marker_pos,
+                        DisplayBoard.Shots,
+                        tracing.start("input"),
                     )
                 )
                 return True
@@ -258,7 +269,9 @@ class IO:
                 )
                 if tile == (-1, -1):
                     return
-                self._try_put_in_queue(ActionEvent(InActions.Select, tile))
+                self._try_put_in_queue(
+                    ActionEvent(InActions.Select, tile, trace=tracing.start("input"))
+                )
             elif self._place_ships:
                 tile: tuple[int, int] = self._ships_pg_board.get_cell_from_mousecoords(
                     pos
@@ -273,7 +286,11 @@ class IO:
             if event.key in PG_CONFIG.confirm_buttons:
                 self._try_put_in_queue(ActionEvent(InActions.Confirm))
 
-    def _handle_output_event(self, event: ActionEvent) -> None:
+    def _handle_output_event(self, event: OutEvent) -> None:
+        if isinstance(event, ActionEventBatch):
+            for batched_event in event.events:
+                self._handle_output_event(batched_event)
+            return
 
         match event.action:
             case InfoActions.PlayerConnected:
@@ -334,23 +351,34 @@ class IO:
         self._ships_pg_board.draw(self._ships_marker_pos)
 
     def _game_loop(self) -> None:
+        frame_stats = self._frame_stats
         while not self._stop_running.is_set():
+            frame_stats.begin_frame()
             for event in pg.event.get():
                 if event.type == pg.QUIT:
                     self._stop_running.set()
                     break
                 self._handle_pg_input_event(event)
 
+            traced: list[OutEvent] = []
             while True:
                 try:
                     event = self._out_queue.get_nowait()
                     self._handle_output_event(event)
+                    frame_stats.event_handled(event)
+                    if event.trace is not None:
+                        traced.append(event)
                 except janus.SyncQueueEmpty:
                     break
 
+            frame_stats.drawing()
             self._screen.fill(PG_CONFIG.color_map[ExtraColors.MainBg])
             self._draw()
+            frame_stats.showing()
             pg.display.flip()
+            frame_stats.end_frame()
+            for event in traced:
+                tracing.record(event.trace, "rendered")
             self._clock.tick(PG_CONFIG.dest_fps)
 
     def run(self) -> None:
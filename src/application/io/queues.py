@@ -0,0 +1,22 @@
+import janus
+from application.io.actions import ActionEvent, InActions
+
+
+class HoverCoalescingQueue(janus.Queue[ActionEvent]):
+    """Input queue keeping only the latest of consecutive hovers over a board.
+
+    Select and Confirm events are never dropped nor reordered, so the marker
+    cannot trail behind the cursor however fast it sweeps over the board.
+    """
+
+    def _put_internal(self, item: ActionEvent) -> None:
+        # called with the queue's mutex held
+        if (
+            item.action == InActions.Hover
+            and self._qsize() > 0
+            and self._queue[-1].action == InActions.Hover
+            and self._queue[-1].board == item.board
+        ):
+            self._queue[-1] = item
+            return
+        super()._put_internal(item)
@@ -3,6 +3,7 @@ import gpiozero as gp
 from typing import Tuple
 from application.io.actions import InActions, ActionEvent
 from threading import Event
+from application import tracing
 
 
 class Rpi_Input:
@@ -50,7 +51,11 @@ class Rpi_Input:
         if not self._active:
             return
         print(ActionEvent(InActions.Select, self._marker_pos))
-        self._input_queue.put(ActionEvent(InActions.Select, self._marker_pos))
+        self._input_queue.put(
+            ActionEvent(
+                InActions.Select, self._marker_pos, trace=tracing.start("input")
+            )
+        )
 
     def _confirm_button_pressed(self) -> None:
         if not self._active:
@@ -0,0 +1,75 @@
+import janus
+from typing import Iterable
+from application import tracing
+from application.io.actions import ActionEvent, InActions
+from domain.field import Field
+from threading import Event
+
+
+def parse_script(lines: Iterable[str]) -> list[tuple[float, ActionEvent]]:
+    """Parses lines of `SECONDS ACTION [FIELD]`, e.g. `0.5 Hover B3`.
+
+    Actions are the names of InActions, blank lines and `#` comments are
+    skipped.
+    """
+    script: list[tuple[float, ActionEvent]] = []
+    for number, line in enumerate(lines, start=1):
+        words = line.split("#", 1)[0].split()
+        if len(words) == 0:
+            continue
+        try:
+            if len(words) > 3:
+                raise ValueError("too many words")
+            delay = float(words[0])
+            action = InActions(words[1])
+            tile = None
+            if len(words) == 3:
+                y, x = Field(words[2]).vector_from_zeros
+                tile = (x, y)
+        except (ValueError, IndexError, RuntimeError) as ex:
+            raise ValueError(f"Bad input script line {number}: {line!r}") from ex
+        script.append((delay, ActionEvent(action, tile)))
+    return script
+
+
+def read_script(path: str) -> list[tuple[float, ActionEvent]]:
+    with open(path) as script_file:
+        return parse_script(script_file)
+
+
+class ScriptedInput:
+    """Stands in for Rpi_Input, putting events of a script into the input queue.
+
+    Each event is put the given number of seconds after the previous one,
+    counting from the moment the board size is known.
+    """
+
+    def __init__(
+        self,
+        input_queue: janus.SyncQueue[ActionEvent],
+        stop_running: Event,
+        script: Iterable[tuple[float, ActionEvent]] = (),
+    ):
+        self._board_size = -1
+        self._input_queue = input_queue
+        self._stop_running = stop_running
+        self._script = script
+        self._active = Event()
+
+    def set_board_size(self, size: int):
+        self._board_size = size
+        self._active.set()
+
+    def run(self):
+        while not self._active.wait(timeout=0.1):
+            if self._stop_running.is_set():
+                return
+
+        for delay, event in self._script:
+            if self._stop_running.wait(timeout=delay):
+                return
+            # created and traced when "pressed", as buttons' events are
+            trace = tracing.start("input") if event.action == InActions.Select else None
+            self._input_queue.put(ActionEvent(event.action, event.tile, trace=trace))
+
+        self._stop_running.wait()
@@ -0,0 +1,90 @@
+"""In-memory connection of the player on the device embedding the server.
+
+The client and the server share an event loop, so the player's messages are
+passed between them through queues as the dicts they are serialized to and
+parsed from, skipping TCP, WebSocket framing and JSON on both sides. Both
+ends behave as much of websockets' connections as the client and server use,
+closing included: receiving or sending on a closed end raises
+ConnectionClosed.
+"""
+
+import asyncio
+from typing import Final, Optional
+
+from websockets import ConnectionClosed, ConnectionClosedError, ConnectionClosedOK
+from websockets.datastructures import Headers
+from websockets.frames import Close, CloseCode
+from websockets.http11 import Request
+
+LOCAL_ADDRESS: Final = ("local", 0)
+
+
+class LocalConnection:
+    def __init__(self, path: str) -> None:
+        self.request = Request(path, Headers())
+        self.remote_address = LOCAL_ADDRESS
+        self._incoming: asyncio.Queue[dict | Close] = asyncio.Queue()
+        self._peer: Optional["LocalConnection"] = None
+        self._close: Optional[Close] = None
+        self._closed = asyncio.Event()
+
+    @classmethod
+    def pair(cls, path: str) -> tuple["LocalConnection", "LocalConnection"]:
+        """Returns the client's and the server's end connected to each other"""
+        client_end, server_end = cls(path), cls(path)
+        client_end._peer, server_end._peer = server_end, client_end
+        return client_end, server_end
+
+    @property
+    def closed(self) -> bool:
+        return self._close is not None
+
+    def put(self, message: dict) -> bool:
+        """Passes the message to the other end, returns False once closed"""
+        if self._close is not None or self._peer is None:
+            return False
+        self._peer._incoming.put_nowait(message)
+        return True
+
+    async def send(self, message: dict) -> None:
+        if not self.put(message):
+            raise self._closed_error()
+
+    async def recv(self) -> dict:
+        """Returns messages in the order sent, raises once the close is reached"""
+        message = await self._incoming.get()
+        if isinstance(message, Close):
+            # later calls raise as well
+            self._incoming.put_nowait(message)
+            raise self._closed_error()
+        return message
+
+    async def close(
+        self, code: int = CloseCode.NORMAL_CLOSURE, reason: str = ""
+    ) -> None:
+        close = Close(code, reason)
+        self._shut(close)
+        if self._peer is not None:
+            self._peer._shut(close)
+
+    async def wait_closed(self) -> None:
+        await self._closed.wait()
+
+    async def __aenter__(self) -> "LocalConnection":
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+    def _shut(self, close: Close) -> None:
+        if self._close is not None:
+            return
+        self._close = close
+        self._incoming.put_nowait(close)
+        self._closed.set()
+
+    def _closed_error(self) -> ConnectionClosed:
+        close = self._close or Close(CloseCode.ABNORMAL_CLOSURE, "")
+        if close.code in (CloseCode.NORMAL_CLOSURE, CloseCode.GOING_AWAY):
+            return ConnectionClosedOK(close, close, rcvd_then_sent=True)
+        return ConnectionClosedError(close, close, rcvd_then_sent=True)
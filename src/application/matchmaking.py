@@ -0,0 +1,174 @@
+"""Pairs players asking for a match into new rooms.
+
+Players wait in FIFO queues keyed by the game they ask for, an arriving
+player is paired with the longest waiting one of its queue right away.
+Players leaving the queue are only marked, they are skipped when reached,
+so both arriving and leaving take constant time.
+"""
+
+import asyncio
+import collections
+import dataclasses
+import time
+from typing import Final, Optional
+from urllib.parse import parse_qs, urlsplit
+from uuid import uuid4
+
+from application.metrics import REGISTRY, Gauge, Histogram
+from application.room import Room
+from config import CONFIG, MastedShipsCounts
+
+MATCH_ROOM_NAME: Final = "match"
+MAX_BOARD_SIZE: Final = 26
+
+
+@dataclasses.dataclass(frozen=True)
+class MatchKey:
+    board_size: int
+    masted_ships_counts: MastedShipsCounts
+    rating_bucket: Optional[int] = None
+
+
+class InvalidMatchRequest(ValueError):
+    pass
+
+
+def fleet_fits(board_size: int, counts: MastedShipsCounts) -> bool:
+    """Whether the ships can be placed without touching each other.
+
+    They are laid largest first into every other row, each followed by a free
+    field, which may reject a few fleets fitting only with upright ships.
+    """
+    # free fields of the rows, counting the one past the board's edge
+    rows = [board_size + 1] * ((board_size + 1) // 2)
+    masts_of_ships = (
+        [4] * counts.four + [3] * counts.three + [2] * counts.two + [1] * counts.single
+    )
+    for masts in masts_of_ships:
+        row = next((n for n, free in enumerate(rows) if free >= masts + 1), None)
+        if row is None:
+            return False
+        rows[row] -= masts + 1
+    return True
+
+
+def parse_match_request(
+    path: str, rating_bucket_size: int = CONFIG.match_rating_bucket_size
+) -> MatchKey:
+    """Returns the key of e.g. `/match?board_size=10&ships=4,3,2,1&rating=1520`
+
+    Unset board size and ships are the server's ones, players without a rating
+    are matched with each other only.
+    """
+    query = {
+        name: values[-1] for name, values in parse_qs(urlsplit(path).query).items()
+    }
+    try:
+        board_size = int(query.get("board_size", CONFIG.board_size))
+        if "ships" in query:
+            single, two, three, four = map(int, query["ships"].split(","))
+            counts = MastedShipsCounts(single=single, two=two, three=three, four=four)
+        else:
+            counts = CONFIG.masted_ships_counts
+        rating = int(query["rating"]) if "rating" in query else None
+    except ValueError as ex:
+        raise InvalidMatchRequest(f"Invalid match request {path}") from ex
+    counts_tuple = (counts.single, counts.two, counts.three, counts.four)
+    if (
+        not 1 <= board_size <= MAX_BOARD_SIZE
+        or any(not 0 <= count <= board_size for count in counts_tuple)
+        or sum(counts_tuple) == 0
+    ):
+        raise InvalidMatchRequest(f"Match request {path} is out of bounds")
+    if not fleet_fits(board_size, counts):
+        raise InvalidMatchRequest(f"Ships of match request {path} do not fit")
+    rating_bucket = rating // rating_bucket_size if rating is not None else None
+    return MatchKey(board_size, counts, rating_bucket)
+
+
+def match_request_path(
+    board_size: int, counts: MastedShipsCounts, rating: Optional[int] = None
+) -> str:
+    ships = f"{counts.single},{counts.two},{counts.three},{counts.four}"
+    path = f"/{MATCH_ROOM_NAME}?board_size={board_size}&ships={ships}"
+    if rating is not None:
+        path += f"&rating={rating}"
+    return path
+
+
+@dataclasses.dataclass
+class Waiting:
+    matched: "asyncio.Future[Room]"
+    since: float
+
+
+waiting_histogram: Final = REGISTRY.register(
+    Histogram(
+        "battleships_matchmaking_wait_seconds",
+        "Time players waited in the matchmaking queue until paired",
+        buckets=(0.01, 0.1, 0.5, 1, 5, 15, 30, 60, 300),
+    )
+)
+
+
+class Matchmaker:
+    def __init__(self) -> None:
+        self._queues: dict[MatchKey, collections.deque[Waiting]] = {}
+        self.waiting_count = 0
+
+    def _pop_waiting(self, key: MatchKey) -> Optional[Waiting]:
+        queue = self._queues.get(key)
+        while queue:
+            waiting = queue.popleft()
+            if not waiting.matched.done():
+                if not queue:
+                    del self._queues[key]
+                return waiting
+        self._queues.pop(key, None)
+        return None
+
+    def join(self, key: MatchKey) -> "asyncio.Future[Room]":
+        """Pairs the arriving player with the longest waiting one into a new
+        room, or queues it until another one arrives.
+
+        The returned future is done once the player is matched, cancelling
+        it leaves the queue.
+        """
+        matched: "asyncio.Future[Room]" = asyncio.get_running_loop().create_future()
+        waiting = self._pop_waiting(key)
+        if waiting is None:
+            queued = Waiting(matched, time.monotonic())
+            self._queues.setdefault(key, collections.deque()).append(queued)
+            self.waiting_count += 1
+            matched.add_done_callback(lambda _: self._leave(key, queued))
+            return matched
+
+        room = Room(f"{MATCH_ROOM_NAME}-{uuid4().hex}")
+        room.board_size = key.board_size
+        room.masted_ships_counts = key.masted_ships_counts
+        waiting.matched.set_result(room)
+        matched.set_result(room)
+        return matched
+
+    def _leave(self, key: MatchKey, waiting: Waiting) -> None:
+        self.waiting_count -= 1
+        if not waiting.matched.cancelled():
+            waiting_histogram.observe(time.monotonic() - waiting.since)
+            return
+        queue = self._queues.get(key)
+        # left from the middle of the queue, it is skipped when reached
+        if queue and queue[-1] is waiting:
+            queue.pop()
+        if not queue:
+            self._queues.pop(key, None)
+
+
+matchmaker: Final = Matchmaker()
+
+waiting_gauge: Final = REGISTRY.register(
+    Gauge(
+        "battleships_matchmaking_waiting",
+        "Players waiting in the matchmaking queue",
+        callback=lambda: matchmaker.waiting_count,
+    )
+)
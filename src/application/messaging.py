@@ -4,11 +4,18 @@ from typing import Any, Literal, Optional, TypeAlias
 from config import MastedShipsCounts
 from pydantic.dataclasses import dataclass
 from domain.attacks import AttackRequest, AttackResult, PossibleAttack
+from application.tracing import TraceContext
 import json
 from pydantic import UUID4, Field as PydField
 
 
-from pydantic import TypeAdapter, RootModel, ConfigDict
+from pydantic import (
+    ConfigDict,
+    RootModel,
+    SerializerFunctionWrapHandler,
+    TypeAdapter,
+    model_serializer,
+)
 
 dataclass_config = ConfigDict(populate_by_name=True)
 
@@ -51,6 +58,20 @@ class ExtraInfo:
     you_start_first: Optional[bool] = None
     you_won: Optional[bool] = None
     error: Optional[str] = None
+    # set when the player is reattached to a room restored after a restart
+    resumed: Optional[bool] = None
+    your_turn: Optional[bool] = None
+    # room of matched players, reconnected to instead of asking for a match
+    room: Optional[str] = None
+
+    @model_serializer(mode="wrap")
+    def skip_unset_optional_info(self, handler: SerializerFunctionWrapHandler) -> dict:
+        # left out unless set, as for clients not knowing about them
+        serialized = handler(self)
+        for key in ("resumed", "your_turn", "room"):
+            if serialized.get(key) is None:
+                serialized.pop(key, None)
+        return serialized
 
 
 @dataclass(frozen=True, config=dataclass_config)
@@ -77,18 +98,65 @@ class GameMessage(Serializable):
     data: AttackRequest | AttackResult | PossibleAttack = PydField(
         discriminator="type_"
     )
+    trace: Optional[TraceContext] = None
     what: Literal["GameMessage"] = PydField(
         default="GameMessage", init=False, repr=False
     )
 
     def serialize(self) -> dict:
-        return RootModel[GameMessage](self).model_dump(by_alias=True, mode="json")
+        return RootModel[GameMessage](self).model_dump(
+            by_alias=True, mode="json", exclude_none=True
+        )
+
+    def stringify(self) -> str:
+        return json.dumps(self.serialize())
+
+
+@dataclass(frozen=True, config=dataclass_config)
+class Rematch(Serializable):
+    """Asks for another game in the same room once the game has ended"""
+
+    uniqid: UUID4
+    what: Literal["Rematch"] = PydField(default="Rematch", init=False, repr=False)
+
+    def serialize(self) -> dict:
+        return RootModel[Rematch](self).model_dump(by_alias=True, mode="json")
+
+    def stringify(self) -> str:
+        return json.dumps(self.serialize())
+
+
+@dataclass(frozen=True, config=dataclass_config)
+class RelayedMessage(Serializable):
+    sender: int
+    message: dict[str, Any]
+    what: Literal["RelayedMessage"] = PydField(
+        default="RelayedMessage", init=False, repr=False
+    )
+
+    def serialize(self) -> dict:
+        return RootModel[RelayedMessage](self).model_dump(by_alias=True, mode="json")
+
+    def stringify(self) -> str:
+        return json.dumps(self.serialize())
+
+
+@dataclass(frozen=True, config=dataclass_config)
+class RoomState(Serializable):
+    room: str
+    players: list[Optional[ClientInfo]]
+    history: list[RelayedMessage]
+    what: Literal["RoomState"] = PydField(default="RoomState", init=False, repr=False)
+
+    def serialize(self) -> dict:
+        return RootModel[RoomState](self).model_dump(by_alias=True, mode="json")
 
     def stringify(self) -> str:
         return json.dumps(self.serialize())
 
 
 GameMessageOrInfo: TypeAlias = GameMessage | GameInfo
+SpectatorMessage: TypeAlias = RelayedMessage | RoomState
 
 
 def decode_json_message(data: Any) -> dict:
@@ -122,5 +190,10 @@ def parse_game_message_or_info(data: dict) -> GameMessageOrInfo:
     return message
 
 
+def parse_spectator_message(data: dict) -> SpectatorMessage:
+    message = TypeAdapter(SpectatorMessage).validate_python(data)
+    return message
+
+
 def serialize_message(message: GameMessage) -> str:
     return RootModel[type(message)](message).model_dump(by_alias=True)
@@ -0,0 +1,269 @@
+import asyncio
+import bisect
+import math
+import socket
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Final, Iterator, Optional, TypeVar
+
+from config import get_logger
+
+logger = get_logger(__name__)
+
+LabelValues = tuple[str, ...]
+
+DEFAULT_BUCKETS: Final = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, **extra: str) -> str:
+    pairs = list(zip(names, values)) + list(extra.items())
+    if len(pairs) == 0:
+        return ""
+    escaped = [
+        (name, value.replace("\\", "\\\\").replace('"', '\\"')) for name, value in pairs
+    ]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric(ABC):
+    type_: str = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+
+    def _label_values(self, labels: dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Metric {self.name} expects labels {self.labelnames},"
+                + f" provided: {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> list[str]:
+        pass
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type_ = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only be increased")
+        key = self._label_values(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._label_values(labels), 0)
+
+    def samples(self) -> list[str]:
+        if len(self._values) == 0 and len(self.labelnames) == 0:
+            return [f"{self.name} 0"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Metric):
+    type_ = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        callback: Optional[Callable[[], float]] = None,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: dict[LabelValues, float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._label_values(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._label_values(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        if self._callback is not None:
+            return self._callback()
+        return self._values.get(self._label_values(labels), 0)
+
+    def samples(self) -> list[str]:
+        if self._callback is not None:
+            return [f"{self.name} {_format_value(self._callback())}"]
+        if len(self._values) == 0 and len(self.labelnames) == 0:
+            return [f"{self.name} 0"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Histogram(Metric):
+    type_ = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self._buckets = tuple(sorted(buckets)) + (math.inf,)
+        # per labels: (counts per bucket, sum, count)
+        self._values: dict[LabelValues, tuple[list[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        if key not in self._values:
+            self._values[key] = ([0] * len(self._buckets), 0.0, 0)
+        counts, total, count = self._values[key]
+        counts[bisect.bisect_left(self._buckets, value)] += 1
+        self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        values = self._values.get(self._label_values(labels))
+        return 0 if values is None else values[2]
+
+    def samples(self) -> list[str]:
+        values = self._values
+        if len(values) == 0 and len(self.labelnames) == 0:
+            values = {(): ([0] * len(self._buckets), 0.0, 0)}
+        lines = []
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for upper_bound, bucket_count in zip(self._buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(
+                    self.labelnames, key, le=_format_value(upper_bound)
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+M = TypeVar("M", bound=Metric)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: M) -> M:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY: Final = Registry()
+
+
+async def _handle_http(
+    registry: Registry, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # headers are not needed, but have to be read out
+        header_line = request_line
+        while header_line not in (b"\r\n", b"\n", b""):
+            header_line = await asyncio.wait_for(reader.readline(), timeout=5)
+    except (TimeoutError, ConnectionError):
+        writer.close()
+        return
+
+    parts = request_line.decode("latin-1").split()
+    if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+        status = "200 OK"
+        body = registry.render().encode()
+        content_type = "text/plain; version=0.0.4; charset=utf-8"
+    else:
+        status = "404 Not Found"
+        body = b"Not Found\n"
+        content_type = "text/plain; charset=utf-8"
+
+    head = (
+        f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+        + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+    )
+    try:
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_metrics(
+    host: str,
+    port: int,
+    registry: Registry = REGISTRY,
+    sock: Optional[socket.socket] = None,
+) -> asyncio.Server:
+    """Serves `/metrics` in Prometheus text format in the running event loop.
+
+    An already listening `sock` is served instead of binding to host and port.
+    """
+
+    def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        return _handle_http(registry, reader, writer)
+
+    if sock is not None:
+        server = await asyncio.start_server(handle, sock=sock)
+    else:
+        server = await asyncio.start_server(handle, host, port)
+    logger.info(f"Metrics available at http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,144 @@
+import asyncio
+import collections
+from dataclasses import dataclass
+from typing import Callable, Final, Optional
+
+from application.metrics import REGISTRY, Counter, Gauge, Histogram
+from config import CONFIG, get_logger
+from websockets import ConnectionClosed
+from websockets.asyncio.server import ServerConnection
+
+logger: Final = get_logger(__name__)
+
+open_outboxes: Final[set["Outbox"]] = set()
+
+dropped_messages_counter: Final = REGISTRY.register(
+    Counter(
+        "battleships_send_queue_dropped_total",
+        "Messages not sent as the send queue was full",
+        ("reason",),
+    )
+)
+queue_high_water_gauge: Final = REGISTRY.register(
+    Gauge(
+        "battleships_send_queue_high_water",
+        "Most messages queued at once to any connected player",
+        callback=lambda: max((o.high_water for o in open_outboxes), default=0),
+    )
+)
+queue_high_water_histogram: Final = REGISTRY.register(
+    Histogram(
+        "battleships_send_queue_connection_high_water",
+        "Most messages queued at once to a player, observed on disconnecting",
+        buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+    )
+)
+
+
+@dataclass(frozen=True)
+class OutboxItem:
+    frame: str
+    droppable: bool
+    after_sent: Optional[Callable[[], None]]
+
+
+class Outbox:
+    """Bounded queue of frames sent to a connection by its own writer task.
+
+    Putting never waits, so a slow connection only delays itself. When the
+    queue is full, hovers are dropped first, then the connection is aborted.
+    """
+
+    def __init__(
+        self,
+        websocket: ServerConnection,
+        on_sent: Callable[[str], None],
+        size: int = CONFIG.send_queue_size,
+        drop_hovers: bool = CONFIG.send_queue_drop_hovers,
+    ) -> None:
+        self._websocket = websocket
+        self._on_sent = on_sent
+        self._size = size
+        self._drop_hovers = drop_hovers
+        self._queue: collections.deque[OutboxItem] = collections.deque()
+        self._ready = asyncio.Event()
+        # set while nothing is queued or being sent
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.high_water = 0
+        self.closed = False
+        open_outboxes.add(self)
+        self._writer = asyncio.create_task(self._write())
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def put(
+        self,
+        frame: str,
+        droppable: bool = False,
+        after_sent: Optional[Callable[[], None]] = None,
+    ) -> bool:
+        """Returns False if the connection is closed or has just overflowed"""
+        if self.closed:
+            return False
+        if len(self._queue) >= self._size:
+            if not self._drop_hovers:
+                return self._overflow()
+            if not self._drop_oldest_hover():
+                if not droppable:
+                    return self._overflow()
+                dropped_messages_counter.inc(reason="hover")
+                return True
+        self._queue.append(OutboxItem(frame, droppable, after_sent))
+        self._idle.clear()
+        self.high_water = max(self.high_water, len(self._queue))
+        self._ready.set()
+        return True
+
+    def _drop_oldest_hover(self) -> bool:
+        for idx, item in enumerate(self._queue):
+            if item.droppable:
+                del self._queue[idx]
+                dropped_messages_counter.inc(reason="hover")
+                return True
+        return False
+
+    def _overflow(self) -> bool:
+        dropped_messages_counter.inc(reason="overflow")
+        logger.info(f"Disconnecting {self._websocket.remote_address}, queue overflow")
+        self.close()
+        if (transport := self._websocket.transport) is not None:
+            transport.abort()
+        return False
+
+    async def _write(self) -> None:
+        try:
+            while True:
+                while len(self._queue) == 0:
+                    self._idle.set()
+                    self._ready.clear()
+                    await self._ready.wait()
+                item = self._queue.popleft()
+                await self._websocket.send(item.frame)
+                self._on_sent(item.frame)
+                if item.after_sent is not None:
+                    item.after_sent()
+        except ConnectionClosed:
+            # the reading side of the connection notices it as well
+            self.close()
+
+    async def drained(self) -> None:
+        """Waits until everything queued is sent or the outbox is closed"""
+        await self._idle.wait()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        self._idle.set()
+        open_outboxes.discard(self)
+        queue_high_water_histogram.observe(self.high_water)
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
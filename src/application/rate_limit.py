@@ -0,0 +1,88 @@
+import time
+from typing import Callable, Final, Literal, Mapping
+
+from application.metrics import REGISTRY, Counter
+from config import CONFIG
+
+Verdict = Literal["allowed", "throttled", "disconnect"]
+# (tokens per second, burst)
+Rate = tuple[float, int]
+
+ALL_MESSAGES: Final = "*"
+# dropping any other message would leave the players' games out of sync
+DROPPABLE_TYPES: Final = ("PossibleAttack",)
+
+rate_limited_counter: Final = REGISTRY.register(
+    Counter(
+        "battleships_rate_limited_total",
+        "Messages of clients over their rate limits",
+        ("type", "action"),
+    )
+)
+oversized_counter: Final = REGISTRY.register(
+    Counter(
+        "battleships_oversized_messages_total",
+        "Clients disconnected for sending a message over max_message_size",
+    )
+)
+
+
+class TokenBucket:
+    def __init__(self, rate: Rate, clock: Callable[[], float] = time.monotonic) -> None:
+        self._per_second, self._burst = rate
+        self._clock = clock
+        self._tokens = float(self._burst)
+        self._updated_at = clock()
+
+    def take(self) -> bool:
+        now = self._clock()
+        self._tokens = min(
+            self._burst, self._tokens + (now - self._updated_at) * self._per_second
+        )
+        self._updated_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+class RateLimiter:
+    """Limits of a connection, hovers over them are dropped.
+
+    A client keeping on after being throttled runs out of strikes and is
+    disconnected, so is one sending any other message over the limits.
+    """
+
+    def __init__(
+        self,
+        rates: Mapping[str, Rate] = CONFIG.rate_limits,
+        strikes: Rate = CONFIG.rate_limit_strikes,
+        max_message_size: int = CONFIG.max_message_size,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._buckets = {
+            message_type: TokenBucket(rate, clock)
+            for message_type, rate in rates.items()
+        }
+        self._strikes = TokenBucket(strikes, clock)
+        self._max_message_size = max_message_size
+
+    def check_frame(self, size: int) -> Verdict:
+        """Cheap check of a frame before it is parsed"""
+        if size > self._max_message_size:
+            oversized_counter.inc()
+            return "disconnect"
+        return "allowed"
+
+    def _take(self, message_type: str) -> bool:
+        bucket = self._buckets.get(message_type)
+        return bucket is None or bucket.take()
+
+    def check_message(self, message_type: str) -> Verdict:
+        if self._take(ALL_MESSAGES) and self._take(message_type):
+            return "allowed"
+        verdict: Verdict = "disconnect"
+        if message_type in DROPPABLE_TYPES and self._strikes.take():
+            verdict = "throttled"
+        rate_limited_counter.inc(type=message_type, action=verdict)
+        return verdict
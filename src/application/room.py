@@ -0,0 +1,112 @@
+import dataclasses
+from typing import Final, Literal, Optional, TypeAlias
+from urllib.parse import parse_qs, urlsplit
+from uuid import UUID
+
+from application.local_connection import LocalConnection
+from application.messaging import ClientInfo
+from config import CONFIG
+from websockets.asyncio.server import ServerConnection
+
+ClientNumber = Literal[0, 1]
+Role = Literal["player", "spectator"]
+# players of the device embedding the server are connected in memory
+Connection: TypeAlias = ServerConnection | LocalConnection
+
+DEFAULT_ROOM_NAME: Final = "default"
+
+
+class Room:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.connected_clients: list[Optional[Connection]] = [None, None]
+        self.client_infos: list[Optional[ClientInfo]] = [None, None]
+        self.second_client_has_already_connected: bool = False
+        self.spectators: set[ServerConnection] = set()
+        # moves relayed so far, replayed to spectators joining in the middle
+        self.history: list[tuple[ClientNumber, dict]] = []
+        # set for rooms restored from a snapshot until their players reattach
+        self.restored_at: Optional[float] = None
+        # player who ran out of time, losing the game
+        self.forfeited: Optional[ClientNumber] = None
+        # players asking for another game once the game has ended
+        self.rematch_requests: set[ClientNumber] = set()
+        # rooms of matched players play the game they asked for
+        self.board_size = CONFIG.board_size
+        self.masted_ships_counts = CONFIG.masted_ships_counts
+
+    def get_client_number(
+        self, websocket: Optional[Connection]
+    ) -> Optional[ClientNumber]:
+        if websocket is None:
+            return None
+        if websocket == self.connected_clients[0]:
+            return 0
+        elif websocket == self.connected_clients[1]:
+            return 1
+        return None
+
+    def restored_client_number(self, uniqid: UUID) -> Optional[ClientNumber]:
+        """Returns the number of a restored player not reattached yet"""
+        for client_number in (0, 1):
+            client_info = self.client_infos[client_number]
+            if (
+                client_info is not None
+                and client_info.uniqid == uniqid
+                and self.connected_clients[client_number] is None
+            ):
+                return client_number
+        return None
+
+    @property
+    def awaits_reattach(self) -> bool:
+        return self.restored_at is not None and any(
+            client_info is not None and self.connected_clients[n] is None
+            for n, client_info in enumerate(self.client_infos)
+        )
+
+    @property
+    def turn(self) -> ClientNumber:
+        """Client expected to attack, the opponent of the last one who did"""
+        for sender, message in reversed(self.history):
+            if message.get("data", {}).get("type_") == "AttackRequest":
+                return 0 if sender == 1 else 1
+        return 0
+
+    @property
+    def is_empty(self) -> bool:
+        return (
+            self.connected_clients[0] is None
+            and self.connected_clients[1] is None
+            and len(self.spectators) == 0
+        )
+
+    def clear_players(self) -> None:
+        self.connected_clients = [None, None]
+        self.client_infos = [None, None]
+        self.second_client_has_already_connected = False
+        self.history = []
+        self.restored_at = None
+        self.forfeited = None
+        self.rematch_requests = set()
+
+    def start_next_game(self) -> None:
+        """Keeps the players connected, they place their ships again"""
+        self.history = []
+        self.forfeited = None
+        self.rematch_requests = set()
+        for client_number, client_info in enumerate(self.client_infos):
+            if client_info is None:
+                continue
+            self.client_infos[client_number] = dataclasses.replace(
+                client_info, ships_placed=False, ready=False, all_ships_wrecked=False
+            )
+
+
+def parse_request_path(path: str) -> tuple[str, Role]:
+    """Returns room name and role, e.g. `/arena?role=spectator`"""
+    split = urlsplit(path)
+    room_name = split.path.strip("/") or DEFAULT_ROOM_NAME
+    roles = parse_qs(split.query).get("role", [])
+    role: Role = "spectator" if "spectator" in roles else "player"
+    return room_name, role
@@ -3,168 +3,430 @@
 import asyncio
 import dataclasses
 import json
+import logging
 import pprint
 import socket
-from typing import Final, Literal, Optional
+import sys
+import time
+from http import HTTPStatus
+from typing import Any, Callable, Final, Literal, Mapping, Optional
 from uuid import uuid4
+from application import event_loop
 from application.messaging import (
-    ClientInfo,
     ExtraInfo,
     GameInfo,
     GameStatus,
+    RelayedMessage,
+    RoomState,
     Serializable,
     decode_json_message,
     parse_client_info,
 )
+from application.event_loop import EventLoopName
+from application.local_connection import LocalConnection
+from application.outbox import Outbox
+from application.rate_limit import Rate, RateLimiter
+from application.handoff import Handoff, serve_handoff, take_over
+from application.snapshots import (
+    RoomEncoder,
+    Snapshotter,
+    decode_snapshot,
+    encode_snapshot,
+    mark_restored,
+    restore_rooms,
+)
+from application.matchmaking import (
+    MATCH_ROOM_NAME,
+    InvalidMatchRequest,
+    matchmaker,
+    parse_match_request,
+)
+from application.metrics import REGISTRY, Counter, Gauge, Histogram, serve_metrics
+from application.tracing import stamp_serialized
+from application.turn_clock import TurnClocks
+from application.room import ClientNumber, Connection, Room, parse_request_path
+from application.workers import (
+    BrokerClient,
+    redirect_location,
+    supervise,
+    worker_port,
+)
 from config import get_logger, CONFIG
 from websockets import ConnectionClosedError, ConnectionClosedOK
-from websockets.asyncio.server import serve, ServerConnection
+from websockets.http11 import Request, Response
+from websockets.asyncio.server import broadcast, serve, Server, ServerConnection
 
 logger = get_logger(__name__)
 
-ClientNumber = Literal[0, 1]
 ClientName = Literal["FIRST", "SECOND"]
 client_names: Final = ["FIRST", "SECOND"]
+time_is_up: Final = "Time is up"
 
 ping_timeout = False
 
-connected_clients: list[Optional[ServerConnection]] = [None, None]
-client_infos: list[Optional[ClientInfo]] = [None, None]
-second_client_has_already_connected: bool = False
+rooms: dict[str, Room] = {}
+outboxes: dict[ServerConnection, Outbox] = {}
+limiters: dict[ServerConnection, RateLimiter] = {}
+rate_limits: Mapping[str, Rate] = CONFIG.rate_limits
+snapshotter: Optional[Snapshotter] = None
+# referenced until done, the event loop only keeps weak references to tasks
+background_tasks: set[asyncio.Task] = set()
+# set in worker processes, see application/workers.py
+room_broker: Optional[BrokerClient] = None
+# players of this worker asking for a match, see route_to_room_owner()
+match_seekers: set[Connection] = set()
+# set once the rooms are being handed over to a new server process
+handing_off = False
+
+connections_counter: Final = REGISTRY.register(
+    Counter("battleships_connections_total", "Accepted connections", ("role",))
+)
+resets_counter: Final = REGISTRY.register(
+    Counter("battleships_game_resets_total", "Games reset by the server")
+)
+rematches_counter: Final = REGISTRY.register(
+    Counter(
+        "battleships_rematches_total",
+        "Games started again in the same room on the players' connections",
+    )
+)
+relayed_messages_counter: Final = REGISTRY.register(
+    Counter(
+        "battleships_relayed_messages_total",
+        "Messages relayed to the opponent",
+        ("type",),
+    )
+)
+received_bytes_counter: Final = REGISTRY.register(
+    Counter("battleships_received_bytes_total", "Bytes received from clients")
+)
+sent_bytes_counter: Final = REGISTRY.register(
+    Counter("battleships_sent_bytes_total", "Bytes sent to clients and spectators")
+)
+relay_latency_histogram: Final = REGISTRY.register(
+    Histogram(
+        "battleships_relay_latency_seconds",
+        "Time from receiving a message to forwarding it to the opponent",
+        ("type",),
+    )
+)
+update_game_info_histogram: Final = REGISTRY.register(
+    Histogram(
+        "battleships_update_game_info_duration_seconds",
+        "Duration of sending updated GameInfo to both clients",
+    )
+)
+active_rooms_gauge: Final = REGISTRY.register(
+    Gauge(
+        "battleships_active_rooms", "Rooms currently kept", callback=lambda: len(rooms)
+    )
+)
+
+
+def get_room(name: str) -> Room:
+    if name not in rooms:
+        rooms[name] = Room(name)
+    return rooms[name]
 
 
-async def receive(websocket) -> dict:
-    data = await websocket.recv()
-    decoded = decode_json_message(data)
-    formatted = pprint.pformat(decoded, indent=2)
-    client_number = get_client_number(websocket)
-    assert client_number is not None
-    logger.debug(f"Received from {client_names[client_number]}: {formatted}")
+def stop_seeking_match(connection: Connection) -> None:
+    """Lets other workers pair players asking for a match once none of this
+    worker's players is waiting for one"""
+    match_seekers.discard(connection)
+    if room_broker is not None and len(match_seekers) == 0:
+        room_broker.release(MATCH_ROOM_NAME)
+
+
+def matched_room_name(room: Room) -> Optional[str]:
+    if room.name.startswith(f"{MATCH_ROOM_NAME}-"):
+        return room.name
+    return None
+
+
+async def find_match(websocket: Connection) -> Optional[Room]:
+    """Returns a new room with an opponent, None if the player has left"""
+    try:
+        key = parse_match_request(websocket.request.path)
+    except InvalidMatchRequest as ex:
+        try:
+            await asyncio.wait_for(websocket.close(1008, str(ex)), timeout=0.2)
+        except TimeoutError:
+            pass
+        return None
+
+    matched = matchmaker.join(key)
+    if matched.done():
+        room = matched.result()
+        rooms[room.name] = room
+        if room_broker is not None:
+            await room_broker.claim(room.name)
+        return room
+
+    closed = asyncio.create_task(websocket.wait_closed())
+    await asyncio.wait([matched, closed], return_when=asyncio.FIRST_COMPLETED)
+    closed.cancel()
+    if not matched.done():
+        matched.cancel()
+        return None
+    return matched.result()
+
+
+def snapshot_room(room: Room) -> None:
+    if snapshotter is not None:
+        snapshotter.update(room)
+
+
+def forget_room_if_empty(room: Room) -> None:
+    if room.is_empty and not room.awaits_reattach and rooms.get(room.name) is room:
+        del rooms[room.name]
+        if room_broker is not None:
+            room_broker.release(room.name)
+
+
+async def receive_limited(websocket: ServerConnection) -> Optional[dict]:
+    """Skips messages over the rate limits, returns None for disconnected abusers"""
+    limiter = limiters[websocket]
+    while True:
+        data = await websocket.recv()
+        received_bytes_counter.inc(len(data))
+        verdict = limiter.check_frame(len(data))
+        if verdict == "allowed":
+            decoded = decode_json_message(data)
+            verdict = limiter.check_message(message_type_of(decoded))
+        if verdict == "allowed":
+            return decoded
+        if verdict == "disconnect":
+            try:
+                await asyncio.wait_for(
+                    websocket.close(1008, "Rate or size limits exceeded"), timeout=0.2
+                )
+            except TimeoutError:
+                pass
+            return None
+
+
+async def receive(room: Room, websocket: Connection) -> Optional[dict]:
+    if isinstance(websocket, LocalConnection):
+        # the embedding device's own player is neither parsed nor limited
+        decoded = await websocket.recv()
+    else:
+        decoded = await receive_limited(websocket)
+        if decoded is None:
+            return None
+
+    stamp_serialized(decoded, "server_received")
+    if logger.isEnabledFor(logging.DEBUG):
+        formatted = pprint.pformat(decoded, indent=2)
+        client_number = room.get_client_number(websocket)
+        assert client_number is not None
+        logger.debug(f"Received from {client_names[client_number]}: {formatted}")
     return decoded
 
 
-async def send(websocket, data: Serializable | dict) -> None:
+def send(
+    room: Room,
+    websocket: Optional[Connection],
+    data: Serializable | dict,
+    after_sent: Optional[Callable[[], None]] = None,
+) -> bool:
+    """Queues the data to the connection, returns False if it is closed"""
+    if websocket is None:
+        return False
     if isinstance(data, dict):
         serialized = data
     else:
         serialized = data.serialize()
-    json_dumped = json.dumps(serialized)
-    await websocket.send(json_dumped)
-    formatted = pprint.pformat(serialized, indent=2)
-    client_number = get_client_number(websocket)
-    assert client_number is not None
-    logger.debug(f"Sent to {client_names[client_number]}: {formatted}")
-
-
-def get_client_number(websocket: Optional[ServerConnection]) -> Optional[ClientNumber]:
-    if websocket == connected_clients[0]:
-        return 0
-    elif websocket == connected_clients[1]:
-        return 1
-    return None
+    if isinstance(websocket, LocalConnection):
+        # passed as it is, the client reads it in the same event loop
+        queued = websocket.put(serialized)
+        if queued and after_sent is not None:
+            after_sent()
+    else:
+        outbox = outboxes.get(websocket)
+        if outbox is None:
+            return False
+        queued = outbox.put(
+            json.dumps(serialized),
+            droppable=message_type_of(serialized) == "PossibleAttack",
+            after_sent=after_sent,
+        )
+    if queued and logger.isEnabledFor(logging.DEBUG):
+        formatted = pprint.pformat(serialized, indent=2)
+        client_number = room.get_client_number(websocket)
+        assert client_number is not None
+        logger.debug(f"Queued to {client_names[client_number]}: {formatted}")
+    return queued
 
 
-def mark_client_as_disconnected(client_number: ClientNumber) -> None:
-    connected_clients[client_number] = None
-    client_info = client_infos[client_number]
+def mark_client_as_disconnected(room: Room, client_number: ClientNumber) -> None:
+    room.connected_clients[client_number] = None
+    client_info = room.client_infos[client_number]
     if client_info is None:
         return
     updated_client_info = dataclasses.replace(client_info, connected=False)
-    client_infos[client_number] = updated_client_info
+    room.client_infos[client_number] = updated_client_info
 
 
-async def try_send(websocket: ServerConnection, data: Serializable | dict) -> bool:
-    client_number = 0 if websocket == connected_clients[0] else 1
-    try:
-        await send(websocket, data)
-    except ConnectionClosedOK:
+async def try_send(
+    room: Room,
+    websocket: Optional[Connection],
+    data: Serializable | dict,
+    after_sent: Optional[Callable[[], None]] = None,
+) -> bool:
+    client_number = 0 if websocket == room.connected_clients[0] else 1
+    if not send(room, websocket, data, after_sent):
         logger.info(
-            f"Client {client_names[client_number]} has closed the connection properly"
-            + " but they shouldn't have"
-        )
-        mark_client_as_disconnected(client_number)
-        return False
-    except ConnectionClosedError:
-        logger.info(
-            f"Connection to client {client_names[client_number]} has closed improperly"
+            f"Connection to client {client_names[client_number]} has closed"
             + " but it shouldn't have"
         )
-        mark_client_as_disconnected(client_number)
+        mark_client_as_disconnected(room, client_number)
         return False
-    else:
-        return True
+    return True
 
 
-async def try_receive(websocket: ServerConnection) -> Optional[dict]:
-    client_number = get_client_number(websocket)
+async def try_receive(room: Room, websocket: Connection) -> Optional[dict]:
+    client_number = room.get_client_number(websocket)
     try:
-        data = await receive(websocket)
+        data = await receive(room, websocket)
     except ConnectionClosedOK:
         logger.info(
             f"Client {client_names[client_number]} has disconnected without error"
         )
-        mark_client_as_disconnected(client_number)
+        mark_client_as_disconnected(room, client_number)
         return None
     except ConnectionClosedError:
         logger.info(
             f"Connection to client {client_names[client_number]} has terminated"
             + " improperly"
         )
-        mark_client_as_disconnected(client_number)
+        mark_client_as_disconnected(room, client_number)
         return None
-    else:
-        return data
+    if data is None:
+        logger.info(
+            f"Client {client_names[client_number]} has been disconnected for"
+            + " exceeding the limits"
+        )
+        mark_client_as_disconnected(room, client_number)
+    return data
 
 
-def both_clients_connected() -> bool:
-    return connected_clients[0] is not None and connected_clients[1] is not None
+def both_clients_connected(room: Room) -> bool:
+    return (
+        room.connected_clients[0] is not None and room.connected_clients[1] is not None
+    )
 
 
-def can_game_start() -> bool:
+def can_game_start(room: Room) -> bool:
     return (
-        both_clients_connected()
-        and client_infos[0] is not None
-        and client_infos[1] is not None
-        and client_infos[0].ready
-        and client_infos[1].ready
+        both_clients_connected(room)
+        and room.client_infos[0] is not None
+        and room.client_infos[1] is not None
+        and room.client_infos[0].ready
+        and room.client_infos[1].ready
     )
 
 
-async def welcome_first_client(websocket: ServerConnection) -> bool:
-    data = await try_receive(websocket)
+def room_state_of(room: Room) -> RoomState:
+    return RoomState(
+        room=room.name,
+        players=list(room.client_infos),
+        history=[
+            RelayedMessage(sender=sender, message=message)
+            for sender, message in room.history
+        ],
+    )
+
+
+def broadcast_to_spectators(room: Room, data: Serializable) -> None:
+    if len(room.spectators) == 0:
+        return
+    for spectator in list(room.spectators):
+        transport = spectator.transport
+        if transport is None or (
+            transport.get_write_buffer_size() > CONFIG.spectator_write_buffer_limit
+        ):
+            logger.info(f"Dropping slow spectator {spectator.remote_address}")
+            room.spectators.discard(spectator)
+            if transport is not None:
+                transport.abort()
+    # encoded once, then the same frame is written to every spectator
+    # without waiting for any of them
+    frame = data.stringify()
+    broadcast(room.spectators, frame)
+    sent_bytes_counter.inc(len(frame) * len(room.spectators))
+
+
+def relay_to_spectators(room: Room, sender: ClientNumber, data: dict) -> None:
+    if data.get("what") == "GameMessage":
+        if data.get("data", {}).get("type_") != "PossibleAttack":
+            room.history.append((sender, data))
+            snapshot_room(room)
+    broadcast_to_spectators(room, RelayedMessage(sender=sender, message=data))
+
+
+def message_type_of(data: dict) -> str:
+    if data.get("what") == "GameMessage":
+        return str(data.get("data", {}).get("type_"))
+    return str(data.get("what"))
+
+
+def relay_recorder(message_type: str) -> Callable[[], None]:
+    """Records the relay once the message is sent to the opponent"""
+    received_at = time.perf_counter()
+
+    def relayed() -> None:
+        relay_latency_histogram.observe(
+            time.perf_counter() - received_at, type=message_type
+        )
+        relayed_messages_counter.inc(type=message_type)
+
+    return relayed
+
+
+async def welcome_first_client(room: Room, websocket: Connection) -> bool:
+    data = await try_receive(room, websocket)
     if data is None:
         return False
     client_info = parse_client_info(data)
-    client_infos[0] = client_info
+    room.client_infos[0] = client_info
+    snapshot_room(room)
     game_info = GameInfo(
-        masted_ships=CONFIG.masted_ships_counts,
-        board_size=CONFIG.board_size,
+        masted_ships=room.masted_ships_counts,
+        board_size=room.board_size,
         uniqid=uuid4(),
         status=GameStatus.WaitingToStart,
         opponent=None,
-        extra=ExtraInfo(you_start_first=True),
+        extra=ExtraInfo(you_start_first=True, room=matched_room_name(room)),
     )
-    sent = await try_send(websocket, game_info)
+    sent = await try_send(room, websocket, game_info)
     if not sent:
         return False
+    broadcast_to_spectators(room, room_state_of(room))
     return True
 
 
-async def welcome_second_client(websocket: ServerConnection) -> bool:
-    data = await try_receive(websocket)
+async def welcome_second_client(room: Room, websocket: Connection) -> bool:
+    data = await try_receive(room, websocket)
     if data is None:
         return False
     client_info = parse_client_info(data)
-    client_infos[1] = client_info
-    return await update_game_info()
+    room.client_infos[1] = client_info
+    snapshot_room(room)
+    return await update_game_info(room)
+
 
+async def update_game_info(room: Room) -> bool:
+    with update_game_info_histogram.time():
+        return await _update_game_info(room)
 
-async def update_game_info() -> bool:
-    client1_conn = connected_clients[0]
+
+async def _update_game_info(room: Room) -> bool:
+    client1_conn = room.connected_clients[0]
     assert client1_conn is not None
+    client_infos = room.client_infos
 
     game_status = GameStatus.WaitingToStart
-    if can_game_start():
+    if can_game_start(room):
         game_status = GameStatus.Started
 
     first_client_won = None
@@ -177,41 +439,66 @@ async def update_game_info() -> bool:
         game_status = GameStatus.Ended
         first_client_won = True
         second_client_won = False
+    elif room.forfeited is not None:
+        game_status = GameStatus.Ended
+        first_client_won = room.forfeited == 1
+        second_client_won = room.forfeited == 0
+
+    if game_status == GameStatus.Ended:
+        turn_clocks.stop(room.name)
+    elif game_status == GameStatus.Started and not turn_clocks.is_running(room.name):
+        turn_clocks.start_turn(room.name, room.turn)
+
+    broadcast_to_spectators(room, room_state_of(room))
 
     game_info_for_first_client = GameInfo(
-        masted_ships=CONFIG.masted_ships_counts,
-        board_size=CONFIG.board_size,
+        masted_ships=room.masted_ships_counts,
+        board_size=room.board_size,
         uniqid=uuid4(),
         status=game_status,
         opponent=client_infos[1],
-        extra=ExtraInfo(you_start_first=True, you_won=first_client_won),
+        extra=ExtraInfo(
+            you_start_first=True,
+            you_won=first_client_won,
+            error=time_is_up if room.forfeited == 0 else None,
+            room=matched_room_name(room),
+        ),
     )
-    sent_to_client0 = await try_send(client1_conn, game_info_for_first_client)
+    sent_to_client0 = await try_send(room, client1_conn, game_info_for_first_client)
     if not sent_to_client0:
         return False
 
-    if not second_client_has_already_connected:
+    if not room.second_client_has_already_connected:
         return True
 
     game_info_for_second_client = GameInfo(
-        masted_ships=CONFIG.masted_ships_counts,
-        board_size=CONFIG.board_size,
+        masted_ships=room.masted_ships_counts,
+        board_size=room.board_size,
         uniqid=uuid4(),
         status=game_status,
         opponent=client_infos[0],
-        extra=ExtraInfo(you_start_first=False, you_won=second_client_won),
+        extra=ExtraInfo(
+            you_start_first=False,
+            you_won=second_client_won,
+            error=time_is_up if room.forfeited == 1 else None,
+            room=matched_room_name(room),
+        ),
+    )
+    sent_to_client1 = await try_send(
+        room, room.connected_clients[1], game_info_for_second_client
     )
-    sent_to_client1 = await try_send(connected_clients[1], game_info_for_second_client)
     if not sent_to_client1:
         return False
 
     return True
 
 
-async def reset_game() -> None:
-    global second_client_has_already_connected
-    for idx, client_conn in enumerate(connected_clients):
-        client_infos[idx] = None
+async def reset_game(room: Room) -> None:
+    if handing_off:
+        # the room goes to the new server as it is
+        return
+    resets_counter.inc()
+    for client_conn in room.connected_clients:
         if client_conn is None:
             continue
         try:
@@ -219,28 +506,258 @@ async def reset_game() -> None:
         except TimeoutError:
             pass
         # no except ConnectionClosed is needed (see the source of close())
-        connected_clients[idx] = None
-    second_client_has_already_connected = False
+    turn_clocks.stop(room.name)
+    room.clear_players()
+    snapshot_room(room)
+    broadcast_to_spectators(room, room_state_of(room))
+    forget_room_if_empty(room)
+
+
+def game_ended(room: Room) -> bool:
+    return room.forfeited is not None or any(
+        client_info is not None and client_info.all_ships_wrecked
+        for client_info in room.client_infos
+    )
 
 
-async def listen(websocket: ServerConnection):
-    global second_client_has_already_connected
+async def request_rematch(room: Room, client_number: ClientNumber) -> bool:
+    """Starts the next game in the room once both players have asked for it.
 
-    if connected_clients[0] is None:
-        connected_clients[0] = websocket
-        first_client_joined = await welcome_first_client(websocket)
+    Returns False if a player could not be told.
+    """
+    if not game_ended(room):
+        return True
+    room.rematch_requests.add(client_number)
+    if len(room.rematch_requests) < 2:
+        return True
+    rematches_counter.inc()
+    room.start_next_game()
+    turn_clocks.stop(room.name)
+    snapshot_room(room)
+    logger.info(f"Rematch in {room.name}")
+    return await update_game_info(room)
+
+
+def forfeit(room_name: str, player: ClientNumber) -> None:
+    room = rooms.get(room_name)
+    if room is None or handing_off:
+        return
+    logger.info(f"Client {client_names[player]} of {room_name} ran out of time")
+    room.forfeited = player
+    ending = asyncio.create_task(update_game_info(room))
+    background_tasks.add(ending)
+    ending.add_done_callback(background_tasks.discard)
+
+
+turn_clocks = TurnClocks(on_expired=forfeit)
+
+
+def start_turn_clocks() -> None:
+    if turn_clocks.enabled:
+        ticking = asyncio.create_task(turn_clocks.wheel.run())
+        background_tasks.add(ticking)
+
+
+async def reattach(room: Room, websocket: Connection) -> bool:
+    """Puts a player back to its room restored from a snapshot.
+
+    Returns False if it is not one of the players the room waits for.
+    """
+    try:
+        if isinstance(websocket, LocalConnection):
+            data = await websocket.recv()
+        else:
+            frame = await websocket.recv()
+            if limiters[websocket].check_frame(len(frame)) != "allowed":
+                return False
+            data = decode_json_message(frame)
+    except (ConnectionClosedOK, ConnectionClosedError):
+        return False
+    client_info = parse_client_info(data)
+    client_number = room.restored_client_number(client_info.uniqid)
+    if client_number is None:
+        try:
+            await asyncio.wait_for(
+                websocket.close(1013, "Room waits for its players to reconnect"),
+                timeout=0.2,
+            )
+        except TimeoutError:
+            pass
+        return False
+
+    room.connected_clients[client_number] = websocket
+    # not ready until the client has resumed its kept game, see client.play()
+    room.client_infos[client_number] = dataclasses.replace(client_info, connected=True)
+    snapshot_room(room)
+    if not room.awaits_reattach:
+        room.restored_at = None
+    logger.info(f"Client {client_names[client_number]} reattached to {room.name}")
+
+    game_info = GameInfo(
+        masted_ships=room.masted_ships_counts,
+        board_size=room.board_size,
+        uniqid=uuid4(),
+        status=GameStatus.WaitingToStart,
+        opponent=room.client_infos[int(not client_number)],
+        extra=ExtraInfo(
+            you_start_first=client_number == 0,
+            resumed=True,
+            your_turn=room.turn == client_number,
+            room=matched_room_name(room),
+        ),
+    )
+    if not await try_send(room, websocket, game_info):
+        return False
+    if both_clients_connected(room):
+        return await update_game_info(room)
+    return True
+
+
+async def expire_restored_room(room: Room) -> None:
+    await asyncio.sleep(CONFIG.reattach_timeout_seconds)
+    if room.awaits_reattach and rooms.get(room.name) is room:
+        logger.info(f"Players of restored {room.name} have not reattached in time")
+        await reset_game(room)
+
+
+async def adopt_rooms(restored: list[Room]) -> None:
+    for room in restored:
+        if room_broker is not None:
+            if await room_broker.claim(room.name) != room_broker.worker:
+                continue
+        rooms[room.name] = room
+        snapshot_room(room)
+        expiring = asyncio.create_task(expire_restored_room(room))
+        background_tasks.add(expiring)
+        expiring.add_done_callback(background_tasks.discard)
+
+
+def start_snapshots(path: str) -> None:
+    global snapshotter
+    snapshotter = Snapshotter(path)
+    snapshotter.start()
+
+
+async def restore_rooms_and_snapshot(path: str) -> None:
+    start_snapshots(path)
+    await adopt_rooms(restore_rooms(path))
+
+
+async def close_for_restart(websocket: Connection) -> None:
+    outbox = (
+        outboxes.get(websocket) if isinstance(websocket, ServerConnection) else None
+    )
+    try:
+        if outbox is not None:
+            await asyncio.wait_for(outbox.drained(), timeout=1)
+        await asyncio.wait_for(websocket.close(1012, "Server restarts"), timeout=1)
+    except TimeoutError:
+        pass
+
+
+async def hand_off(server: Server) -> bytes:
+    """Stops serving and returns the rooms encoded for the new server"""
+    global handing_off, snapshotter
+    handing_off = True
+    server.close(close_connections=False)
+    if snapshotter is not None:
+        await snapshotter.stop()
+        snapshotter = None
+    kept_rooms = list(rooms.values())
+    await asyncio.gather(
+        *(
+            close_for_restart(websocket)
+            for room in kept_rooms
+            for websocket in [*room.connected_clients, *room.spectators]
+            if websocket is not None
+        )
+    )
+    return encode_snapshot(
+        [
+            RoomEncoder().encode(room)
+            for room in kept_rooms
+            if room.client_infos[0] is not None or room.client_infos[1] is not None
+        ]
+    )
+
+
+async def watch(room: Room, websocket: ServerConnection) -> None:
+    if len(room.spectators) >= CONFIG.max_spectators_per_room:
+        try:
+            await asyncio.wait_for(
+                websocket.close(1013, "Too many spectators"), timeout=0.2
+            )
+        except TimeoutError:
+            pass
+        return
+
+    room.spectators.add(websocket)
+    logger.debug(f"Spectator of {room.name} connected: {websocket.remote_address}")
+    try:
+        await websocket.send(room_state_of(room).stringify())
+        # spectators only listen, anything they send is ignored
+        async for _ in websocket:
+            pass
+    except (ConnectionClosedOK, ConnectionClosedError):
+        pass
+    finally:
+        room.spectators.discard(websocket)
+        forget_room_if_empty(room)
+
+
+async def listen(websocket: Connection):
+    room_name, role = parse_request_path(websocket.request.path)
+    connections_counter.inc(role=role)
+    if role == "spectator":
+        # the embedding device's player never connects as a spectator
+        assert isinstance(websocket, ServerConnection)
+        return await watch(get_room(room_name), websocket)
+    if room_name == MATCH_ROOM_NAME:
+        try:
+            matched_room = await find_match(websocket)
+        finally:
+            stop_seeking_match(websocket)
+        if matched_room is None:
+            return
+        room = matched_room
+    else:
+        room = get_room(room_name)
+
+    if isinstance(websocket, LocalConnection):
+        return await play(room, websocket)
+    outboxes[websocket] = Outbox(
+        websocket, on_sent=lambda frame: sent_bytes_counter.inc(len(frame))
+    )
+    limiters[websocket] = RateLimiter(rate_limits)
+    try:
+        return await play(room, websocket)
+    finally:
+        outboxes.pop(websocket).close()
+        del limiters[websocket]
+
+
+async def play(room: Room, websocket: Connection):
+    if room.awaits_reattach:
+        reattached = await reattach(room, websocket)
+        if not reattached:
+            if room.get_client_number(websocket) is not None:
+                return await reset_game(room)
+            return
+    elif room.connected_clients[0] is None:
+        room.connected_clients[0] = websocket
+        first_client_joined = await welcome_first_client(room, websocket)
         if not first_client_joined:
-            return await reset_game()
+            return await reset_game(room)
         logger.debug(f"First client connected: {websocket.remote_address}")
-    elif connected_clients[1] is None:
-        connected_clients[1] = websocket
-        second_client_has_already_connected = True
-        second_client_joined = await welcome_second_client(websocket)
+    elif room.connected_clients[1] is None:
+        room.connected_clients[1] = websocket
+        room.second_client_has_already_connected = True
+        second_client_joined = await welcome_second_client(room, websocket)
         if not second_client_joined:
-            return await reset_game()
+            return await reset_game(room)
         logger.debug(f"Second client connected: {websocket.remote_address}")
 
-    client_number = get_client_number(websocket)
+    client_number = room.get_client_number(websocket)
     if client_number is None:
         try:
             await asyncio.wait_for(
@@ -252,37 +769,207 @@ async def listen(websocket: ServerConnection):
             return
 
     while True:
-        data = await try_receive(websocket)
+        data = await try_receive(room, websocket)
         if data is None:
-            return await reset_game()
+            return await reset_game(room)
 
         if data.get("what") == "ClientInfo":
             parsed_client_info = parse_client_info(data)
-            client_infos[client_number] = parsed_client_info
-            updated = await update_game_info()
+            room.client_infos[client_number] = parsed_client_info
+            snapshot_room(room)
+            if room.awaits_reattach:
+                # sent to both once the opponent has reattached
+                continue
+            updated = await update_game_info(room)
             if not updated:
-                return await reset_game()
+                return await reset_game(room)
+        elif data.get("what") == "Rematch":
+            if not await request_rematch(room, client_number):
+                return await reset_game(room)
         else:
-            opponent_conn = connected_clients[int(not client_number)]
-            sent = await try_send(opponent_conn, data)
+            relayed = relay_recorder(message_type_of(data))
+            opponent_conn = room.connected_clients[int(not client_number)]
+            stamp_serialized(data, "server_forwarding")
+            sent = await try_send(room, opponent_conn, data, after_sent=relayed)
             if not sent:
-                return await reset_game()
+                return await reset_game(room)
+            relay_to_spectators(room, client_number, data)
+            if message_type_of(data) == "AttackRequest":
+                turn_clocks.start_turn(room.name, 0 if client_number == 1 else 1)
+
+
+async def release_unused_claim(connection: ServerConnection, room_name: str) -> None:
+    """Releases the room once the connection has closed if it has not been
+    created, e.g. the handshake has failed. The player asking for a match
+    stops waiting for one."""
+    await connection.wait_closed()
+    if room_name == MATCH_ROOM_NAME:
+        stop_seeking_match(connection)
+    elif room_broker is not None and room_name not in rooms:
+        room_broker.release(room_name)
+
+
+async def route_to_room_owner(
+    connection: ServerConnection, request: Request
+) -> Optional[Response]:
+    """Accepts clients of rooms of this worker, redirects the others.
+
+    The room itself is created by listen() once the handshake succeeds.
+    """
+    room_name, _ = parse_request_path(request.path)
+    if room_broker is None or room_name in rooms:
+        return None
+    if room_name == MATCH_ROOM_NAME:
+        # players asking for a match meanwhile are all paired by the worker
+        # owning it, it is released once none of them is left
+        match_seekers.add(connection)
+    owner = await room_broker.claim(room_name)
+    if owner == room_broker.worker:
+        releasing = asyncio.create_task(release_unused_claim(connection, room_name))
+        background_tasks.add(releasing)
+        releasing.add_done_callback(background_tasks.discard)
+        return None
+    match_seekers.discard(connection)
+    response = connection.respond(HTTPStatus.TEMPORARY_REDIRECT, "")
+    response.headers["Location"] = redirect_location(
+        request.headers.get("Host"), worker_port(owner), request.path
+    )
+    return response
 
 
-async def main():
-    async with serve(
-        listen,
-        CONFIG.server_host,
-        CONFIG.server_port,
+def serve_options() -> dict[str, Any]:
+    return dict(
         open_timeout=5,
         ping_interval=CONFIG.conn_ping_interval,
         ping_timeout=CONFIG.conn_ping_timeout,
         close_timeout=5,
+        max_size=CONFIG.max_frame_size,
         family=socket.AF_INET,
+    )
+
+
+async def serve_worker(
+    worker: int,
+    broker_path: str,
+    host: str,
+    port: int,
+    limits: Mapping[str, Rate] = CONFIG.rate_limits,
+    snapshot_path: Optional[str] = CONFIG.snapshot_path,
+) -> None:
+    global room_broker, rate_limits
+    room_broker = await BrokerClient.connect(worker, broker_path)
+    rate_limits = limits
+    start_turn_clocks()
+    if snapshot_path is not None:
+        await restore_rooms_and_snapshot(f"{snapshot_path}.{worker}")
+    if CONFIG.metrics_enabled:
+        await serve_metrics(host, CONFIG.metrics_port + worker)
+    async with (
+        serve(
+            listen,
+            host,
+            port,
+            process_request=route_to_room_owner,
+            reuse_port=True,
+            **serve_options(),
+        ),
+        serve(
+            listen,
+            host,
+            worker_port(worker),
+            process_request=route_to_room_owner,
+            **serve_options(),
+        ),
     ):
-        logger.info(f"Server started at {CONFIG.server_host}:{CONFIG.server_port}")
+        logger.info(f"Worker {worker} started at {host}:{worker_port(worker)}")
         await asyncio.get_running_loop().create_future()
 
 
+def connect_local(path: str = "") -> LocalConnection:
+    """Connects the player of the device embedding the server to its room,
+    see serve_embedded(). Returns the player's end of the connection."""
+    client_end, server_end = LocalConnection.pair(path)
+    listening = asyncio.create_task(listen(server_end))
+    background_tasks.add(listening)
+    listening.add_done_callback(background_tasks.discard)
+    return client_end
+
+
+async def serve_embedded(
+    host: str = CONFIG.server_host,
+    port: int = CONFIG.server_port,
+    limits: Mapping[str, Rate] = CONFIG.rate_limits,
+) -> Server:
+    """Serves the remote players from the event loop of the client embedding
+    the server, its own player connects by connect_local()"""
+    global rate_limits
+    rate_limits = limits
+    start_turn_clocks()
+    if CONFIG.snapshot_path is not None:
+        await restore_rooms_and_snapshot(CONFIG.snapshot_path)
+    if CONFIG.metrics_enabled:
+        await serve_metrics(host, CONFIG.metrics_port)
+    server = await serve(listen, host, port, **serve_options())
+    logger.info(f"Embedded server started at {host}:{port}")
+    return server
+
+
+async def main(
+    host: str = CONFIG.server_host,
+    port: int = CONFIG.server_port,
+    workers: int = CONFIG.server_workers,
+    loop_name: EventLoopName = CONFIG.event_loop,
+    limits: Mapping[str, Rate] = CONFIG.rate_limits,
+    takeover: bool = False,
+    snapshot_path: Optional[str] = CONFIG.snapshot_path,
+    handoff_path: Optional[str] = CONFIG.handoff_socket_path,
+):
+    global rate_limits
+    if workers > 1:
+        return await supervise(workers, host, port, loop_name, limits, snapshot_path)
+    rate_limits = limits
+    start_turn_clocks()
+    handoff: Optional[Handoff] = None
+    if takeover and handoff_path is not None:
+        handoff = await take_over(handoff_path)
+        if snapshot_path is not None:
+            start_snapshots(snapshot_path)
+        await adopt_rooms(mark_restored(decode_snapshot(handoff.state)))
+    elif snapshot_path is not None:
+        await restore_rooms_and_snapshot(snapshot_path)
+
+    # taken over sockets: the server's one and the metrics' one if enabled
+    taken_over = handoff.sockets if handoff is not None else []
+    metrics_server: Optional[asyncio.Server] = None
+    if CONFIG.metrics_enabled:
+        metrics_sock = taken_over[1] if len(taken_over) > 1 else None
+        metrics_server = await serve_metrics(
+            host, CONFIG.metrics_port, sock=metrics_sock
+        )
+    if len(taken_over) > 0:
+        serving = serve(listen, sock=taken_over[0], **serve_options())
+    else:
+        serving = serve(listen, host, port, **serve_options())
+    async with serving as server:
+        logger.info(f"Server started at {host}:{port}")
+        if handoff is not None:
+            handoff.acknowledge()
+
+        def listening_sockets() -> list[socket.socket]:
+            servers = [server.server, metrics_server]
+            return [
+                sock
+                for listening in servers
+                if listening is not None
+                for sock in listening.sockets[:1]
+            ]
+
+        if handoff_path is None or not await serve_handoff(
+            handoff_path, listening_sockets, lambda: hand_off(server)
+        ):
+            await asyncio.get_running_loop().create_future()
+    logger.info("Server handed over, exiting")
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    event_loop.run(main(takeover="--takeover" in sys.argv[1:]))
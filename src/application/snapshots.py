@@ -0,0 +1,282 @@
+"""Snapshots of rooms, restored after the server restarts.
+
+A room is encoded when its state changes. Moves are appended to its encoded
+history, so the cost does not grow with the length of the match. The file
+of all rooms is rewritten aside and renamed, so a crash while writing keeps
+the previous snapshot.
+"""
+
+import asyncio
+import json
+import os
+import struct
+import tempfile
+import time
+from typing import Final, Optional
+from uuid import UUID
+
+from application.messaging import ClientInfo
+from application.metrics import REGISTRY, Histogram
+from application.room import ClientNumber, Room
+from config import CONFIG, MastedShipsCounts, get_logger
+from domain.attacks import AttackResultStatus
+
+logger: Final = get_logger(__name__)
+
+# magic, format version, rooms count
+FILE_HEADER: Final = struct.Struct("<4sHI")
+SNAPSHOT_MAGIC: Final = b"BSRS"
+SNAPSHOT_VERSION: Final = 2
+# room name length, second client has already connected, history length
+ROOM_HEADER: Final = struct.Struct("<HBI")
+# board size, ships counts, after the room name since version 2
+ROOM_GAME: Final = struct.Struct("<B4B")
+# uniqid, flags
+PLAYER: Final = struct.Struct("<16sB")
+# sender, kind, message uniqid, row, column, status
+MOVE: Final = struct.Struct("<BB16sBBB")
+# sender, kind, JSON length, for messages of unexpected shape
+RAW_MOVE: Final = struct.Struct("<BBI")
+
+NO_PLAYER: Final = b"\x00"
+ATTACK_REQUEST: Final = 0
+ATTACK_RESULT: Final = 1
+RAW: Final = 255
+
+STATUSES: Final = tuple(AttackResultStatus)
+PLAYER_FLAGS: Final = ("connected", "ships_placed", "ready", "all_ships_wrecked")
+
+encode_histogram: Final = REGISTRY.register(
+    Histogram(
+        "battleships_snapshot_encode_seconds",
+        "Duration of encoding a room into its snapshot",
+        buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005),
+    )
+)
+
+
+def _encode_player(info: Optional[ClientInfo]) -> bytes:
+    if info is None:
+        return NO_PLAYER
+    flags = sum(1 << n for n, flag in enumerate(PLAYER_FLAGS) if getattr(info, flag))
+    return b"\x01" + PLAYER.pack(info.uniqid.bytes, flags)
+
+
+def _encode_move(sender: ClientNumber, message: dict) -> bytes:
+    try:
+        data = message["data"]
+        field = data["field"]
+        row, column = ord(field[0]) - ord("A"), int(field[1:])
+        uniqid = UUID(message["uniqid"]).bytes
+        if data["type_"] == "AttackRequest":
+            return MOVE.pack(sender, ATTACK_REQUEST, uniqid, row, column, 0)
+        if data["type_"] == "AttackResult":
+            status = STATUSES.index(AttackResultStatus(data["status"]))
+            return MOVE.pack(sender, ATTACK_RESULT, uniqid, row, column, status)
+    except (KeyError, TypeError, ValueError, IndexError, struct.error):
+        pass
+    raw = json.dumps(message).encode()
+    return RAW_MOVE.pack(sender, RAW, len(raw)) + raw
+
+
+class RoomEncoder:
+    """Encodes a room, keeping its encoded history between calls"""
+
+    def __init__(self) -> None:
+        self._history = bytearray()
+        self._history_len = 0
+
+    def encode(self, room: Room) -> bytes:
+        if len(room.history) < self._history_len:
+            # cleared for a new game
+            self._history = bytearray()
+            self._history_len = 0
+        for sender, message in room.history[self._history_len :]:
+            self._history += _encode_move(sender, message)
+        self._history_len = len(room.history)
+
+        name = room.name.encode()
+        return b"".join(
+            [
+                ROOM_HEADER.pack(
+                    len(name),
+                    room.second_client_has_already_connected,
+                    self._history_len,
+                ),
+                name,
+                ROOM_GAME.pack(
+                    room.board_size,
+                    room.masted_ships_counts.single,
+                    room.masted_ships_counts.two,
+                    room.masted_ships_counts.three,
+                    room.masted_ships_counts.four,
+                ),
+                _encode_player(room.client_infos[0]),
+                _encode_player(room.client_infos[1]),
+                self._history,
+            ]
+        )
+
+
+def _decode_player(blob: bytes, offset: int) -> tuple[Optional[ClientInfo], int]:
+    if blob[offset : offset + 1] == NO_PLAYER:
+        return None, offset + 1
+    uniqid, flags = PLAYER.unpack_from(blob, offset + 1)
+    values = {flag: bool(flags >> n & 1) for n, flag in enumerate(PLAYER_FLAGS)}
+    # nobody is connected to a restored room
+    values["connected"] = False
+    return ClientInfo(uniqid=UUID(bytes=uniqid), **values), offset + 1 + PLAYER.size
+
+
+def _decode_move(blob: bytes, offset: int) -> tuple[ClientNumber, dict, int]:
+    sender, kind = blob[offset], blob[offset + 1]
+    if kind == RAW:
+        _, _, length = RAW_MOVE.unpack_from(blob, offset)
+        start = offset + RAW_MOVE.size
+        return sender, json.loads(blob[start : start + length]), start + length
+
+    _, _, uniqid, row, column, status = MOVE.unpack_from(blob, offset)
+    data: dict = {"field": f"{chr(ord('A') + row)}{column}"}
+    if kind == ATTACK_RESULT:
+        data["status"] = STATUSES[status].value
+    data["type_"] = "AttackRequest" if kind == ATTACK_REQUEST else "AttackResult"
+    message = {"uniqid": str(UUID(bytes=uniqid)), "data": data, "what": "GameMessage"}
+    return sender, message, offset + MOVE.size
+
+
+def decode_room(blob: bytes, version: int = SNAPSHOT_VERSION) -> Room:
+    name_len, second_connected, history_len = ROOM_HEADER.unpack_from(blob)
+    offset = ROOM_HEADER.size
+    room = Room(blob[offset : offset + name_len].decode())
+    offset += name_len
+    if version >= 2:
+        room.board_size, single, two, three, four = ROOM_GAME.unpack_from(blob, offset)
+        room.masted_ships_counts = MastedShipsCounts(
+            single=single, two=two, three=three, four=four
+        )
+        offset += ROOM_GAME.size
+    room.second_client_has_already_connected = bool(second_connected)
+    for client_number in (0, 1):
+        room.client_infos[client_number], offset = _decode_player(blob, offset)
+    for _ in range(history_len):
+        sender, message, offset = _decode_move(blob, offset)
+        room.history.append((sender, message))
+    return room
+
+
+def encode_snapshot(blobs: list[bytes]) -> bytes:
+    return b"".join(
+        [
+            FILE_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(blobs)),
+            *(struct.pack("<I", len(blob)) + blob for blob in blobs),
+        ]
+    )
+
+
+def decode_snapshot(content: bytes) -> list[Room]:
+    magic, version, rooms_count = FILE_HEADER.unpack_from(content)
+    # rooms of version 1 play the server's game
+    if magic != SNAPSHOT_MAGIC or version not in (1, SNAPSHOT_VERSION):
+        raise ValueError("Snapshot has unexpected header")
+    offset = FILE_HEADER.size
+    rooms = []
+    for _ in range(rooms_count):
+        (length,) = struct.unpack_from("<I", content, offset)
+        offset += 4
+        rooms.append(decode_room(content[offset : offset + length], version))
+        offset += length
+    return rooms
+
+
+def mark_restored(rooms: list[Room]) -> list[Room]:
+    restored_at = time.monotonic()
+    for room in rooms:
+        room.restored_at = restored_at
+    return rooms
+
+
+def write_snapshot_file(path: str, blobs: list[bytes]) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as snapshot_file:
+            snapshot_file.write(encode_snapshot(blobs))
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_snapshot_file(path: str) -> list[Room]:
+    with open(path, "rb") as snapshot_file:
+        return decode_snapshot(snapshot_file.read())
+
+
+def restore_rooms(path: str) -> list[Room]:
+    """Returns rooms waiting for their players, none if there is no snapshot"""
+    try:
+        rooms = read_snapshot_file(path)
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError, struct.error) as ex:
+        logger.warning(f"Snapshot {path} not usable, starting without rooms: {ex}")
+        return []
+    logger.info(f"Restored {len(rooms)} rooms from {path}")
+    return mark_restored(rooms)
+
+
+class Snapshotter:
+    def __init__(
+        self, path: str, interval_seconds: float = CONFIG.snapshot_interval_seconds
+    ) -> None:
+        self._path = path
+        self._interval = interval_seconds
+        self._encoders: dict[str, RoomEncoder] = {}
+        self._blobs: dict[str, bytes] = {}
+        self._changed = asyncio.Event()
+        self._stopped = False
+        self._running: Optional[asyncio.Task] = None
+
+    def update(self, room: Room) -> None:
+        """Encodes the room right away, the file is written in the background"""
+        if room.client_infos[0] is None and room.client_infos[1] is None:
+            return self.forget(room.name)
+        with encode_histogram.time():
+            encoder = self._encoders.setdefault(room.name, RoomEncoder())
+            self._blobs[room.name] = encoder.encode(room)
+        self._changed.set()
+
+    def forget(self, room_name: str) -> None:
+        self._encoders.pop(room_name, None)
+        if self._blobs.pop(room_name, None) is not None:
+            self._changed.set()
+
+    async def write(self) -> None:
+        self._changed.clear()
+        blobs = list(self._blobs.values())
+        try:
+            await asyncio.to_thread(write_snapshot_file, self._path, blobs)
+        except OSError as ex:
+            logger.warning(f"Writing snapshot {self._path} failed: {ex}")
+
+    async def run(self) -> None:
+        """Writes the file on changes and on a timer until stopped"""
+        while not self._stopped:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=self._interval)
+            except TimeoutError:
+                pass
+            if not self._stopped:
+                await self.write()
+
+    def start(self) -> None:
+        self._running = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Waits for a write in progress, the file is not written afterwards"""
+        self._stopped = True
+        self._changed.set()
+        if self._running is not None:
+            await self._running
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+import asyncio
+import socket
+import sys
+from application.messaging import (
+    GameMessage,
+    RelayedMessage,
+    RoomState,
+    decode_json_message,
+    parse_game_message,
+    parse_spectator_message,
+)
+from config import CONFIG, get_logger
+from domain.attacks import AttackRequest, AttackResult
+from domain.boards import ShotsBoard
+from websockets.asyncio.client import connect
+
+logger = get_logger(__name__)
+
+
+class Spectator:
+    def __init__(self, board_size: int) -> None:
+        self._board_size = board_size
+        self._players_connected = [False, False]
+        self._attacks_boards = [ShotsBoard(), ShotsBoard()]
+
+    def reset(self) -> None:
+        self._attacks_boards = [ShotsBoard(), ShotsBoard()]
+
+    def handle_relayed(self, relayed: RelayedMessage) -> None:
+        if relayed.message.get("what") != "GameMessage":
+            return
+        message: GameMessage = parse_game_message(relayed.message)
+        if isinstance(att_req := message.data, AttackRequest):
+            board = self._attacks_boards[relayed.sender]
+            board.add_attack(att_req.field, "Unknown")
+        elif isinstance(att_res := message.data, AttackResult):
+            # the result is sent back by the attacked player
+            board = self._attacks_boards[int(not relayed.sender)]
+            board.add_attack(att_res.field, att_res.status)
+
+    def handle_room_state(self, room_state: RoomState) -> None:
+        self._players_connected = [
+            player is not None and player.connected for player in room_state.players
+        ]
+        self.reset()
+        for relayed in room_state.history:
+            self.handle_relayed(relayed)
+
+    def show_state(self) -> str:
+        state = []
+        for idx, board in enumerate(self._attacks_boards):
+            connected = "connected" if self._players_connected[idx] else "waiting"
+            state.append(f"PLAYER {idx + 1} ATTACKS ({connected})")
+            state.append(board.represent_graphically(self._board_size))
+        return "\n".join(state)
+
+
+async def main(room_name: str = "") -> None:
+    server_address = (
+        f"ws://{CONFIG.server_host}:{CONFIG.server_port}/{room_name}?role=spectator"
+    )
+    logger.info(f"Will try to connect to {server_address}")
+    spectator = Spectator(CONFIG.board_size)
+    async with connect(
+        server_address,
+        open_timeout=5,
+        ping_interval=CONFIG.conn_ping_interval,
+        ping_timeout=CONFIG.conn_ping_timeout,
+        close_timeout=5,
+        family=socket.AF_INET,
+    ) as ws:
+        async for data in ws:
+            message = parse_spectator_message(decode_json_message(data))
+            if isinstance(message, RoomState):
+                spectator.handle_room_state(message)
+            else:
+                spectator.handle_relayed(message)
+            print(spectator.show_state())
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*sys.argv[1:2]))
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+
+"""Usage: tracing.py [TRACES_FILE ...] prints per-stage latencies of moves"""
+
+import json
+import socket
+import statistics
+import sys
+import threading
+import time
+from pydantic import ConfigDict
+from pydantic.dataclasses import dataclass
+from typing import Final, Optional
+from uuid import uuid4
+
+from config import CONFIG
+
+dataclass_config = ConfigDict(populate_by_name=True)
+
+HOST: Final = socket.gethostname()
+
+_log_lock = threading.Lock()
+
+
+@dataclass(config=dataclass_config)
+class TraceHop:
+    stage: str
+    host: str
+    t_ns: int
+
+
+@dataclass(config=dataclass_config)
+class TraceContext:
+    span_id: str
+    hops: list[TraceHop]
+
+
+def start(stage: str) -> Optional[TraceContext]:
+    """Returns None when tracing is disabled, which makes all the others no-op"""
+    if not CONFIG.tracing_enabled:
+        return None
+    trace = TraceContext(span_id=uuid4().hex, hops=[])
+    stamp(trace, stage)
+    return trace
+
+
+def stamp(trace: Optional[TraceContext], stage: str) -> None:
+    if trace is None:
+        return
+    trace.hops.append(TraceHop(stage=stage, host=HOST, t_ns=time.monotonic_ns()))
+
+
+def stamp_serialized(data: dict, stage: str) -> None:
+    trace = data.get("trace")
+    if trace is None:
+        return
+    trace["hops"].append({"stage": stage, "host": HOST, "t_ns": time.monotonic_ns()})
+
+
+def record(trace: Optional[TraceContext], stage: Optional[str] = None) -> None:
+    if trace is None:
+        return
+    if stage is not None:
+        stamp(trace, stage)
+    line = json.dumps(
+        {
+            "span_id": trace.span_id,
+            "hops": [
+                {"stage": hop.stage, "host": hop.host, "t_ns": hop.t_ns}
+                for hop in trace.hops
+            ],
+        }
+    )
+    with _log_lock:
+        with open(CONFIG.tracing_log_path, "a") as log_file:
+            log_file.write(line + "\n")
+
+
+def merge_records(records: list[dict]) -> dict[str, list[dict]]:
+    """Joins the records of the same span written by different hosts"""
+    spans: dict[str, list[dict]] = {}
+    for trace_record in records:
+        hops = spans.setdefault(trace_record["span_id"], [])
+        known = {(hop["stage"], hop["host"], hop["t_ns"]) for hop in hops}
+        for hop in trace_record["hops"]:
+            if (hop["stage"], hop["host"], hop["t_ns"]) not in known:
+                hops.append(hop)
+    return spans
+
+
+def stage_durations(hops: list[dict]) -> dict[str, list[float]]:
+    """Milliseconds between consecutive hops on the same host, per stage in
+    the order of the legs passing it, e.g. the server relays both the attack
+    and its result.
+
+    Clocks of different hosts are not comparable, so the network time is the
+    round trip seen by the origin host minus the time spent on the others.
+    """
+    durations: dict[str, list[float]] = {}
+    for previous, hop in zip(hops, hops[1:]):
+        if previous["host"] == hop["host"]:
+            name = f"{previous['stage']} -> {hop['stage']}"
+            duration = (hop["t_ns"] - previous["t_ns"]) / 1e6
+            durations.setdefault(name, []).append(duration)
+
+    if len(hops) == 0:
+        return durations
+    origin = hops[0]["host"]
+    left_origin_at = None
+    remote_ms = 0.0
+    network_ms = 0.0
+    for previous, hop in zip(hops, hops[1:]):
+        if previous["host"] == origin and hop["host"] != origin:
+            left_origin_at = previous
+            remote_ms = 0.0
+        elif previous["host"] != origin and hop["host"] == previous["host"]:
+            remote_ms += (hop["t_ns"] - previous["t_ns"]) / 1e6
+        elif previous["host"] != origin and hop["host"] == origin:
+            if left_origin_at is not None:
+                round_trip_ms = (hop["t_ns"] - left_origin_at["t_ns"]) / 1e6
+                network_ms += round_trip_ms - remote_ms
+            left_origin_at = None
+    if network_ms > 0:
+        durations["network (all transits)"] = [network_ms]
+    return durations
+
+
+def summarize(records: list[dict]) -> str:
+    per_stage: dict[str, list[float]] = {}
+    spans = merge_records(records)
+    for hops in spans.values():
+        for name, durations in stage_durations(hops).items():
+            per_stage.setdefault(name, []).extend(durations)
+
+    def percentile(values: list[float], p: float) -> float:
+        if len(values) == 1:
+            return values[0]
+        return statistics.quantiles(values, n=100, method="inclusive")[int(p) - 1]
+
+    name_width = max([len("stage"), *(len(name) for name in per_stage)])
+    lines = [
+        f"{len(spans)} traces",
+        f"{'stage':<{name_width}} {'count':>6} {'p50 ms':>9} {'p90 ms':>9}"
+        + f" {'p99 ms':>9} {'max ms':>9}",
+    ]
+    for name, values in per_stage.items():
+        lines.append(
+            f"{name:<{name_width}} {len(values):>6}"
+            + f" {percentile(values, 50):>9.2f} {percentile(values, 90):>9.2f}"
+            + f" {percentile(values, 99):>9.2f} {max(values):>9.2f}"
+        )
+    return "\n".join(lines)
+
+
+def read_records(paths: list[str]) -> list[dict]:
+    records = []
+    for path in paths:
+        with open(path) as trace_file:
+            records.extend(json.loads(line) for line in trace_file if line.strip())
+    return records
+
+
+if __name__ == "__main__":
+    print(summarize(read_records(sys.argv[1:] or [CONFIG.tracing_log_path])))
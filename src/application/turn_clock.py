@@ -0,0 +1,174 @@
+"""Turn and game clocks of players, enforced by the server.
+
+All deadlines live in one hashed timer wheel advanced by a single task, so
+the rooms cost one wake-up per tick however many of them there are.
+"""
+
+import asyncio
+import dataclasses
+import time
+from typing import Callable, Final, Generic, Hashable, Optional, TypeVar
+
+from application.metrics import REGISTRY, Counter
+from application.room import ClientNumber
+from config import CONFIG
+
+K = TypeVar("K", bound=Hashable)
+
+timeouts_counter: Final = REGISTRY.register(
+    Counter(
+        "battleships_turn_timeouts_total",
+        "Players who ran out of time",
+        ("clock",),
+    )
+)
+
+
+@dataclasses.dataclass
+class Timer:
+    tick: int
+    callback: Callable[[], None]
+
+
+class TimerWheel(Generic[K]):
+    """Hashed timer wheel, a timer is kept in the slot of its deadline tick.
+
+    Timers further away than a round of the wheel share slots with nearer
+    ones and stay there until their own tick comes.
+    """
+
+    def __init__(
+        self,
+        tick_seconds: float,
+        slots: int = 512,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._tick_seconds = tick_seconds
+        self._clock = clock
+        self._slots: list[dict[K, Timer]] = [{} for _ in range(slots)]
+        self._timers: dict[K, Timer] = {}
+        self._current_tick = self._tick_of(clock())
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def _tick_of(self, at: float) -> int:
+        return int(at // self._tick_seconds)
+
+    def schedule(self, key: K, deadline: float, callback: Callable[[], None]) -> None:
+        """Replaces the timer of the key, fires at the first tick past deadline"""
+        self.cancel(key)
+        timer = Timer(max(self._tick_of(deadline), self._current_tick + 1), callback)
+        self._timers[key] = timer
+        self._slots[timer.tick % len(self._slots)][key] = timer
+
+    def cancel(self, key: K) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            del self._slots[timer.tick % len(self._slots)][key]
+
+    def advance(self) -> int:
+        """Fires timers of the ticks passed since the last call, returns how many"""
+        now_tick = self._tick_of(self._clock())
+        # a whole round covers every slot, e.g. after the loop was blocked
+        first_tick = max(self._current_tick + 1, now_tick - len(self._slots) + 1)
+        expired: list[Timer] = []
+        for tick in range(first_tick, now_tick + 1):
+            slot = self._slots[tick % len(self._slots)]
+            for key, timer in list(slot.items()):
+                if timer.tick <= now_tick:
+                    del slot[key]
+                    del self._timers[key]
+                    expired.append(timer)
+        self._current_tick = max(self._current_tick, now_tick)
+        for timer in expired:
+            timer.callback()
+        return len(expired)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self._tick_seconds)
+            self.advance()
+
+
+@dataclasses.dataclass
+class RoomClock:
+    # seconds left to each player for the rest of the game
+    remaining: list[float]
+    turn: Optional[ClientNumber] = None
+    turn_started_at: float = 0.0
+
+
+class TurnClocks:
+    """Clocks of rooms, `on_expired` is called with the room and late player.
+
+    A turn of a player lasts from the opponent's attack, or the start of the
+    game, until the player's own attack.
+    """
+
+    def __init__(
+        self,
+        on_expired: Callable[[str, ClientNumber], None],
+        turn_seconds: Optional[float] = CONFIG.turn_seconds,
+        game_seconds: Optional[float] = CONFIG.game_clock_seconds,
+        tick_seconds: float = CONFIG.turn_clock_tick_seconds,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._on_expired = on_expired
+        self._turn_seconds = turn_seconds
+        self._game_seconds = game_seconds
+        self._clock = clock
+        self._rooms: dict[str, RoomClock] = {}
+        self.wheel: TimerWheel[str] = TimerWheel(tick_seconds, clock=clock)
+
+    @property
+    def enabled(self) -> bool:
+        return self._turn_seconds is not None or self._game_seconds is not None
+
+    def is_running(self, room_name: str) -> bool:
+        return room_name in self._rooms
+
+    def start_turn(self, room_name: str, player: ClientNumber) -> None:
+        if not self.enabled:
+            return
+        now = self._clock()
+        room_clock = self._rooms.get(room_name)
+        if room_clock is None:
+            game_seconds = self._game_seconds
+            room_clock = RoomClock([game_seconds or 0.0, game_seconds or 0.0])
+            self._rooms[room_name] = room_clock
+        elif room_clock.turn is not None:
+            room_clock.remaining[room_clock.turn] -= now - room_clock.turn_started_at
+        room_clock.turn = player
+        room_clock.turn_started_at = now
+
+        deadlines = []
+        if self._turn_seconds is not None:
+            deadlines.append((now + self._turn_seconds, "turn"))
+        if self._game_seconds is not None:
+            deadlines.append((now + room_clock.remaining[player], "game"))
+        deadline, expired_clock = min(deadlines)
+        self.wheel.schedule(
+            room_name,
+            deadline,
+            lambda: self._expire(room_name, player, expired_clock),
+        )
+
+    def remaining(self, room_name: str, player: ClientNumber) -> Optional[float]:
+        """Game time left to the player, None if the room has no clock"""
+        room_clock = self._rooms.get(room_name)
+        if room_clock is None or self._game_seconds is None:
+            return None
+        remaining = room_clock.remaining[player]
+        if room_clock.turn == player:
+            remaining -= self._clock() - room_clock.turn_started_at
+        return remaining
+
+    def stop(self, room_name: str) -> None:
+        self.wheel.cancel(room_name)
+        self._rooms.pop(room_name, None)
+
+    def _expire(self, room_name: str, player: ClientNumber, clock: str) -> None:
+        self._rooms.pop(room_name, None)
+        timeouts_counter.inc(clock=clock)
+        self._on_expired(room_name, player)
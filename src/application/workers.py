@@ -0,0 +1,196 @@
+"""Server worker processes sharing the listening port.
+
+The kernel spreads new connections over the workers (SO_REUSEPORT), so a room
+is owned by the worker its first client has landed on. The supervisor keeps a
+broker telling workers which one owns a room; clients of rooms owned by
+another worker are redirected to that worker's own port.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import tempfile
+from typing import Final, Mapping, Optional
+
+from application import event_loop
+from application.event_loop import EventLoopName
+from application.rate_limit import Rate
+from config import CONFIG, get_logger
+
+logger: Final = get_logger(__name__)
+
+WorkerIndex = int
+
+
+def worker_port(worker: WorkerIndex) -> int:
+    return CONFIG.worker_ports_start + worker
+
+
+class RoomOwners:
+    def __init__(self) -> None:
+        self._owners: dict[str, WorkerIndex] = {}
+
+    def claim(self, room: str, worker: WorkerIndex) -> WorkerIndex:
+        """Returns the worker owning the room, which is the claiming one if none"""
+        return self._owners.setdefault(room, worker)
+
+    def release(self, room: str, worker: WorkerIndex) -> None:
+        if self._owners.get(room) == worker:
+            del self._owners[room]
+
+    def forget_worker(self, worker: WorkerIndex) -> None:
+        self._owners = {
+            room: owner for room, owner in self._owners.items() if owner != worker
+        }
+
+    def __len__(self) -> int:
+        return len(self._owners)
+
+
+async def serve_broker(owners: RoomOwners, path: str) -> asyncio.Server:
+    """Answers JSON lines of workers, only claims get a reply"""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                request = json.loads(line)
+                match request["op"]:
+                    case "claim":
+                        owner = owners.claim(request["room"], request["worker"])
+                        writer.write(json.dumps({"owner": owner}).encode() + b"\n")
+                    case "release":
+                        owners.release(request["room"], request["worker"])
+        except (ConnectionError, json.JSONDecodeError, KeyError) as ex:
+            logger.warning(f"Dropping broker connection: {ex!r}")
+        finally:
+            writer.close()
+
+    return await asyncio.start_unix_server(handle, path)
+
+
+class BrokerClient:
+    def __init__(
+        self,
+        worker: WorkerIndex,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        self.worker = worker
+        self._reader = reader
+        self._writer = writer
+        # one claim at a time, so replies come in the order of requests
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def connect(cls, worker: WorkerIndex, path: str) -> "BrokerClient":
+        reader, writer = await asyncio.open_unix_connection(path)
+        return cls(worker, reader, writer)
+
+    def _write(self, op: str, room: str) -> None:
+        request = {"op": op, "room": room, "worker": self.worker}
+        self._writer.write(json.dumps(request).encode() + b"\n")
+
+    async def claim(self, room: str) -> WorkerIndex:
+        async with self._lock:
+            self._write("claim", room)
+            line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Broker has closed the connection")
+        return json.loads(line)["owner"]
+
+    def release(self, room: str) -> None:
+        self._write("release", room)
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def run_worker(
+    worker: WorkerIndex,
+    broker_path: str,
+    host: str,
+    port: int,
+    loop_name: EventLoopName,
+    rate_limits: Mapping[str, Rate],
+    snapshot_path: Optional[str],
+) -> None:
+    # imported in the worker process only, the supervisor does not serve clients
+    from application import server
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    event_loop.run(
+        server.serve_worker(
+            worker, broker_path, host, port, rate_limits, snapshot_path
+        ),
+        loop_name,
+    )
+
+
+async def supervise(
+    workers_count: int,
+    host: str,
+    port: int,
+    loop_name: EventLoopName = CONFIG.event_loop,
+    rate_limits: Mapping[str, Rate] = CONFIG.rate_limits,
+    snapshot_path: Optional[str] = CONFIG.snapshot_path,
+) -> None:
+    owners = RoomOwners()
+    # spawned, as forking a process running an event loop is not safe
+    context = multiprocessing.get_context("spawn")
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    with tempfile.TemporaryDirectory(prefix="battleships-") as tmp_dir:
+        broker_path = os.path.join(tmp_dir, "broker.sock")
+        broker = await serve_broker(owners, broker_path)
+
+        def start(worker: WorkerIndex) -> multiprocessing.process.BaseProcess:
+            process = context.Process(
+                target=run_worker,
+                args=(
+                    worker,
+                    broker_path,
+                    host,
+                    port,
+                    loop_name,
+                    rate_limits,
+                    snapshot_path,
+                ),
+                name=f"battleships-worker-{worker}",
+            )
+            process.start()
+            return process
+
+        processes = [start(worker) for worker in range(workers_count)]
+        logger.info(f"Started {workers_count} workers sharing {host}:{port}")
+        try:
+            while not stop.is_set():
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=1)
+                except TimeoutError:
+                    pass
+                for worker, process in enumerate(processes):
+                    if stop.is_set() or process.is_alive():
+                        continue
+                    logger.warning(
+                        f"Worker {worker} exited with {process.exitcode}, restarting"
+                    )
+                    # its rooms are gone with it
+                    owners.forget_worker(worker)
+                    processes[worker] = start(worker)
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                await asyncio.to_thread(process.join, 5)
+            broker.close()
+            await broker.wait_closed()
+
+
+def redirect_location(host_header: Optional[str], port: int, path: str) -> str:
+    host = (host_header or CONFIG.server_host).rsplit(":", 1)[0]
+    return f"ws://{host}:{port}{path}"
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+
+"""Usage: bot_load.py [--rooms N] [--seconds S] [--bot-processes P]
+                   [--server-workers W] [--event-loops asyncio,uvloop]
+                   [--host HOST] [--port PORT]
+
+Starts a server with W workers and plays P processes of bots against it.
+Bots of a room join it as the two players and keep relaying moves to each
+other, the relayed messages per second of all rooms and the latency of
+relaying are reported. With several event loops, the server and bots are
+run on each of them in turn, loops which are not installed are skipped.
+Bots relay as fast as they can, so the server runs without rate limits.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import time
+from uuid import uuid4
+
+from application import event_loop
+from application.event_loop import EventLoopName
+from application.messaging import ClientInfo, decode_json_message
+from websockets.asyncio.client import ClientConnection, connect
+
+MOVE = (
+    '{"what": "GameMessage", "data": {"type_": "PossibleAttack",'
+    + ' "field": {"field_repr": "A1"}}}'
+)
+
+
+def client_info() -> str:
+    return ClientInfo(
+        uniqid=uuid4(),
+        connected=True,
+        ships_placed=True,
+        ready=True,
+        all_ships_wrecked=False,
+    ).stringify()
+
+
+async def receive_move(ws: ClientConnection) -> None:
+    while True:
+        data = decode_json_message(await ws.recv())
+        if data.get("what") == "GameMessage":
+            return
+
+
+async def relay(sender: ClientConnection, receiver: ClientConnection) -> float:
+    sent_at = time.perf_counter()
+    await sender.send(MOVE)
+    await receive_move(receiver)
+    return (time.perf_counter() - sent_at) * 1000
+
+
+async def play_room(uri: str, deadline: float) -> list[float]:
+    """Returns latencies of relayed moves in milliseconds"""
+    async with connect(uri) as first:
+        await first.send(client_info())
+        await first.recv()
+        async with connect(uri) as second:
+            await second.send(client_info())
+            await second.recv()
+            latencies: list[float] = []
+            while time.monotonic() < deadline:
+                latencies.append(await relay(first, second))
+                latencies.append(await relay(second, first))
+            return latencies
+
+
+async def play_rooms(uris: list[str], seconds: float) -> tuple[str, list[float]]:
+    """Returns the loop the bots ran on and their latencies"""
+    deadline = time.monotonic() + seconds
+    rooms = await asyncio.gather(*(play_room(uri, deadline) for uri in uris))
+    latencies = [latency for room in rooms for latency in room]
+    return event_loop.running_loop_name(), latencies
+
+
+def run_bots(
+    uris: list[str], seconds: float, loop_name: EventLoopName
+) -> tuple[str, list[float]]:
+    return event_loop.run(play_rooms(uris, seconds), loop_name)
+
+
+def run_server(host: str, port: int, workers: int, loop_name: EventLoopName) -> None:
+    from application import server
+
+    # without snapshots and handoffs, which are the deployed server's
+    serving = server.main(
+        host, port, workers, loop_name, {}, snapshot_path=None, handoff_path=None
+    )
+    event_loop.run(serving, loop_name)
+
+
+def measure(
+    args: argparse.Namespace, loop_name: EventLoopName
+) -> tuple[str, list[float]]:
+    context = multiprocessing.get_context("spawn")
+    server = context.Process(
+        target=run_server,
+        args=(args.host, args.port, args.server_workers, loop_name),
+    )
+    server.start()
+    time.sleep(2)
+    try:
+        uris = [f"ws://{args.host}:{args.port}/bot-{n}" for n in range(args.rooms)]
+        with context.Pool(args.bot_processes) as pool:
+            processes = pool.starmap(
+                run_bots,
+                [
+                    (uris[n :: args.bot_processes], args.seconds, loop_name)
+                    for n in range(args.bot_processes)
+                ],
+            )
+    finally:
+        server.terminate()
+        server.join()
+    ran_on = ",".join(sorted({name for name, _ in processes}))
+    return ran_on, [latency for _, latencies in processes for latency in latencies]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rooms", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--bot-processes", type=int, default=4)
+    parser.add_argument("--server-workers", type=int, default=1)
+    parser.add_argument("--event-loops", default="asyncio")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4250)
+    args = parser.parse_args()
+
+    for loop_name in args.event_loops.split(","):
+        if not event_loop.is_available(loop_name):
+            print(f"{loop_name}: not installed, skipped")
+            continue
+        ran_on, latencies = measure(args, loop_name)
+        percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+        print(
+            f"{ran_on}, {args.server_workers} workers, {args.rooms} rooms:"
+            + f" {len(latencies) / args.seconds:.0f} messages/s,"
+            + f" latency ms p50 {percentiles[49]:.2f} p99 {percentiles[98]:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
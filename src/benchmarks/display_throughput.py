@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+"""Usage: display_throughput.py [--events N] [--seed SEED]
+
+Runs the rgbled Display render loop on simulated LEDs and reports how fast
+it handles a scripted game's events.
+"""
+
+import argparse
+import random
+import time
+from threading import Event, Thread
+
+import janus
+
+from application.io.actions import (
+    ActionEvent,
+    ActionEventBatch,
+    DisplayBoard,
+    InfoActions,
+    OutActions,
+    OutEvent,
+)
+from application.io.fake_led import FakePixelStrip
+from application.io.instrumentation import FrameStats
+from application.io.led_display import Display
+
+BOARD_SIZE = 10
+
+
+def scripted_events(count: int, rng: random.Random) -> list[OutEvent]:
+    events: list[OutEvent] = [
+        ActionEvent(InfoActions.PlayerConnected),
+        ActionEvent(InfoActions.OpponentConnected),
+        ActionEvent(OutActions.PlaceShips),
+        ActionEvent(OutActions.FinishedPlacing),
+        ActionEvent(OutActions.PlayerTurn),
+    ]
+    ships_actions = [OutActions.Ship, OutActions.MissShips, OutActions.HitShips]
+    shots_actions = [OutActions.MissShots, OutActions.HitShots]
+    while len(events) < count:
+        tile = (rng.randrange(BOARD_SIZE), rng.randrange(BOARD_SIZE))
+        kind = rng.random()
+        if kind < 0.4:
+            events.append(ActionEvent(OutActions.HoverShots, tile, DisplayBoard.Shots))
+        elif kind < 0.6:
+            events.append(
+                ActionEvent(rng.choice(shots_actions), tile, DisplayBoard.Shots)
+            )
+        elif kind < 0.8:
+            events.append(
+                ActionEvent(rng.choice(ships_actions), tile, DisplayBoard.Ships)
+            )
+        else:
+            events.append(
+                ActionEventBatch(
+                    tuple(
+                        ActionEvent(
+                            OutActions.BlinkShips, (x, tile[1]), DisplayBoard.Ships
+                        )
+                        for x in range(BOARD_SIZE)
+                    )
+                )
+            )
+    return events
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    queue: janus.Queue[OutEvent] = janus.Queue()
+    stop = Event()
+    frame_stats = FrameStats(
+        "Display (fake LEDs)",
+        out_queue=queue.sync_q,
+        size=args.events + 100,
+        print_interval_seconds=None,
+    )
+    display = Display(queue.sync_q, stop, frame_stats, backend=FakePixelStrip)
+    display.set_board_size(BOARD_SIZE)
+    display.load_animations()
+
+    events = scripted_events(args.events, random.Random(args.seed))
+    for event in events:
+        queue.sync_q.put(event)
+
+    thread = Thread(target=display.run)
+    started_at = time.perf_counter()
+    thread.start()
+    while queue.sync_q.qsize() > 0:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - started_at
+    stop.set()
+    thread.join()
+
+    frames = display._ships_led_board._led_matrix.strip.show_count
+    print(
+        f"{len(events)} events in {elapsed:.3f} s: {len(events) / elapsed:.0f} events/s"
+    )
+    print(f"{frames} frames shown per board")
+    print(frame_stats.summary())
+
+
+if __name__ == "__main__":
+    main()
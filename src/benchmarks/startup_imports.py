@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+"""Usage: startup_imports.py [--mode MODE] [--runs N] [--max-ms MS]
+
+Measures with `python -X importtime` what the client imports before its
+display comes up, compared with importing the whole client in the same mode.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Final
+
+from config import CONFIG
+
+SRC_DIR: Final = Path(__file__).resolve().parent.parent
+
+DISPLAY_PATH_IMPORTS: Final = {
+    "terminal": "import application.client_boot",
+    "pygame": "import application.client_boot, application.io.pg_io",
+    "rgbled": "import application.client_boot, application.io.led_display",
+}
+# the display modules of the mode are included, so both sets differ only by
+# the modules loaded after the display starts
+FULL_CLIENT_IMPORTS: Final = {
+    mode: f"{statement}, application.client"
+    for mode, statement in DISPLAY_PATH_IMPORTS.items()
+}
+
+# must stay out of the display path, they are loaded after the display starts
+DEFERRED_MODULES: Final = (
+    "websockets",
+    "application.messaging",
+    "application.client",
+    "domain.client.game",
+    "gpiozero",
+    "PIL",
+)
+
+
+def import_times(statement: str) -> dict[str, tuple[int, int]]:
+    """Self and cumulative import times in microseconds per module"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=SRC_DIR,
+        env={**os.environ, "PYTHONPATH": str(SRC_DIR)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, tuple[int, int]] = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, module = line.removeprefix("import time:").split("|")
+        times[module.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def total_ms(times: dict[str, tuple[int, int]]) -> float:
+    return sum(self_us for self_us, _ in times.values()) / 1000
+
+
+def deferred_modules_imported(modules: list[str]) -> list[str]:
+    return [
+        module
+        for module in modules
+        if any(
+            module == deferred or module.startswith(deferred + ".")
+            for deferred in DEFERRED_MODULES
+        )
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", default=CONFIG.mode, choices=DISPLAY_PATH_IMPORTS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    display_runs = [
+        import_times(DISPLAY_PATH_IMPORTS[args.mode]) for _ in range(args.runs)
+    ]
+    full_runs = [import_times(FULL_CLIENT_IMPORTS[args.mode]) for _ in range(args.runs)]
+    display_ms = statistics.median(total_ms(times) for times in display_runs)
+    full_ms = statistics.median(total_ms(times) for times in full_runs)
+
+    print(f"mode {args.mode}, median of {args.runs} runs")
+    print(f"until display starts: {display_ms:8.1f} ms")
+    print(f"whole client:         {full_ms:8.1f} ms")
+    print("slowest modules until display starts (self ms):")
+    slowest = sorted(display_runs[-1].items(), key=lambda item: -item[1][0])[:15]
+    for module, (self_us, _) in slowest:
+        print(f"  {self_us / 1000:8.1f} {module}")
+
+    failed = False
+    deferred = deferred_modules_imported(list(display_runs[-1]))
+    if len(deferred) > 0:
+        print(f"FAIL: imported before the display starts: {', '.join(deferred)}")
+        failed = True
+    if args.max_ms is not None and display_ms > args.max_ms:
+        print(f"FAIL: display path takes more than {args.max_ms} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
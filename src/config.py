@@ -1,6 +1,6 @@
 import logging
 import sys
-from typing import Final, Literal
+from typing import Final, Literal, Optional
 
 from pydantic import ConfigDict
 from pydantic.dataclasses import dataclass
@@ -50,12 +50,86 @@ class Config:
     board_size = 10
     conn_ping_interval = 20
     conn_ping_timeout = 5
+    max_spectators_per_room = 32
+    # spectators whose unsent data exceeds it are disconnected
+    spectator_write_buffer_limit = 64 * 1024
+    # Prometheus text format at http://server_host:metrics_port/metrics
+    metrics_enabled = True
+    metrics_port = 4201
+    # moves latency tracing, see application/tracing.py
+    tracing_enabled = False
+    tracing_log_path = "traces.jsonl"
+    # messages queued to a player before overflowing, then hovers are dropped
+    send_queue_size = 64
+    # False disconnects a player on overflow without dropping hovers first
+    send_queue_drop_hovers = True
+    # websockets closes connections receiving bigger frames
+    max_frame_size = 16 * 1024
+    # players sending a bigger message are disconnected before it is parsed
+    max_message_size = 4 * 1024
+    # (messages per second, burst) of each message type per player, "*" limits
+    # all messages, hovers over the limits are dropped, a player sending any
+    # other message over them is disconnected
+    rate_limits = {
+        "*": (50.0, 100),
+        "PossibleAttack": (20.0, 40),
+        "AttackRequest": (5.0, 10),
+        "AttackResult": (5.0, 10),
+        "ClientInfo": (2.0, 10),
+    }
+    # (dropped hovers per second, burst) before the player is disconnected
+    rate_limit_strikes = (1.0, 20)
+    # rooms are restored from it after a restart, None disables snapshots,
+    # absolute as the server service runs in /
+    snapshot_path: Optional[str] = "/battleships-game-on-rpis/rooms.snapshot"
+    snapshot_interval_seconds = 5.0
+    # restored rooms wait that long for their players to reconnect
+    reattach_timeout_seconds = 60.0
+    # seconds a player has for a move and for all moves of the game, the
+    # player running out of either forfeits, None disables the clock
+    turn_seconds: Optional[float] = 60.0
+    game_clock_seconds: Optional[float] = 600.0
+    turn_clock_tick_seconds = 0.25
+    # players asking for a match with a rating are paired within buckets of it
+    match_rating_bucket_size = 200
+    # a server started with --takeover takes the listening sockets and rooms
+    # over from the one running at this unix socket, None disables handoffs
+    handoff_socket_path: Optional[str] = "/battleships-game-on-rpis/battleships.handoff"
+    # "uvloop" runs the server and clients on uvloop if it is installed
+    event_loop: Literal["asyncio", "uvloop"] = "asyncio"
+    # worker processes sharing server_port, 1 serves in the server process
+    server_workers = 1
+    # worker N also listens at worker_ports_start + N and serves metrics at
+    # metrics_port + N, clients are redirected to the worker owning their room
+    worker_ports_start = 4300
 
 
 @dataclass(frozen=True)
 class ClientConfig:
     game_ended_state_show_seconds: float
     min_duration_to_show_animation_in_seconds: float
+    # render threads' per-frame stats ring buffer, dumped on SIGUSR1
+    frame_stats_size = 600
+    frame_stats_print_interval_seconds: Optional[float] = None
+    # "fake" simulates LEDs and buttons, e.g. to run the rgbled mode off a Pi
+    led_backend: Literal["rpi_ws281x", "fake"] = "rpi_ws281x"
+    # buttons' presses played by the fake backend, see io/scripted_input.py
+    input_script_path: Optional[str] = None
+    # "ansi" redraws only the changed cells of boards kept at the terminal's top
+    terminal_renderer: Literal["text", "ansi"] = "ansi"
+    # asks the server for an opponent playing the same board and ships instead
+    # of joining its default room, rated players are paired by their rating
+    matchmaking = False
+    rating: Optional[int] = None
+    # asks for another game on the same connection once a game has ended, it
+    # starts if the opponent asks for it as well within rematch_wait_seconds
+    # after the ended game has been shown
+    rematch = True
+    rematch_wait_seconds = 10.0
+    # the client runs the server in its own event loop instead of server.service
+    # running next to it, its player's messages are passed in memory while the
+    # opponent connects to server_host as usual
+    embedded_server = False
 
 
 CONFIG: Final = Config(
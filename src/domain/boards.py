@@ -1,7 +1,9 @@
 import dataclasses
-from typing import Optional
+import functools
+from typing import Final, Optional
 from domain.attacks import AttackResultStatus, UnknownStatus
 from domain.field import Field
+from domain.field_masks import FieldMask, fields_of
 from domain.ships import Ship, MastedShips, ShipStatus
 
 
@@ -14,6 +16,71 @@ class ShipsFieldsByType:
     unknown_status: set[Field] = dataclasses.field(default_factory=set)
 
 
+SPACE: Final = "\N{EM SPACE}"
+HALF_SPACE: Final = "\N{EN SPACE}"
+FULL_SQUARE: Final = "\N{BLACK SQUARE}"
+X_MARKED: Final = "\N{BALLOT BOX WITH X}"
+EDGED: Final = "\N{BALLOT BOX}"
+UNKNOWN: Final = "?"
+MISSED: Final = "\N{MULTIPLICATION SIGN}"
+EYE: Final = "\N{EYE}"
+
+
+class BoardGrid:
+    """Characters of a board kept between drawings.
+
+    Cells are set as the board changes and only the rows changed since the
+    previous drawing are joined again.
+    """
+
+    def __init__(self) -> None:
+        self._cells: dict[Field, str] = {}
+        self._size = 0
+        self._matrix: list[list[str]] = []
+        self._rows: list[Optional[str]] = []
+
+    def clear(self) -> None:
+        """Empties the cells, keeping the drawn rows' storage"""
+        self._cells.clear()
+        for y, matrix_row in enumerate(self._matrix):
+            matrix_row[:] = [SPACE] * self._size
+            self._rows[y] = None
+
+    def set(self, field: Field, char: str) -> None:
+        self._cells[field] = char
+        y, x = field.vector_from_zeros
+        if y < self._size and x < self._size:
+            self._matrix[y][x] = char
+            self._rows[y] = None
+
+    def _resize(self, size: int) -> None:
+        self._size = size
+        self._matrix = [[SPACE] * size for _ in range(size)]
+        self._rows = [None] * size
+        for field, char in self._cells.items():
+            y, x = field.vector_from_zeros
+            if y < size and x < size:
+                self._matrix[y][x] = char
+
+    def draw(self, size: int, overlay: Optional[tuple[Field, str]] = None) -> str:
+        if size != self._size:
+            self._resize(size)
+        rows = self._rows
+        for y, row in enumerate(rows):
+            if row is None:
+                rows[y] = draw_row(y, self._matrix[y])
+        if overlay is None:
+            return join_rows(rows)
+
+        field, char = overlay
+        y, x = field.vector_from_zeros
+        overlaid = list(rows)
+        matrix_row = list(self._matrix[y])
+        matrix_row[x] = char
+        overlaid[y] = draw_row(y, matrix_row)
+        return join_rows(overlaid)
+
+
 class LaunchedShipCollidesError(ValueError):
     def __init__(self, msg: str, colliding_fields: list[Field]) -> None:
         self.colliding_fields = colliding_fields
@@ -22,9 +89,17 @@ class LaunchedShipCollidesError(ValueError):
 class ShipsBoard:
     def __init__(self) -> None:
         self._ships: dict[Field, Ship] = {}
-        self._ships_and_coastal_zones: set[Field] = set()
+        self._ships_and_coastal_zones: FieldMask = 0
         self._opponent_missed: set[Field] = set()
         self._opponent_possible_attack: Optional[Field] = None
+        self._grid = BoardGrid()
+
+    def clear(self) -> None:
+        self._ships.clear()
+        self._ships_and_coastal_zones = 0
+        self._opponent_missed.clear()
+        self._opponent_possible_attack = None
+        self._grid.clear()
 
     @property
     def ships(self) -> list[Ship]:
@@ -38,11 +113,12 @@ class ShipsBoard:
     def ships_floating_count(self) -> int:
         return len(self.floating_ships)
 
+    @property
+    def opponent_missed_fields(self) -> set[Field]:
+        return set(self._opponent_missed)
+
     def add_ship(self, ship: Ship) -> None:
-        colliding_fields = []
-        for field in sorted(list(ship.fields)):
-            if field in self._ships_and_coastal_zones:
-                colliding_fields.append(field)
+        colliding_fields = sorted(fields_of(ship.mask & self._ships_and_coastal_zones))
         if len(colliding_fields) > 0:
             colliding_fields_msg = ", ".join(str(field) for field in colliding_fields)
             exception_msg = (
@@ -52,9 +128,20 @@ class ShipsBoard:
             raise LaunchedShipCollidesError(
                 exception_msg, colliding_fields=colliding_fields
             )
-        self._ships_and_coastal_zones |= ship.fields_with_coastal_zone
+        self._ships_and_coastal_zones |= ship.mask | ship.coastal_zone_mask
         for field in ship.fields:
             self._ships[field] = ship
+        self._draw_ship(ship)
+
+    def _draw_ship(self, ship: Ship) -> None:
+        if ship.status == ShipStatus.Wrecked:
+            for field in ship.fields:
+                self._grid.set(field, FULL_SQUARE)
+            return
+        for field in ship.waving_masts:
+            self._grid.set(field, EDGED)
+        for field in ship.wrecked_masts:
+            self._grid.set(field, X_MARKED)
 
     def add_ships(self, ships: MastedShips) -> None:
         for ship in sorted([*ships.single, *ships.two, *ships.three, *ships.four]):
@@ -64,37 +151,23 @@ class ShipsBoard:
         self._opponent_possible_attack = None
         if field not in self._ships:
             self._opponent_missed.add(field)
+            self._grid.set(field, MISSED)
             return AttackResultStatus.Missed
         ship = self._ships[field]
         result = ship.attack(field)
+        if result == AttackResultStatus.ShotDown:
+            self._draw_ship(ship)
+        elif result == AttackResultStatus.Shot:
+            self._grid.set(field, X_MARKED)
         return result
 
     def mark_possible_attack(self, field: Field) -> None:
         self._opponent_possible_attack = field
 
     def represent_graphically(self, size: int) -> str:
-        floating_fields = set()
-        shot_fields = set()
-        shot_down_fields = set()
-        missed = self._opponent_missed
-        for ship in self.ships:
-            if ship.status == ShipStatus.Wrecked:
-                shot_down_fields |= ship.fields
-            else:
-                floating_fields |= ship.waving_masts
-                shot_fields |= ship.wrecked_masts
-        board = create_board(
-            ShipsFieldsByType(
-                floating=floating_fields,
-                shot=shot_fields,
-                shot_down=shot_down_fields,
-                missed=missed,
-            ),
-            size,
-            self._opponent_possible_attack,
-        )
-        drawn_board = draw_board(board)
-        return drawn_board
+        if self._opponent_possible_attack is None:
+            return self._grid.draw(size)
+        return self._grid.draw(size, (self._opponent_possible_attack, EYE))
 
     @staticmethod
     def build_ships_from_fields(ships_fields: set[Field]) -> set[Ship]:
@@ -165,6 +238,14 @@ class ShotsBoard:
     def __init__(self) -> None:
         self._attacks: dict[Field, AttackResultStatus | UnknownStatus] = {}
         self._ships_shot_down: list[Ship] = []
+        self._shot_down_fields: set[Field] = set()
+        self._grid = BoardGrid()
+
+    def clear(self) -> None:
+        self._attacks.clear()
+        self._ships_shot_down.clear()
+        self._shot_down_fields.clear()
+        self._grid.clear()
 
     def add_attack(
         self, field: Field, result: AttackResultStatus | UnknownStatus
@@ -179,9 +260,25 @@ class ShotsBoard:
                 wrecked=shot_down_ship_fields, waving=set()
             )
             self._ships_shot_down.append(shot_down_ship)
+            self._shot_down_fields |= shot_down_ship.fields
+            for shot_down_field in shot_down_ship.fields:
+                self._grid.set(shot_down_field, self._char_of(shot_down_field))
+        self._grid.set(field, self._char_of(field))
 
         self.notify_added()
 
+    def _char_of(self, field: Field) -> str:
+        status = self._attacks.get(field)
+        if status == "Unknown":
+            return UNKNOWN
+        if status == AttackResultStatus.Missed:
+            return MISSED
+        if field in self._shot_down_fields:
+            return FULL_SQUARE
+        if status in (AttackResultStatus.Shot, AttackResultStatus.AlreadyShot):
+            return X_MARKED
+        return SPACE
+
     def notify_added(self) -> None:
         pass
 
@@ -189,6 +286,14 @@ class ShotsBoard:
     def attacked_fields(self) -> set[Field]:
         return set(self._attacks.keys())
 
+    @property
+    def attacks(self) -> dict[Field, AttackResultStatus | UnknownStatus]:
+        return dict(self._attacks)
+
+    @property
+    def ships_shot_down(self) -> list[Ship]:
+        return list(self._ships_shot_down)
+
     def shot_fields(self) -> list[Field]:
         return [
             field
@@ -202,39 +307,7 @@ class ShotsBoard:
         ]
 
     def represent_graphically(self, size: int) -> str:
-        floating_fields = set()
-        shot_fields = set()
-        shot_down_fields = set()
-        unknown_status_fields = set()
-        missed_fields = set()
-
-        for shot_down_ship in self._ships_shot_down:
-            for field in shot_down_ship.fields:
-                shot_down_fields.add(field)
-
-        for field, status in self._attacks.items():
-            match status:
-                case AttackResultStatus.ShotDown:
-                    # handled above
-                    pass
-                case AttackResultStatus.Shot | AttackResultStatus.AlreadyShot:
-                    shot_fields.add(field)
-                case AttackResultStatus.Missed:
-                    missed_fields.add(field)
-                case "Unknown":
-                    unknown_status_fields.add(field)
-        board = create_board(
-            ShipsFieldsByType(
-                floating=floating_fields,
-                shot=shot_fields,
-                shot_down=shot_down_fields,
-                missed=missed_fields,
-                unknown_status=unknown_status_fields,
-            ),
-            size,
-        )
-        drawn_board = draw_board(board)
-        return drawn_board
+        return self._grid.draw(size)
 
 
 def create_board(
@@ -242,54 +315,44 @@ def create_board(
     size: int = 10,
     opponent_looking: Optional[Field] = None,
 ) -> list[list[str]]:
-    space = "\N{EM SPACE}"
-    full_square = "\N{BLACK SQUARE}"
-    x_marked = "\N{BALLOT BOX WITH X}"
-    edged = "\N{BALLOT BOX}"
-    unknown = "?"
-    missed = "\N{MULTIPLICATION SIGN}"
-    eye = "\N{EYE}"
-
-    matrix = [[space] * size for _ in range(size)]
+    matrix = [[SPACE] * size for _ in range(size)]
     for floating_field in ships_fields.floating:
         y, x = floating_field.vector_from_zeros
-        matrix[y][x] = edged
+        matrix[y][x] = EDGED
     for shot_field in ships_fields.shot:
         y, x = shot_field.vector_from_zeros
-        matrix[y][x] = x_marked
+        matrix[y][x] = X_MARKED
     for shot_down_field in ships_fields.shot_down:
         y, x = shot_down_field.vector_from_zeros
-        matrix[y][x] = full_square
+        matrix[y][x] = FULL_SQUARE
     for shot_down_field in ships_fields.missed:
         y, x = shot_down_field.vector_from_zeros
-        matrix[y][x] = missed
+        matrix[y][x] = MISSED
     for unknown_status_field in ships_fields.unknown_status:
         y, x = unknown_status_field.vector_from_zeros
-        matrix[y][x] = unknown
+        matrix[y][x] = UNKNOWN
     if opponent_looking is not None:
         y, x = opponent_looking.vector_from_zeros
-        matrix[y][x] = eye
+        matrix[y][x] = EYE
     return matrix
 
 
-def draw_board(matrix: list[list[str]]) -> str:
-    size = len(matrix)
-    half_space = "\N{EN SPACE}"
-    space = "\N{EM SPACE}"
-    top_bottom_line = "".join([space * 2, "—" * (2 * size + 1)])
-    head_numbers = space * 3 + space.join(str(n) for n in range(1, size + 1))
-    output = [head_numbers, top_bottom_line]
-    starting_y_label = ord("A")
-    for idx, row in enumerate(matrix):
-        line = (
-            chr(starting_y_label + idx)
-            + "|"
-            + half_space
-            + "˙".join(row)
-            + half_space
-            + "|"
-        )
-        output.append(line)
+@functools.cache
+def board_frame_lines(size: int) -> tuple[str, str]:
+    """Column numbers and the top (and bottom) line of a board"""
+    top_bottom_line = "".join([SPACE * 2, "—" * (2 * size + 1)])
+    head_numbers = SPACE * 3 + SPACE.join(str(n) for n in range(1, size + 1))
+    return head_numbers, top_bottom_line
+
+
+def draw_row(idx: int, row: list[str]) -> str:
+    return chr(ord("A") + idx) + "|" + HALF_SPACE + "˙".join(row) + HALF_SPACE + "|"
+
 
-    output.append(top_bottom_line)
-    return "\n".join(output)
+def join_rows(rows: list[str]) -> str:
+    head_numbers, top_bottom_line = board_frame_lines(len(rows))
+    return "\n".join([head_numbers, top_bottom_line, *rows, top_bottom_line])
+
+
+def draw_board(matrix: list[list[str]]) -> str:
+    return join_rows([draw_row(idx, row) for idx, row in enumerate(matrix)])
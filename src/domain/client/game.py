@@ -1,7 +1,14 @@
 from typing import Optional
 from uuid import uuid4
 from application.messaging import GameMessage
-from domain.attacks import AttackRequest, AttackResult, PossibleAttack
+from application.tracing import TraceContext
+from domain.attacks import (
+    AttackRequest,
+    AttackResult,
+    AttackResultStatus,
+    PossibleAttack,
+    UnknownStatus,
+)
 from domain.field import Field
 from domain.boards import ShipsBoard, ShotsBoard
 from domain.ships import MastedShips, Ship
@@ -23,6 +30,12 @@ class Game:
         self._attacks_board = ShotsBoard()
         self._ships_placed = False
 
+    def reset(self) -> None:
+        """Clears both boards in place for another game in the same room"""
+        self._ships_board.clear()
+        self._attacks_board.clear()
+        self._ships_placed = False
+
     def place_ships(self, ships: MastedShips) -> None:
         self._ships_board.add_ships(ships)
         self._ships_placed = True
@@ -59,10 +72,22 @@ class Game:
     def shot_fields(self) -> list[Field]:
         return self._attacks_board.shot_fields()
 
-    def attack(self, field: Field) -> GameMessage:
+    @property
+    def opponent_missed_fields(self) -> set[Field]:
+        return self._ships_board.opponent_missed_fields
+
+    @property
+    def attacks(self) -> dict[Field, AttackResultStatus | UnknownStatus]:
+        return self._attacks_board.attacks
+
+    @property
+    def ships_shot_down(self) -> list[Ship]:
+        return self._attacks_board.ships_shot_down
+
+    def attack(self, field: Field, trace: Optional[TraceContext] = None) -> GameMessage:
         self._attacks_board.add_attack(field, "Unknown")
         attack_request = AttackRequest(field=field)
-        message = GameMessage(uniqid=uuid4(), data=attack_request)
+        message = GameMessage(uniqid=uuid4(), data=attack_request, trace=trace)
         return message
 
     def handle_message(self, message: GameMessage) -> Optional[GameMessage]:
@@ -75,7 +100,7 @@ class Game:
         if isinstance(att_req := message.data, AttackRequest):
             status = self._ships_board.process_attack(att_req.field)
             result = AttackResult(field=att_req.field, status=status)
-            message = GameMessage(uniqid=uuid4(), data=result)
+            message = GameMessage(uniqid=uuid4(), data=result, trace=message.trace)
             return message
         elif isinstance(att_res := message.data, AttackResult):
             self._attacks_board.add_attack(att_res.field, att_res.status)
@@ -0,0 +1,82 @@
+from functools import cache
+from string import ascii_uppercase
+from typing import Final, Iterable
+
+from domain.field import Field
+
+# fields reachable with `Field.moved_by`: rows A..Z and columns 0..26
+GRID_ROWS: Final = len(ascii_uppercase)
+GRID_COLUMNS: Final = 27
+
+FieldMask = int
+
+
+def bit_index_of(field: Field) -> int:
+    """Returns -1 for fields outside the grid, e.g. `Field("A100")`"""
+    y = ord(field.y) - ord("A")
+    if not 0 <= field.x < GRID_COLUMNS or not 0 <= y < GRID_ROWS:
+        return -1
+    return y * GRID_COLUMNS + field.x
+
+
+FIELDS: Final = tuple(
+    Field(f"{ascii_uppercase[idx // GRID_COLUMNS]}{idx % GRID_COLUMNS}")
+    for idx in range(GRID_ROWS * GRID_COLUMNS)
+)
+
+
+def _neighbourhood_mask(idx: int) -> FieldMask:
+    y, x = divmod(idx, GRID_COLUMNS)
+    mask = 0
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            if (dy, dx) == (0, 0):
+                continue
+            if 0 <= y + dy < GRID_ROWS and 0 <= x + dx < GRID_COLUMNS:
+                mask |= 1 << ((y + dy) * GRID_COLUMNS + x + dx)
+    return mask
+
+
+# 8 adjacent fields of every field of the grid
+NEIGHBOURHOOD_MASKS: Final = tuple(
+    _neighbourhood_mask(idx) for idx in range(GRID_ROWS * GRID_COLUMNS)
+)
+
+
+def mask_of(fields: Iterable[Field]) -> FieldMask:
+    mask = 0
+    for field in fields:
+        idx = bit_index_of(field)
+        if idx >= 0:
+            mask |= 1 << idx
+    return mask
+
+
+def fields_of(mask: FieldMask) -> set[Field]:
+    fields: set[Field] = set()
+    while mask:
+        lowest = mask & -mask
+        fields.add(FIELDS[lowest.bit_length() - 1])
+        mask ^= lowest
+    return fields
+
+
+def coastal_zone_mask_of(fields: Iterable[Field]) -> FieldMask:
+    fields_mask = 0
+    around = 0
+    for field in fields:
+        idx = bit_index_of(field)
+        if idx >= 0:
+            fields_mask |= 1 << idx
+            around |= NEIGHBOURHOOD_MASKS[idx]
+    return around & ~fields_mask
+
+
+@cache
+def board_mask(size: int) -> FieldMask:
+    """Fields A1 up to the last row and column of a board of the given size"""
+    row = ((1 << min(size, GRID_COLUMNS - 1)) - 1) << 1
+    mask = 0
+    for y in range(min(size, GRID_ROWS)):
+        mask |= row << (y * GRID_COLUMNS)
+    return mask
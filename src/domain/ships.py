@@ -2,9 +2,9 @@ import enum
 from config import MastedShipsCounts
 from domain.attacks import AttackResultStatus
 from domain.field import Field
-from typing import Final, Optional, Self
+from domain.field_masks import FieldMask, coastal_zone_mask_of, fields_of, mask_of
+from typing import Final, Iterable, Optional, Self
 from pydantic.dataclasses import dataclass
-import copy
 
 from pydantic import ConfigDict, model_validator
 
@@ -19,31 +19,58 @@ class ShipStatus(enum.StrEnum):
 
 
 class Ship:
-    def __init__(self, fields: set[Field]) -> None:
-        self._fields: Final = fields
-        self._parts_floating = copy.deepcopy(fields)
-        self._parts_wrecked: set[Field] = set()
-        self._coastal_zone: Optional[set[Field]] = None
+    """Masts are kept in a fixed order, wrecked ones as bits of `_wrecked`.
+
+    Hash and sort key only depend on the fields, which never change, so a ship
+    keeps its place in sets and dicts when attacked.
+    """
+
+    __slots__ = (
+        "_fields",
+        "_masts",
+        "_mask",
+        "_mast_bits",
+        "_wrecked",
+        "_hash",
+        "_sort_key",
+        "_coastal_zone_mask",
+    )
+
+    def __init__(self, fields: Iterable[Field]) -> None:
+        self._fields: Final = frozenset(fields)
+        self._masts: Final = tuple(sorted(self._fields))
+        self._mast_bits: Final = {field: 1 << i for i, field in enumerate(self._masts)}
+        self._mask: Final = mask_of(self._masts)
+        self._wrecked = 0
+        self._hash: Final = hash(self._fields)
+        self._sort_key: Final = (
+            len(self._masts),
+            tuple(field.vector_from_zeros for field in self._masts),
+        )
+        self._coastal_zone_mask: Optional[FieldMask] = None
 
     @property
     def original_masts_count(self) -> int:
-        return len(self._fields)
+        return len(self._masts)
 
     @property
-    def fields(self) -> set[Field]:
+    def fields(self) -> frozenset[Field]:
         return self._fields
 
+    def _masts_of(self, bits: int) -> set[Field]:
+        return {field for i, field in enumerate(self._masts) if bits >> i & 1}
+
     @property
     def wrecked_masts(self) -> set[Field]:
-        return self._parts_wrecked
+        return self._masts_of(self._wrecked)
 
     @property
     def waving_masts(self) -> set[Field]:
-        return self._parts_floating
+        return self._masts_of(~self._wrecked)
 
     @property
     def waving_masts_count(self) -> int:
-        return len(self._parts_floating)
+        return len(self._masts) - self._wrecked.bit_count()
 
     @property
     def status(self) -> ShipStatus:
@@ -53,71 +80,43 @@ class Ship:
             return ShipStatus.ShotButFloats
         return ShipStatus.FullyOperational
 
-    @property
-    def _properties(self) -> tuple[frozenset, frozenset, frozenset]:
-        return (
-            frozenset(self.fields),
-            frozenset(self.waving_masts),
-            frozenset(self.wrecked_masts),
-        )
-
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, Ship):
             return False
-        return self._properties == other._properties
+        return self._fields == other._fields and self._wrecked == other._wrecked
 
     def __lt__(self, other: Self) -> bool:
-        return (self.original_masts_count, sorted(self.fields)) < (
-            other.original_masts_count,
-            sorted(other.fields),
-        )
+        return self._sort_key < other._sort_key
 
     def __hash__(self) -> int:
-        return hash(self._properties)
-
-    def _infer_coastal_zone(self) -> set[Field]:
-        adjacency_vectors = [
-            (-1, -1),
-            (-1, 0),
-            (-1, 1),
-            (0, -1),
-            (0, 1),
-            (1, -1),
-            (1, 0),
-            (1, 1),
-        ]
-        coastal_zone: set[Field] = set()
-        for field in self._fields:
-            adjacent_fields_list = list(
-                filter(
-                    lambda field: field is not None,
-                    [field.moved_by(*vector) for vector in adjacency_vectors],
-                )
-            )
-            for adjacent_field in adjacent_fields_list:
-                assert adjacent_field is not None
-                if adjacent_field not in self._fields:
-                    coastal_zone.add(adjacent_field)
-        return coastal_zone
+        return self._hash
+
+    @property
+    def mask(self) -> FieldMask:
+        return self._mask
+
+    @property
+    def coastal_zone_mask(self) -> FieldMask:
+        if self._coastal_zone_mask is None:
+            self._coastal_zone_mask = coastal_zone_mask_of(self._masts)
+        return self._coastal_zone_mask
 
     @property
     def coastal_zone(self) -> set[Field]:
-        if self._coastal_zone is None:
-            self._coastal_zone = self._infer_coastal_zone()
-        return self._coastal_zone
+        return fields_of(self.coastal_zone_mask)
 
     @property
     def fields_with_coastal_zone(self) -> set[Field]:
-        return self._fields.union(self.coastal_zone)
+        return self.coastal_zone | self._fields
 
     def attack(self, field: Field) -> AttackResultStatus:
-        if field not in self._parts_floating:
-            if field not in self._parts_wrecked:
-                return AttackResultStatus.Missed
+        bit = self._mast_bits.get(field)
+        if bit is None:
+            return AttackResultStatus.Missed
+        if self._wrecked & bit:
             return AttackResultStatus.AlreadyShot
 
-        self._parts_floating.remove(field)
-        self._parts_wrecked.add(field)
+        self._wrecked |= bit
         if self.status == ShipStatus.ShotButFloats:
             return AttackResultStatus.Shot
         elif self.status == ShipStatus.Wrecked:
@@ -128,19 +127,19 @@ class Ship:
     @classmethod
     def from_parts(cls, *, wrecked: set[Field], waving: set[Field]) -> Self:
         ship = cls(wrecked.union(waving))
-        ship._parts_wrecked = wrecked
-        ship._parts_floating = waving
+        for field in wrecked:
+            ship._wrecked |= ship._mast_bits[field]
         return ship
 
     def __str__(self) -> str:
-        waving_masts_codes = [field.name for field in self.waving_masts]
-        wrecked_masts_codes = [field.name for field in self.wrecked_masts]
+        waving_masts_codes = [field.name for field in sorted(self.waving_masts)]
+        wrecked_masts_codes = [field.name for field in sorted(self.wrecked_masts)]
         waving = ",".join(waving_masts_codes) or "empty"
         wrecked = ",".join(wrecked_masts_codes) or "empty"
         return f"Ship<{len(self.fields)}>(🏳️ {waving}|💀 {wrecked})"
 
     def __repr__(self) -> str:
-        return f"Ship({self.fields!r})"
+        return f"Ship({set(self._fields)!r})"
 
 
 class ShipBiggerThanAllowedError(ValueError):
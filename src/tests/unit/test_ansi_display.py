@@ -0,0 +1,100 @@
+import asyncio
+import io
+import re
+from threading import Event
+
+import janus
+
+from application.io.actions import (
+    ActionEvent,
+    ActionEventBatch,
+    DisplayBoard,
+    InfoActions,
+    OutActions,
+)
+from application.io.ansi_display import GLYPHS, AnsiDisplay
+from application.io.io import IO
+
+CURSOR_MOVE = re.compile(r"\x1b\[(\d+);(\d+)H")
+
+
+def display_of(*events: ActionEvent) -> tuple[AnsiDisplay, io.StringIO]:
+    queue: janus.Queue = janus.Queue()
+    stream = io.StringIO()
+    display = AnsiDisplay(queue.sync_q, Event(), stream=stream)
+    display.set_board_size(10)
+    for event in events:
+        queue.sync_q.put(event)
+        display.step(timeout=0)
+    return display, stream
+
+
+def tests_redrawing_only_changed_cell():
+    display, stream = display_of(ActionEvent(InfoActions.PlayerConnected))
+    assert len(CURSOR_MOVE.findall(stream.getvalue())) > 2 * 10 * 10
+
+    display._out_queue.put(
+        ActionEvent(OutActions.MissShots, (2, 7), DisplayBoard.Shots)
+    )
+    output = stream.getvalue()
+    display.step(timeout=0)
+    update = stream.getvalue()[len(output) :]
+
+    shots_left = 1 + 2 * 10 + 8
+    assert CURSOR_MOVE.findall(update) == [(str(4 + 7), str(shots_left + 3 + 2 * 2))]
+    assert GLYPHS[OutActions.MissShots] in update
+
+
+def tests_writing_nothing_when_nothing_changed():
+    display, stream = display_of(ActionEvent(InfoActions.PlayerConnected))
+    output = stream.getvalue()
+    display.step(timeout=0)
+    assert stream.getvalue() == output
+
+
+def tests_highlighting_marker_row_and_column():
+    display, stream = display_of(
+        ActionEvent(InfoActions.PlayerConnected),
+        ActionEvent(OutActions.HoverShips, (0, 0), DisplayBoard.Ships),
+    )
+    output = stream.getvalue()
+    display._out_queue.put(
+        ActionEvent(OutActions.HoverShips, (1, 0), DisplayBoard.Ships)
+    )
+    display.step(timeout=0)
+    update = stream.getvalue()[len(output) :]
+
+    # old column is cleared, new one highlighted, row A stays highlighted
+    assert len(CURSOR_MOVE.findall(update)) == 2 * (10 - 1)
+
+
+def tests_applying_batch_of_events_at_once_in_order():
+    async def put_batch() -> tuple[AnsiDisplay, str, int]:
+        game_io = IO()
+        game_io._out_queue = janus.Queue()
+        display, stream = display_of(ActionEvent(InfoActions.PlayerConnected))
+        display._out_queue = game_io._out_queue.sync_q
+        await game_io.put_out_actions(
+            [
+                ActionEvent(OutActions.HitShots, (3, 3), DisplayBoard.Shots),
+                ActionEvent(OutActions.DestroyedShots, (3, 3), DisplayBoard.Shots),
+                ActionEvent(OutActions.MissShots, (5, 1), DisplayBoard.Shots),
+            ]
+        )
+        queued = game_io._out_queue.sync_q.qsize()
+        output = stream.getvalue()
+        batch = display.step(timeout=0)
+        assert isinstance(batch, ActionEventBatch)
+        game_io._out_queue.close()
+        await game_io._out_queue.wait_closed()
+        return display, stream.getvalue()[len(output) :], queued
+
+    display, update, queued = asyncio.run(put_batch())
+    # one queue item, handled within a single frame
+    assert queued == 1
+    tiles = display._tiles[DisplayBoard.Shots]
+    # later events of the batch win over the earlier ones of the same tile
+    assert tiles[3][3] == GLYPHS[OutActions.DestroyedShots]
+    assert tiles[1][5] == GLYPHS[OutActions.MissShots]
+    assert GLYPHS[OutActions.HitShots] not in update
+    assert GLYPHS[OutActions.DestroyedShots] in update
@@ -59,3 +59,15 @@ I|  ˙ ˙ ˙ ˙ ˙ ˙ ˙ ˙ ˙  |
 J|  ˙ ˙ ˙ ˙ ˙ ˙ ˙ ˙ ˙  |
   —————————————————————"""
     assert board.represent_graphically(10) == expected_output
+
+
+def tests_redrawing_shots_board_after_further_attacks():
+    board = ShotsBoard()
+    board.add_attack(Field("B2"), "Unknown")
+    before = board.represent_graphically(10)
+    board.add_attack(Field("B2"), AttackResultStatus.Missed)
+    after = board.represent_graphically(10)
+
+    assert before.splitlines()[3].split("˙")[1] == "?"
+    assert after.splitlines()[3].split("˙")[1] == "×"
+    assert before.splitlines()[4:] == after.splitlines()[4:]
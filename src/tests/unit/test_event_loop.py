@@ -0,0 +1,24 @@
+import asyncio
+import importlib.util
+
+from application import event_loop
+
+
+def tests_running_on_uvloop_or_falling_back_to_asyncio():
+    async def loop_type() -> str:
+        return type(asyncio.get_running_loop()).__module__
+
+    assert event_loop.run(loop_type(), "asyncio").startswith("asyncio")
+    expected = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    assert event_loop.run(loop_type(), "uvloop").startswith(expected)
+
+
+def tests_naming_loop_which_actually_runs():
+    async def running() -> str:
+        return event_loop.running_loop_name()
+
+    installed = importlib.util.find_spec("uvloop") is not None
+    assert event_loop.is_available("asyncio")
+    assert event_loop.is_available("uvloop") == installed
+    assert event_loop.run(running(), "asyncio") == "asyncio"
+    assert event_loop.run(running(), "uvloop") == ("uvloop" if installed else "asyncio")
@@ -0,0 +1,27 @@
+from domain.field import Field
+from domain.field_masks import board_mask, coastal_zone_mask_of, fields_of, mask_of
+
+
+def tests_coastal_zone_of_ship_in_corner():
+    coastal_zone = fields_of(coastal_zone_mask_of({Field("A1"), Field("A2")}))
+    assert coastal_zone == {
+        Field("A0"),
+        Field("B0"),
+        Field("B1"),
+        Field("B2"),
+        Field("B3"),
+        Field("A3"),
+    }
+
+
+def tests_fields_outside_grid_are_ignored():
+    assert mask_of({Field("A100")}) == 0
+    assert fields_of(mask_of({Field("Z26"), Field("A0")})) == {
+        Field("Z26"),
+        Field("A0"),
+    }
+
+
+def tests_board_mask_clips_fields_to_board():
+    mask = coastal_zone_mask_of({Field("J10")}) & board_mask(10)
+    assert fields_of(mask) == {Field("I9"), Field("I10"), Field("J9")}
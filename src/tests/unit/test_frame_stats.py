@@ -0,0 +1,23 @@
+from application.io.actions import ActionEvent, OutActions
+from application.io.instrumentation import FrameStats
+
+
+def tests_keeping_only_latest_frames_in_ring_buffer():
+    frame_stats = FrameStats("test", size=3, print_interval_seconds=None)
+    for events_count in range(5):
+        frame_stats.begin_frame()
+        for _ in range(events_count):
+            frame_stats.event_handled(ActionEvent(OutActions.PlayerTurn))
+        frame_stats.drawing()
+        frame_stats.showing()
+        frame_stats.end_frame()
+
+    samples = frame_stats.samples
+    assert [sample.events_count for sample in samples] == [2, 3, 4]
+    assert all(sample.max_event_lag_ms >= 0 for sample in samples)
+    assert frame_stats.summary().startswith("test: 3 frames")
+    assert len(frame_stats.dump().splitlines()) == 2 + 3
+
+
+def tests_summarizing_no_frames():
+    assert FrameStats("test").summary() == "test: no frames recorded"
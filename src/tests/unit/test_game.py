@@ -93,3 +93,29 @@ J|  ˙ ˙ ˙ ˙ ˙ ˙ ˙ ˙×˙  |
   —————————————————————
          ATTACKS"""
     assert game.show_state() == expected_state
+
+
+def tests_resetting_game_for_rematch():
+    masted_counts = MastedShipsCounts(single=1, two=1, three=0, four=0)
+    masted_ships = MastedShips(
+        counts=masted_counts,
+        single={Ship({Field("G8")})},
+        two={Ship({Field("A3"), Field("A4")})},
+        three=set(),
+        four=set(),
+    )
+    game = Game(masted_counts, 10)
+    empty_state = game.show_state()
+    game.place_ships(masted_ships)
+    game.handle_message(GameMessage(uniqid=uuid4(), data=AttackRequest(field="G8")))
+    game.attack(Field("B2"))
+    assert game.show_state() != empty_state
+
+    game.reset()
+
+    assert game.ships_placed is False
+    assert game.ships == [] and game.attacked_fields == set()
+    assert game.opponent_missed_fields == set()
+    assert game.show_state() == empty_state
+    game.place_ships(masted_ships)
+    assert game.all_ships_wrecked is False
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import socket
+import threading
+
+import pytest
+
+from application.handoff import (
+    Handoff,
+    HandoffError,
+    is_served,
+    notify_service_manager,
+    receive_handoff,
+    send_handoff,
+    serve_handoff,
+    take_over,
+)
+
+
+def tests_listening_socket_and_state_pass_over():
+    old_side, new_side = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    listening = socket.create_server(("127.0.0.1", 0))
+    state = bytes(range(256)) * 4096
+    sending = threading.Thread(target=send_handoff, args=(old_side, [listening], state))
+    sending.start()
+
+    sockets, received_state = receive_handoff(new_side)
+    Handoff(new_side, sockets, received_state).acknowledge()
+    sending.join(timeout=5)
+
+    assert not sending.is_alive()
+    assert received_state == state
+    (taken_over,) = sockets
+    assert taken_over.getsockname() == listening.getsockname()
+    # the taken over socket accepts connections made to the old one
+    with socket.create_connection(listening.getsockname()):
+        accepted, _ = taken_over.accept()
+        accepted.close()
+    for sock in (old_side, listening, taken_over):
+        sock.close()
+
+
+def tests_unexpected_handoff_is_rejected():
+    old_side, new_side = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_side.sendall(b"HTTP/1.1 200 OK\r\n\r\n")
+    with pytest.raises(HandoffError):
+        receive_handoff(new_side)
+    old_side.close()
+    new_side.close()
+
+
+def tests_notifying_service_manager_of_new_main_process(tmp_path, monkeypatch):
+    path = str(tmp_path / "notify.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as service_manager:
+        service_manager.bind(path)
+        monkeypatch.delenv("NOTIFY_SOCKET", raising=False)
+        assert not notify_service_manager("MAINPID=1")
+        monkeypatch.setenv("NOTIFY_SOCKET", path)
+        assert notify_service_manager("MAINPID=42")
+        assert service_manager.recv(64) == b"MAINPID=42"
+
+
+def tests_serving_handoffs_leaves_running_server_alone(tmp_path):
+    path = str(tmp_path / "battleships.handoff")
+    state = b"rooms"
+
+    async def hand_off() -> bytes:
+        return state
+
+    async def run() -> None:
+        listening = socket.create_server(("127.0.0.1", 0))
+        running = asyncio.create_task(
+            serve_handoff(path, lambda: [listening], hand_off)
+        )
+        while not os.path.exists(path):
+            await asyncio.sleep(0.01)
+
+        # a second server neither takes the socket nor is handed over to
+        assert is_served(path)
+        assert not await serve_handoff(path, lambda: [], hand_off)
+        assert not await serve_handoff(str(tmp_path / "missing" / "h"), list, hand_off)
+        assert not running.done()
+
+        handoff = await take_over(path)
+        assert handoff.state == state
+        # the path is left to the new server before it acknowledges
+        assert not os.path.exists(path)
+        handoff.acknowledge()
+        assert await asyncio.wait_for(running, timeout=5)
+        for sock in [listening, *handoff.sockets]:
+            sock.close()
+
+    asyncio.run(run())
@@ -0,0 +1,35 @@
+import asyncio
+
+from application.io.actions import ActionEvent, DisplayBoard, InActions
+from application.io.queues import HoverCoalescingQueue
+
+
+def tests_collapsing_consecutive_hovers_while_keeping_selects_in_order():
+    async def put_and_drain() -> list[ActionEvent]:
+        queue = HoverCoalescingQueue()
+        events = [
+            ActionEvent(InActions.Hover, (0, 0), DisplayBoard.Ships),
+            ActionEvent(InActions.Hover, (1, 0), DisplayBoard.Ships),
+            ActionEvent(InActions.Hover, (2, 0), DisplayBoard.Ships),
+            ActionEvent(InActions.Select, (2, 0), DisplayBoard.Ships),
+            ActionEvent(InActions.Hover, (3, 0), DisplayBoard.Ships),
+            ActionEvent(InActions.Hover, (3, 1), DisplayBoard.Shots),
+            ActionEvent(InActions.Hover, (3, 2), DisplayBoard.Shots),
+            ActionEvent(InActions.Confirm),
+        ]
+        for event in events:
+            queue.sync_q.put(event)
+        drained = []
+        while not queue.async_q.empty():
+            drained.append(await queue.async_q.get())
+        queue.close()
+        await queue.wait_closed()
+        return drained
+
+    assert asyncio.run(put_and_drain()) == [
+        ActionEvent(InActions.Hover, (2, 0), DisplayBoard.Ships),
+        ActionEvent(InActions.Select, (2, 0), DisplayBoard.Ships),
+        ActionEvent(InActions.Hover, (3, 0), DisplayBoard.Ships),
+        ActionEvent(InActions.Hover, (3, 2), DisplayBoard.Shots),
+        ActionEvent(InActions.Confirm),
+    ]
@@ -0,0 +1,93 @@
+import numpy as np
+
+from application.io.led_compositor import (
+    ColorCorrection,
+    Compositor,
+    channels_of,
+    lerp,
+    pack,
+)
+
+WATER = 0x00040F0F
+SHIP = 0x0003A300
+RED = 0x007F0000
+CENTER = 0x00FFFB00
+AXIS = 0x00FFFFFF
+BORDER = 0x000000FF
+
+
+def compositor_of(size: int) -> Compositor:
+    compositor = Compositor(
+        (16, 16), np.arange(16 * 16), marker_center=CENTER, marker_axis=AXIS
+    )
+    compositor.set_board(size, WATER)
+    return compositor
+
+
+def tests_packing_channels_as_rpi_color():
+    color = (7 << 24) | (1 << 16) | (2 << 8) | 3
+    assert pack(channels_of(color)) == color
+
+
+def tests_lerping_truncates_towards_zero():
+    assert list(lerp(channels_of(0x00FF0000), channels_of(0), 0.1)) == [230, 0, 0, 0]
+    assert list(lerp(channels_of(0), channels_of(0x00FF0000), 0.1)) == [25, 0, 0, 0]
+
+
+def tests_composing_tiles_inside_border():
+    compositor = compositor_of(10)
+    compositor.change_tile((0, 0), SHIP)
+    frame = compositor.compose((-1, -1), BORDER, now_ms=0).reshape(16, 16)
+
+    assert frame[0, 0] == 0
+    assert frame[2, 2] == BORDER and frame[13, 13] == BORDER
+    assert frame[3, 3] == SHIP
+    assert frame[3, 4] == WATER
+
+
+def tests_highlighting_marker_row_and_column():
+    compositor = compositor_of(10)
+    frame = compositor.compose((1, 2), BORDER, now_ms=0).reshape(16, 16)
+
+    axis = pack(lerp(channels_of(WATER), channels_of(AXIS), 0.1))
+    center = pack(lerp(channels_of(WATER), channels_of(CENTER), 0.1))
+    assert frame[3 + 2, 3 + 1] == center
+    assert frame[3 + 2, 3 + 5] == axis
+    assert frame[3 + 7, 3 + 1] == axis
+    assert frame[3 + 7, 3 + 5] == WATER
+
+
+def tests_blinks_expire():
+    compositor = compositor_of(10)
+    compositor.blink_tile((4, 4), RED, until_ms=500)
+    compositor.blink_border(RED, until_ms=500)
+
+    frame = compositor.compose((-1, -1), BORDER, now_ms=499).reshape(16, 16)
+    assert frame[7, 7] == RED and frame[2, 2] == RED
+    frame = compositor.compose((-1, -1), BORDER, now_ms=500).reshape(16, 16)
+    assert frame[7, 7] == WATER and frame[2, 2] == BORDER
+
+
+def tests_taking_pixels_in_strip_order():
+    strip_order = np.arange(16 * 16)[::-1].copy()
+    compositor = Compositor((16, 16), strip_order, marker_center=0, marker_axis=0)
+    compositor.set_board(10, WATER)
+    compositor.change_tile((0, 0), SHIP)
+    strip = compositor.compose((-1, -1), BORDER, now_ms=0)
+    assert strip[16 * 16 - 1 - (3 * 16 + 3)] == SHIP
+
+
+def tests_correcting_all_channels_of_packed_colors():
+    correction = ColorCorrection(gamma=1.0, brightness=255)
+    colors = np.array([0x01020304, 0xFF00FF00], dtype=np.uint32)
+    assert list(correction.correct(colors)) == list(colors)
+
+    correction.set_brightness(0)
+    assert list(correction.correct(colors)) == [0, 0]
+
+
+def tests_keeping_dim_colors_lit_after_gamma():
+    correction = ColorCorrection(gamma=2.8, brightness=20)
+    corrected = correction.correct(np.array([0x00040F0F, 0x00FFFFFF], dtype=np.uint32))
+    assert corrected[0] == 0x00010101
+    assert corrected[1] == 0x00141414
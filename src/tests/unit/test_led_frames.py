@@ -0,0 +1,26 @@
+import importlib.resources as pkg_res
+import shutil
+
+from application.io import resources
+from application.io.led_img import (
+    Animation,
+    build_frames_file,
+    decode_sprite_sheet,
+    frames_path_of,
+)
+
+
+def tests_frames_file_holds_decoded_sprite_sheet(tmp_path):
+    with pkg_res.path(resources, "gnome.png") as resource_path:
+        img_path = tmp_path / "gnome.png"
+        shutil.copy(resource_path, img_path)
+
+    frames_path = build_frames_file(img_path, 16, 16)
+    assert frames_path == frames_path_of(img_path, 16, 16)
+    assert not any(path.suffix == ".tmp" for path in tmp_path.iterdir())
+
+    animation = Animation(str(img_path), 100)
+    animation._map_frames_file(frames_path, 16, 16)
+    decoded = decode_sprite_sheet(img_path, 16, 16)
+    assert len(animation._frames) == 5
+    assert [c for frame in animation._frames for c in frame] == list(decoded)
@@ -0,0 +1,92 @@
+from threading import Event
+
+import janus
+import numpy as np
+
+from application.io.actions import ActionEvent, DisplayBoard, InfoActions, OutActions
+from application.io.fake_led import FakePixelStrip
+from application.io.led_compositor import ColorCorrection
+from application.io.led_display import LED_CONFIG, Display, ExtraColors
+
+
+def display_of(*events: ActionEvent) -> Display:
+    queue: janus.Queue = janus.Queue()
+    display = Display(queue.sync_q, Event(), backend=FakePixelStrip)
+    display.load_animations()
+    display.set_board_size(10)
+    for event in events:
+        queue.sync_q.put(event)
+        display.step(timeout=0)
+    return display
+
+
+def shown_color(display: Display, board: DisplayBoard, tile: tuple[int, int]) -> int:
+    led_board = (
+        display._ships_led_board
+        if board == DisplayBoard.Ships
+        else display._shots_led_board
+    )
+    matrix = led_board._led_matrix
+    off = (LED_CONFIG.matrix_size[0] - 10) // 2
+    return int(
+        matrix.strip.frames[-1][matrix.matrixToLEDPos((tile[0] + off, tile[1] + off))]
+    )
+
+
+def corrected(color: int) -> int:
+    correction = ColorCorrection(LED_CONFIG.matrix_gamma, LED_CONFIG.matrix_brightness)
+    return int(correction.correct(np.array([color], dtype=np.uint32))[0])
+
+
+def tests_rendering_placed_ship():
+    display = display_of(
+        ActionEvent(InfoActions.PlayerConnected),
+        ActionEvent(OutActions.PlaceShips),
+        ActionEvent(OutActions.Ship, (0, 0), DisplayBoard.Ships),
+        ActionEvent(OutActions.HoverShips, (5, 5), DisplayBoard.Ships),
+    )
+
+    assert shown_color(display, DisplayBoard.Ships, (0, 0)) == corrected(
+        LED_CONFIG.color_map[OutActions.Ship]
+    )
+    assert shown_color(display, DisplayBoard.Ships, (9, 9)) == corrected(
+        LED_CONFIG.color_map[ExtraColors.Water]
+    )
+
+
+def tests_rendering_shots_once_opponent_connected():
+    display = display_of(
+        ActionEvent(InfoActions.PlayerConnected),
+        ActionEvent(InfoActions.OpponentConnected),
+        ActionEvent(OutActions.MissShots, (2, 7), DisplayBoard.Shots),
+    )
+
+    assert shown_color(display, DisplayBoard.Shots, (2, 7)) == corrected(
+        LED_CONFIG.color_map[OutActions.MissShots]
+    )
+
+
+def tests_showing_frame_per_step_on_both_boards():
+    display = display_of(ActionEvent(InfoActions.PlayerConnected))
+    ships_strip = display._ships_led_board._led_matrix.strip
+    shots_strip = display._shots_led_board._led_matrix.strip
+    shown = ships_strip.show_count
+
+    display.step(timeout=0)
+    display.step(timeout=0)
+
+    assert ships_strip.show_count == shown + 2
+    assert shots_strip.show_count == ships_strip.show_count
+
+
+def tests_dimming_without_restart():
+    display = display_of(
+        ActionEvent(InfoActions.PlayerConnected),
+        ActionEvent(OutActions.Ship, (0, 0), DisplayBoard.Ships),
+    )
+    bright = shown_color(display, DisplayBoard.Ships, (0, 0))
+
+    display.set_brightness(1)
+    display.step(timeout=0)
+
+    assert shown_color(display, DisplayBoard.Ships, (0, 0)) < bright
@@ -0,0 +1,136 @@
+import asyncio
+import dataclasses
+from uuid import uuid4
+
+import pytest
+from application import server
+from application.local_connection import LocalConnection
+from application.messaging import (
+    ClientInfo,
+    GameInfo,
+    GameStatus,
+    parse_game_info,
+)
+from application.room import Room
+from application.snapshots import mark_restored
+from websockets import ConnectionClosedError, ConnectionClosedOK
+
+MOVE = {
+    "what": "GameMessage",
+    "data": {"type_": "PossibleAttack", "field": {"field_repr": "A1"}},
+}
+
+
+def tests_passing_messages_in_order_until_closed():
+    async def exchange() -> None:
+        client_end, server_end = LocalConnection.pair("/arena")
+        first, second = {"n": 1}, {"n": 2}
+        await client_end.send(first)
+        await client_end.send(second)
+        await client_end.close(1001, "Going away")
+
+        # parsed messages are passed as they are, the close comes after them
+        assert await server_end.recv() is first
+        assert await server_end.recv() is second
+        for _ in range(2):
+            with pytest.raises(ConnectionClosedOK) as closed:
+                await server_end.recv()
+            assert closed.value.rcvd is not None
+            assert closed.value.rcvd.code == 1001
+        assert not server_end.put({"n": 3})
+        with pytest.raises(ConnectionClosedOK):
+            await client_end.send({"n": 3})
+        await asyncio.wait_for(server_end.wait_closed(), timeout=1)
+        assert server_end.request.path == "/arena"
+
+    asyncio.run(exchange())
+
+
+def tests_closing_for_policy_violation_raises_error():
+    async def exchange() -> None:
+        client_end, server_end = LocalConnection.pair("")
+        await server_end.close(1008, "Rate or size limits exceeded")
+        with pytest.raises(ConnectionClosedError):
+            await client_end.recv()
+
+    asyncio.run(exchange())
+
+
+def tests_relaying_between_players_connected_in_memory():
+    def client_info() -> dict:
+        return ClientInfo(
+            uniqid=uuid4(),
+            connected=True,
+            ships_placed=True,
+            ready=True,
+            all_ships_wrecked=False,
+        ).serialize()
+
+    async def play() -> None:
+        path = f"/local-{uuid4().hex}"
+        first = server.connect_local(path)
+        await first.send(client_info())
+        waiting = parse_game_info(await first.recv())
+        assert waiting.status == GameStatus.WaitingToStart
+
+        second = server.connect_local(path)
+        await second.send(client_info())
+        for player in (first, second):
+            started = parse_game_info(await player.recv())
+            assert started.status == GameStatus.Started
+
+        await first.send(MOVE)
+        assert await second.recv() == MOVE
+        await second.close()
+        with pytest.raises(ConnectionClosedOK):
+            await asyncio.wait_for(first.recv(), timeout=1)
+
+    asyncio.run(play())
+
+
+def tests_restored_game_starts_once_both_players_resume_it():
+    async def status_of_next(player: LocalConnection) -> GameInfo:
+        return parse_game_info(await asyncio.wait_for(player.recv(), timeout=1))
+
+    async def play() -> None:
+        kept = [
+            ClientInfo(
+                uniqid=uuid4(),
+                connected=True,
+                ships_placed=True,
+                ready=True,
+                all_ships_wrecked=False,
+            )
+            for _ in range(2)
+        ]
+        room = Room(f"local-{uuid4().hex}")
+        room.client_infos = list(kept)
+        room.second_client_has_already_connected = True
+        await server.adopt_rooms(mark_restored([room]))
+
+        async def reattach(info: ClientInfo) -> LocalConnection:
+            player = server.connect_local(f"/{room.name}")
+            # not ready until the room turns out to be resumed
+            not_ready = dataclasses.replace(info, ships_placed=False, ready=False)
+            await player.send(not_ready.serialize())
+            resumed = await status_of_next(player)
+            assert resumed.extra is not None and resumed.extra.resumed
+            return player
+
+        # the second player resumes before the first one has reattached
+        second = await reattach(kept[1])
+        await second.send(kept[1].serialize())
+        first = await reattach(kept[0])
+        players = [first, second]
+        for player in players:
+            assert (await status_of_next(player)).status == GameStatus.WaitingToStart
+        await first.send(kept[0].serialize())
+        for player in players:
+            assert (await status_of_next(player)).status == GameStatus.Started
+        # the second player is still served
+        await second.send(MOVE)
+        assert await asyncio.wait_for(first.recv(), timeout=1) == MOVE
+        for player in players:
+            await player.close()
+
+    asyncio.run(play())
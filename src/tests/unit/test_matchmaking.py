@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from application.matchmaking import (
+    InvalidMatchRequest,
+    Matchmaker,
+    MatchKey,
+    fleet_fits,
+    match_request_path,
+    parse_match_request,
+)
+from config import CONFIG, MastedShipsCounts
+
+
+def tests_parsing_match_requests():
+    small = MastedShipsCounts(single=2, two=1, three=0, four=0)
+    key = parse_match_request(match_request_path(6, small, rating=1520), 200)
+    assert key == MatchKey(6, small, rating_bucket=7)
+    assert parse_match_request("/match") == MatchKey(
+        CONFIG.board_size, CONFIG.masted_ships_counts
+    )
+    for path in (
+        "/match?board_size=ten",
+        "/match?board_size=27",
+        "/match?ships=1,2,3",
+        "/match?ships=0,0,0,0",
+        # a four-masted ship does not fit a board of 2
+        "/match?board_size=2&ships=0,0,0,1",
+        # the standard ships and their surroundings need more than a board of 6
+        "/match?board_size=6",
+    ):
+        with pytest.raises(InvalidMatchRequest):
+            parse_match_request(path)
+
+
+def tests_pairing_longest_waiting_player_of_same_game():
+    async def arrive() -> None:
+        matchmaker = Matchmaker()
+        default = parse_match_request("/match")
+        small = parse_match_request("/match?board_size=6&ships=2,1,0,0")
+        left = matchmaker.join(default)
+        first = matchmaker.join(small)
+        assert not left.done() and matchmaker.waiting_count == 2
+        left.cancel()
+        await asyncio.sleep(0)
+        assert matchmaker.waiting_count == 1
+
+        # the one who has left is skipped
+        longest_waiting = matchmaker.join(default)
+        other_game = matchmaker.join(small)
+        assert not longest_waiting.done() and first.done()
+        assert first.result() is other_game.result()
+
+        arriving = matchmaker.join(default)
+        room = arriving.result()
+        assert longest_waiting.result() is room
+        assert room.board_size == CONFIG.board_size
+
+        assert other_game.result().board_size == 6
+        await asyncio.sleep(0)
+        assert matchmaker.waiting_count == 0
+
+    asyncio.run(arrive())
+
+
+def tests_burst_of_arrivals_is_paired_at_once():
+    async def burst() -> list[int]:
+        matchmaker = Matchmaker()
+        key = parse_match_request("/match")
+        arrivals = [matchmaker.join(key) for _ in range(100)]
+        await asyncio.sleep(0)
+        assert matchmaker.waiting_count == 0
+        room_players: dict[str, int] = {}
+        for matched in arrivals:
+            name = matched.result().name
+            room_players[name] = room_players.get(name, 0) + 1
+        return list(room_players.values())
+
+    assert asyncio.run(burst()) == [2] * 50
+
+
+def tests_checking_fleet_fits_board():
+    assert fleet_fits(10, CONFIG.masted_ships_counts)
+    assert fleet_fits(1, MastedShipsCounts(single=1, two=0, three=0, four=0))
+    assert not fleet_fits(1, MastedShipsCounts(single=2, two=0, three=0, four=0))
+    assert fleet_fits(4, MastedShipsCounts(single=0, two=0, three=0, four=2))
+    assert not fleet_fits(4, MastedShipsCounts(single=0, two=0, three=0, four=3))
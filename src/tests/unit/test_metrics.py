@@ -0,0 +1,68 @@
+import asyncio
+
+from application.metrics import Counter, Gauge, Histogram, Registry, serve_metrics
+import pytest
+
+
+def tests_rendering_counters_and_gauges():
+    registry = Registry()
+    connections = registry.register(Counter("conns_total", "Connections", ("role",)))
+    rooms = registry.register(Gauge("rooms", "Rooms", callback=lambda: 3))
+    connections.inc(role="player")
+    connections.inc(2, role="spectator")
+    assert connections.value(role="spectator") == 2
+    assert rooms.value() == 3
+    assert registry.render() == (
+        "# HELP conns_total Connections\n"
+        + "# TYPE conns_total counter\n"
+        + 'conns_total{role="player"} 1\n'
+        + 'conns_total{role="spectator"} 2\n'
+        + "# HELP rooms Rooms\n"
+        + "# TYPE rooms gauge\n"
+        + "rooms 3\n"
+    )
+
+
+def tests_rejecting_unknown_labels_and_negative_counter_increase():
+    counter = Counter("msgs_total", "Messages", ("type",))
+    with pytest.raises(ValueError):
+        counter.inc(what="GameInfo")
+    with pytest.raises(ValueError):
+        counter.inc(-1, type="GameInfo")
+
+
+def tests_rendering_cumulative_histogram_buckets():
+    histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.1)
+    histogram.observe(0.5)
+    histogram.observe(3)
+    assert histogram.count() == 4
+    assert histogram.samples() == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 3.65",
+        "latency_seconds_count 4",
+    ]
+
+
+def tests_serving_metrics_over_http():
+    registry = Registry()
+    registry.register(Counter("resets_total", "Resets")).inc()
+
+    async def fetch(path: str) -> bytes:
+        server = await serve_metrics("127.0.0.1", 0, registry)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        response = await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return response
+
+    response = asyncio.run(fetch("/metrics"))
+    assert response.startswith(b"HTTP/1.1 200 OK")
+    assert response.endswith(b"resets_total 1\n")
+    assert asyncio.run(fetch("/")).startswith(b"HTTP/1.1 404")
@@ -0,0 +1,81 @@
+import asyncio
+
+from application.outbox import Outbox, dropped_messages_counter
+
+
+class StalledConnection:
+    remote_address = ("127.0.0.1", 1)
+
+    def __init__(self) -> None:
+        self.sent: list[str] = []
+        self.unblocked = asyncio.Event()
+        self.aborted = False
+        self.transport = self
+
+    async def send(self, frame: str) -> None:
+        await self.unblocked.wait()
+        self.sent.append(frame)
+
+    def abort(self) -> None:
+        self.aborted = True
+
+
+def tests_dropping_hovers_before_disconnecting_on_overflow():
+    async def fill() -> tuple[StalledConnection, list[bool]]:
+        websocket = StalledConnection()
+        outbox = Outbox(websocket, on_sent=lambda _: None, size=3)
+        await asyncio.sleep(0)
+        # nothing is sent until the writer gets its turn
+        queued = [
+            outbox.put("move-1"),
+            outbox.put("hover-1", droppable=True),
+            outbox.put("move-2"),
+            outbox.put("move-3"),
+            outbox.put("hover-2", droppable=True),
+        ]
+        websocket.unblocked.set()
+        await asyncio.sleep(0.01)
+        queued.append(outbox.put("move-4"))
+        queued.append(outbox.put("move-5"))
+        await asyncio.sleep(0.01)
+        outbox.close()
+        return websocket, queued
+
+    dropped_hovers = dropped_messages_counter.value(reason="hover")
+    websocket, queued = asyncio.run(fill())
+    assert queued == [True] * 7
+    assert websocket.sent == ["move-1", "move-2", "move-3", "move-4", "move-5"]
+    assert dropped_messages_counter.value(reason="hover") == dropped_hovers + 2
+    assert not websocket.aborted
+
+
+def tests_disconnecting_when_queue_is_full_of_moves():
+    async def fill() -> tuple[StalledConnection, list[bool]]:
+        websocket = StalledConnection()
+        outbox = Outbox(websocket, on_sent=lambda _: None, size=2)
+        await asyncio.sleep(0)
+        queued = [outbox.put(f"move-{n}") for n in range(5)]
+        outbox.close()
+        return websocket, queued
+
+    websocket, queued = asyncio.run(fill())
+    assert queued == [True, True, False, False, False]
+    assert websocket.aborted
+
+
+def tests_drained_waits_for_queued_frames():
+    async def drain() -> tuple[list[str], bool]:
+        websocket = StalledConnection()
+        outbox = Outbox(websocket, on_sent=lambda _: None)
+        outbox.put("move-1")
+        outbox.put("move-2")
+        draining = asyncio.create_task(outbox.drained())
+        await asyncio.sleep(0.01)
+        waited = not draining.done()
+        websocket.unblocked.set()
+        await asyncio.wait_for(draining, timeout=1)
+        return websocket.sent, waited
+
+    sent, waited = asyncio.run(drain())
+    assert waited
+    assert sent == ["move-1", "move-2"]
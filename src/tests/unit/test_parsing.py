@@ -6,9 +6,13 @@ from application.messaging import (
     GameInfo,
     GameMessage,
     GameStatus,
+    RelayedMessage,
+    RoomState,
     parse_client_info,
     parse_game_message_or_info,
+    parse_spectator_message,
 )
+from application.room import parse_request_path
 from domain.field import Field
 from config import MastedShipsCounts
 
@@ -75,3 +79,35 @@ def test_parsing_client_info():
         ready=False,
         all_ships_wrecked=False,
     )
+
+
+def test_parsing_spectator_message():
+    relayed_data = {
+        "sender": 1,
+        "message": {
+            "uniqid": "2560dff4-d73f-4d09-b1c4-b925ceb368bc",
+            "data": {"field": "A4", "status": "Shot", "type_": "AttackResult"},
+            "what": "GameMessage",
+        },
+        "what": "RelayedMessage",
+    }
+    result1 = parse_spectator_message(relayed_data)
+    assert isinstance(result1, RelayedMessage)
+    assert result1.sender == 1
+    assert result1.message == relayed_data["message"]
+
+    room_state_data = {
+        "room": "default",
+        "players": [None, None],
+        "history": [relayed_data],
+        "what": "RoomState",
+    }
+    result2 = parse_spectator_message(room_state_data)
+    assert result2 == RoomState(room="default", players=[None, None], history=[result1])
+
+
+def test_parsing_request_path():
+    assert parse_request_path("/") == ("default", "player")
+    assert parse_request_path("/arena") == ("arena", "player")
+    assert parse_request_path("/arena?role=spectator") == ("arena", "spectator")
+    assert parse_request_path("/?role=spectator") == ("default", "spectator")
@@ -0,0 +1,50 @@
+from application.rate_limit import RateLimiter, TokenBucket
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def tests_token_bucket_refills_up_to_burst():
+    clock = Clock()
+    bucket = TokenBucket((2.0, 3), clock)
+    assert [bucket.take() for _ in range(4)] == [True, True, True, False]
+    clock.now = 0.5
+    assert [bucket.take() for _ in range(2)] == [True, False]
+    clock.now = 100
+    assert [bucket.take() for _ in range(4)] == [True, True, True, False]
+
+
+def tests_throttling_then_disconnecting_flooding_client():
+    clock = Clock()
+    limiter = RateLimiter(
+        {"*": (100.0, 100), "PossibleAttack": (1.0, 2)},
+        strikes=(1.0, 2),
+        max_message_size=1024,
+        clock=clock,
+    )
+    verdicts = [limiter.check_message("PossibleAttack") for _ in range(5)]
+    assert verdicts == ["allowed", "allowed", "throttled", "throttled", "disconnect"]
+    assert limiter.check_message("AttackRequest") == "allowed"
+    assert limiter.check_frame(1024) == "allowed"
+    assert limiter.check_frame(1025) == "disconnect"
+
+
+def tests_disconnecting_on_game_messages_over_limits_instead_of_dropping():
+    clock = Clock()
+    limiter = RateLimiter(
+        {"*": (100.0, 3), "AttackResult": (1.0, 1)},
+        strikes=(1.0, 5),
+        max_message_size=1024,
+        clock=clock,
+    )
+    assert limiter.check_message("AttackResult") == "allowed"
+    # a dropped result would leave the attacker's field unknown
+    assert limiter.check_message("AttackResult") == "disconnect"
+    assert limiter.check_message("PossibleAttack") == "allowed"
+    assert limiter.check_message("PossibleAttack") == "throttled"
+    assert limiter.check_message("ClientInfo") == "disconnect"
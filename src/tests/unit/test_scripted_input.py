@@ -0,0 +1,61 @@
+import asyncio
+import time
+from threading import Event, Thread
+
+import janus
+import pytest
+from application.io.actions import ActionEvent, InActions
+from application.io.scripted_input import ScriptedInput, parse_script
+
+SCRIPT = """
+# place the marker, select and confirm
+0.05 Hover B3
+0.10 Select B3  # the field is attacked
+0    Confirm
+"""
+
+
+def tests_parsing_script():
+    script = parse_script(SCRIPT.splitlines())
+    assert script == [
+        (0.05, ActionEvent(InActions.Hover, (2, 1))),
+        (0.1, ActionEvent(InActions.Select, (2, 1))),
+        (0.0, ActionEvent(InActions.Confirm)),
+    ]
+    with pytest.raises(ValueError, match="line 1"):
+        parse_script(["0.5 Jump A1"])
+
+
+def tests_putting_scripted_events_at_their_times():
+    async def play() -> list[tuple[float, ActionEvent]]:
+        queue: janus.Queue[ActionEvent] = janus.Queue()
+        stop = Event()
+        scripted = ScriptedInput(queue.sync_q, stop, parse_script(SCRIPT.splitlines()))
+        thread = Thread(target=scripted.run)
+        thread.start()
+        # nothing is put until the board size is known
+        await asyncio.sleep(0.1)
+        assert queue.async_q.empty()
+
+        started_at = time.monotonic()
+        scripted.set_board_size(10)
+        received = []
+        for _ in range(3):
+            event = await asyncio.wait_for(queue.async_q.get(), timeout=1)
+            received.append((time.monotonic() - started_at, event))
+        stop.set()
+        thread.join()
+        queue.close()
+        await queue.wait_closed()
+        return received
+
+    received = asyncio.run(play())
+    assert [(event.action, event.tile) for _, event in received] == [
+        (InActions.Hover, (2, 1)),
+        (InActions.Select, (2, 1)),
+        (InActions.Confirm, None),
+    ]
+    at = [seconds for seconds, _ in received]
+    assert 0.05 <= at[0] < 0.15
+    assert 0.15 <= at[1] < 0.25
+    assert at[2] - at[1] < 0.05
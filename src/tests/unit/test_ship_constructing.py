@@ -1,3 +1,4 @@
+from domain.attacks import AttackResultStatus
 from domain.boards import ShipsBoard, get_all_ship_fields
 from domain.field import Field
 from domain.ships import Ship
@@ -39,3 +40,26 @@ def test_getting_all_ship_fields_when_one_given():
         get_all_ship_fields(attacked_fields, Field("G5"), list(ships_fields))
         == ships_fields
     )
+
+
+def tests_attacked_ship_stays_findable_in_set():
+    ship = Ship({Field("B2"), Field("B3")})
+    ships = {ship}
+    assert ship.attack(Field("B2")) == AttackResultStatus.Shot
+    assert ship in ships
+    assert ship.attack(Field("B2")) == AttackResultStatus.AlreadyShot
+    assert ship.wrecked_masts == {Field("B2")}
+    assert ship.waving_masts == {Field("B3")}
+    assert ship == Ship.from_parts(wrecked={Field("B2")}, waving={Field("B3")})
+    assert ship != Ship({Field("B2"), Field("B3")})
+    assert ship.attack(Field("B3")) == AttackResultStatus.ShotDown
+    assert ship.attack(Field("C3")) == AttackResultStatus.Missed
+
+
+def tests_sorting_ships_by_masts_count_then_fields():
+    ships = [
+        Ship({Field("A3"), Field("A4")}),
+        Ship({Field("J6")}),
+        Ship({Field("A1")}),
+    ]
+    assert sorted(ships) == [ships[2], ships[1], ships[0]]
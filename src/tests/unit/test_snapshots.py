@@ -0,0 +1,110 @@
+import time
+from uuid import uuid4
+
+from application.messaging import ClientInfo
+from application.room import Room
+from application.snapshots import (
+    RoomEncoder,
+    decode_room,
+    restore_rooms,
+    write_snapshot_file,
+)
+
+
+def client_info(ships_placed: bool = True) -> ClientInfo:
+    return ClientInfo(
+        uniqid=uuid4(),
+        connected=True,
+        ships_placed=ships_placed,
+        ready=ships_placed,
+        all_ships_wrecked=False,
+    )
+
+
+def move(type_: str, field: str, **data) -> dict:
+    return {
+        "uniqid": str(uuid4()),
+        "data": {"field": field, "type_": type_, **data},
+        "what": "GameMessage",
+    }
+
+
+def played_room(moves: int) -> Room:
+    room = Room("room-1")
+    room.client_infos = [client_info(), client_info()]
+    room.second_client_has_already_connected = True
+    for n in range(moves):
+        sender = n % 2
+        field = f"{chr(ord('A') + n % 10)}{n % 10 + 1}"
+        room.history.append((sender, move("AttackRequest", field)))
+        room.history.append((1 - sender, move("AttackResult", field, status="Missed")))
+    return room
+
+
+def tests_room_survives_encoding_and_decoding():
+    room = played_room(3)
+    unexpected = {"what": "GameMessage", "data": {"type_": "Surrender"}}
+    room.history.append((0, unexpected))
+
+    room.board_size = 6
+    restored = decode_room(RoomEncoder().encode(room))
+
+    assert restored.name == room.name
+    assert restored.board_size == 6
+    assert restored.masted_ships_counts == room.masted_ships_counts
+    assert restored.second_client_has_already_connected
+    assert restored.history == room.history
+    for restored_info, info in zip(restored.client_infos, room.client_infos):
+        assert restored_info is not None and info is not None
+        assert restored_info.uniqid == info.uniqid
+        assert restored_info.ships_placed and not restored_info.connected
+
+
+def tests_encoder_appends_moves_and_restarts_after_clearing():
+    room = played_room(2)
+    encoder = RoomEncoder()
+    encoder.encode(room)
+    room.history.append((0, move("AttackRequest", "J10")))
+    assert decode_room(encoder.encode(room)).history == room.history
+
+    room.clear_players()
+    room.client_infos[0] = client_info(ships_placed=False)
+    restored = decode_room(encoder.encode(room))
+    assert restored.history == []
+    assert restored.client_infos[1] is None
+
+
+def tests_turn_follows_last_attack_request():
+    room = played_room(0)
+    assert room.turn == 0
+    room.history.append((0, move("AttackRequest", "A1")))
+    room.history.append((1, move("AttackResult", "A1", status="Shot")))
+    assert room.turn == 1
+    room.history.append((1, move("AttackRequest", "B1")))
+    assert room.turn == 0
+
+
+def tests_restored_rooms_await_their_players(tmp_path):
+    room = played_room(1)
+    path = str(tmp_path / "rooms.snapshot")
+    write_snapshot_file(path, [RoomEncoder().encode(room)])
+
+    (restored,) = restore_rooms(path)
+
+    # nobody is connected yet, the room is kept until they reattach
+    assert restored.is_empty and restored.awaits_reattach
+    first = room.client_infos[0]
+    assert first is not None
+    assert restored.restored_client_number(first.uniqid) == 0
+    assert restored.restored_client_number(uuid4()) is None
+    assert restore_rooms(str(tmp_path / "missing.snapshot")) == []
+
+
+def tests_snapshot_of_long_match_takes_below_millisecond():
+    room = played_room(100)
+    encoder = RoomEncoder()
+    encoder.encode(room)
+    room.history.append((0, move("AttackRequest", "A1")))
+    started = time.perf_counter()
+    encoder.encode(room)
+    assert time.perf_counter() - started < 0.001
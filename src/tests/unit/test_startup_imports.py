@@ -0,0 +1,20 @@
+from benchmarks.startup_imports import (
+    DISPLAY_PATH_IMPORTS,
+    FULL_CLIENT_IMPORTS,
+    deferred_modules_imported,
+    import_times,
+)
+
+
+def tests_display_path_does_not_import_game_modules():
+    times = import_times(DISPLAY_PATH_IMPORTS["terminal"])
+    assert "application.client_boot" in times
+    assert deferred_modules_imported(list(times)) == []
+
+
+def tests_whole_client_imports_game_modules():
+    display_times = import_times(DISPLAY_PATH_IMPORTS["terminal"])
+    times = import_times(FULL_CLIENT_IMPORTS["terminal"])
+    assert "application.messaging" in deferred_modules_imported(list(times))
+    # the whole client measures the display path of the same mode and more
+    assert set(display_times) <= set(times)
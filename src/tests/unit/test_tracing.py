@@ -0,0 +1,88 @@
+from uuid import UUID
+from application.messaging import GameMessage, parse_game_message
+from application.tracing import (
+    TraceContext,
+    TraceHop,
+    merge_records,
+    stage_durations,
+    stamp_serialized,
+    summarize,
+)
+from domain.attacks import AttackRequest
+from domain.field import Field
+
+
+def hop(stage: str, host: str, t_ms: float) -> dict:
+    return {"stage": stage, "host": host, "t_ns": int(t_ms * 1e6)}
+
+
+def tests_passing_trace_through_serialized_game_message():
+    trace = TraceContext(span_id="abc", hops=[TraceHop("input", "a", 1)])
+    message = GameMessage(
+        uniqid=UUID("2560dff4-d73f-4d09-b1c4-b925ceb368bc"),
+        data=AttackRequest(field=Field("A4")),
+        trace=trace,
+    )
+    serialized = message.serialize()
+    stamp_serialized(serialized, "server_received")
+    parsed = parse_game_message(serialized)
+    assert parsed.trace.span_id == "abc"
+    assert [hop.stage for hop in parsed.trace.hops] == ["input", "server_received"]
+
+
+def tests_computing_stage_durations_of_hops_on_different_hosts():
+    hops = [
+        hop("input", "a", 0),
+        hop("client_sending", "a", 2),
+        hop("server_received", "s", 1000),
+        hop("server_forwarding", "s", 1001),
+        hop("client_received", "b", 5000),
+        hop("client_result_sending", "b", 5004),
+        hop("server_received", "s", 1020),
+        hop("server_forwarding", "s", 1021),
+        hop("client_received", "a", 32),
+        hop("rendered", "a", 40),
+    ]
+    durations = stage_durations(hops)
+    assert durations["input -> client_sending"] == [2]
+    assert durations["server_received -> server_forwarding"] == [1, 1]
+    assert durations["client_received -> client_result_sending"] == [4]
+    assert durations["client_received -> rendered"] == [8]
+    # 30 ms round trip minus 1 + 4 + 1 ms spent at the server and opponent
+    assert durations["network (all transits)"] == [24]
+
+
+def tests_pairing_only_adjacent_hops_of_a_two_leg_relay():
+    hops = [
+        hop("client_sending", "a", 0),
+        hop("server_received", "s", 100),
+        hop("server_forwarding", "s", 102),
+        hop("client_received", "b", 500),
+        hop("client_result_sending", "b", 530),
+        hop("server_received", "s", 150),
+        hop("server_forwarding", "s", 160),
+        hop("client_received", "a", 60),
+    ]
+    durations = stage_durations(hops)
+    assert durations == {
+        "server_received -> server_forwarding": [2, 10],
+        "client_received -> client_result_sending": [30],
+        # 60 ms round trip minus 2 + 30 + 10 ms spent at the server and opponent
+        "network (all transits)": [18],
+    }
+
+
+def tests_merging_records_of_the_same_span_from_different_hosts():
+    request_hops = [hop("input", "a", 0), hop("client_received", "b", 10)]
+    records = [
+        {"span_id": "x", "hops": request_hops + [hop("rendered", "b", 12)]},
+        {"span_id": "x", "hops": request_hops + [hop("client_received", "a", 5)]},
+    ]
+    merged = merge_records(records)
+    assert [h["stage"] for h in merged["x"]] == [
+        "input",
+        "client_received",
+        "rendered",
+        "client_received",
+    ]
+    assert summarize(records).startswith("1 traces")
@@ -0,0 +1,77 @@
+from application.turn_clock import TimerWheel, TurnClocks
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def tests_timer_wheel_fires_timers_once_past_their_ticks():
+    clock = Clock()
+    wheel: TimerWheel[str] = TimerWheel(0.5, slots=4, clock=clock)
+    fired: list[str] = []
+    wheel.schedule("soon", 1.2, lambda: fired.append("soon"))
+    # further than a round of the wheel, sharing the slot of "soon"
+    wheel.schedule("later", 5.2, lambda: fired.append("later"))
+    wheel.schedule("cancelled", 1.0, lambda: fired.append("cancelled"))
+    wheel.cancel("cancelled")
+
+    clock.now = 0.9
+    assert wheel.advance() == 0
+    clock.now = 1.0
+    assert wheel.advance() == 1
+    assert fired == ["soon"]
+    clock.now = 4.9
+    assert wheel.advance() == 0
+    # a late tick still fires everything due
+    clock.now = 30.0
+    assert wheel.advance() == 1
+    assert fired == ["soon", "later"] and len(wheel) == 0
+
+
+def tests_timer_wheel_rescheduling_replaces_timer():
+    clock = Clock()
+    wheel: TimerWheel[str] = TimerWheel(1.0, clock=clock)
+    fired: list[int] = []
+    wheel.schedule("room", 2.0, lambda: fired.append(1))
+    wheel.schedule("room", 3.0, lambda: fired.append(2))
+    clock.now = 2.5
+    wheel.advance()
+    clock.now = 3.5
+    wheel.advance()
+    assert fired == [2]
+
+
+def tests_player_running_out_of_turn_and_game_time():
+    clock = Clock()
+    expired: list[tuple[str, int]] = []
+    clocks = TurnClocks(
+        lambda room, player: expired.append((room, player)),
+        turn_seconds=10.0,
+        game_seconds=15.0,
+        tick_seconds=0.5,
+        clock=clock,
+    )
+    clocks.start_turn("room", 0)
+    clock.now = 8.0
+    clocks.start_turn("room", 1)
+    clock.now = 12.0
+    assert clocks.remaining("room", 0) == 7.0
+    assert clocks.remaining("room", 1) == 11.0
+    clocks.start_turn("room", 0)
+    # 7 seconds of the game clock are left, less than a turn
+    clock.now = 18.5
+    clocks.wheel.advance()
+    assert expired == []
+    clock.now = 19.0
+    clocks.wheel.advance()
+    assert expired == [("room", 0)] and not clocks.is_running("room")
+
+    clocks.start_turn("other", 1)
+    clocks.stop("other")
+    clock.now = 100.0
+    clocks.wheel.advance()
+    assert expired == [("room", 0)]
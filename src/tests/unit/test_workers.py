@@ -0,0 +1,120 @@
+import asyncio
+
+from application.workers import (
+    BrokerClient,
+    RoomOwners,
+    redirect_location,
+    serve_broker,
+)
+
+
+def tests_first_claiming_worker_owns_room_until_released():
+    owners = RoomOwners()
+    assert owners.claim("arena", 1) == 1
+    assert owners.claim("arena", 0) == 1
+    owners.release("arena", 0)
+    assert owners.claim("arena", 0) == 1
+    owners.release("arena", 1)
+    assert owners.claim("arena", 0) == 0
+    owners.forget_worker(0)
+    assert len(owners) == 0
+
+
+def tests_claiming_rooms_over_broker_socket(tmp_path):
+    owners = RoomOwners()
+    path = str(tmp_path / "broker.sock")
+
+    async def claim_and_release() -> list[int]:
+        broker = await serve_broker(owners, path)
+        first = await BrokerClient.connect(0, path)
+        second = await BrokerClient.connect(1, path)
+        owners_seen = [await first.claim("arena"), await second.claim("arena")]
+        first.release("arena")
+        owners_seen.append(await second.claim("arena"))
+        first.close()
+        second.close()
+        broker.close()
+        await broker.wait_closed()
+        return owners_seen
+
+    assert asyncio.run(claim_and_release()) == [0, 0, 1]
+
+
+def tests_redirecting_to_host_used_by_client():
+    assert (
+        redirect_location("10.42.0.1:4200", 4301, "/arena?role=spectator")
+        == "ws://10.42.0.1:4301/arena?role=spectator"
+    )
+
+
+def tests_releasing_claim_of_room_not_created_after_handshake():
+    from application import server
+
+    class ClosedConnection:
+        async def wait_closed(self) -> None:
+            pass
+
+    class Broker:
+        def __init__(self) -> None:
+            self.released: list[str] = []
+
+        def release(self, room: str) -> None:
+            self.released.append(room)
+
+    broker = Broker()
+    server.room_broker = broker
+    try:
+        server.get_room("played")
+        asyncio.run(server.release_unused_claim(ClosedConnection(), "failed"))
+        asyncio.run(server.release_unused_claim(ClosedConnection(), "played"))
+    finally:
+        server.room_broker = None
+        server.rooms.pop("played", None)
+    assert broker.released == ["failed"]
+
+
+def tests_releasing_match_claim_once_nobody_seeks_match():
+    from application import server
+    from application.matchmaking import MATCH_ROOM_NAME
+    from websockets.datastructures import Headers
+    from websockets.http11 import Request
+
+    class Connection:
+        def __init__(self) -> None:
+            self.closed = asyncio.Event()
+
+        async def wait_closed(self) -> None:
+            await self.closed.wait()
+
+    class Broker:
+        worker = 0
+
+        def __init__(self) -> None:
+            self.released: list[str] = []
+
+        async def claim(self, room: str) -> int:
+            return self.worker
+
+        def release(self, room: str) -> None:
+            self.released.append(room)
+
+    async def seek() -> list[str]:
+        request = Request(f"/{MATCH_ROOM_NAME}", Headers())
+        paired, failed = Connection(), Connection()
+        for connection in (paired, failed):
+            assert await server.route_to_room_owner(connection, request) is None
+        # the paired player's game goes on, the other one's handshake fails
+        server.stop_seeking_match(paired)
+        await asyncio.sleep(0)
+        assert broker.released == []
+        failed.closed.set()
+        await asyncio.sleep(0)
+        return broker.released
+
+    broker = Broker()
+    server.room_broker = broker
+    try:
+        assert asyncio.run(seek()) == [MATCH_ROOM_NAME]
+    finally:
+        server.room_broker = None
+        server.match_seekers.clear()